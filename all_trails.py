@@ -1,34 +1,31 @@
+# Trail list and trail detail pages, served at /, /all-trails and /<Trail-Name> by app.py
 import dash
 import dash_bootstrap_components as dbc
-from dash import html, dcc
+from dash import html, dcc, callback
 from dash.dependencies import Input, Output, State
 import dash_leaflet as dl
  
-import xml.etree.ElementTree as ET
-from shapely.geometry import LineString
-import pandas as pd
 import base64
 import os
- 
-external_stylesheets = [
-    'https://fonts.googleapis.com/css?family=Poppins:300,400,500,600,700,800,900&display=swap',
-    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/css/all.min.css',
-    '/assets/style.css'
-]
- 
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets, suppress_callback_exceptions=True)
- 
-df = pd.read_csv('data/50_trails.csv', encoding='utf-8')
+
+from framing import merge_bounds, viewport
+from instrumentation import instrument, record_cache
+from proximity import NEARBY_RADIUS_KM, proximity_graph
+from similarity import SimilarityIndex
+from tile_cache import tile_layer
+from trail_pack import pack_url
+from trail_store import store
+from warmup import traffic
+
+# Rough size of the trail detail map on a desktop layout, for the zoom estimate
+MAP_SIZE = (900, 500)
+# Cards in the detail page's "Similar trails" panel
+SIMILAR_SHOWN = 3
+# Closest trails listed in the detail page's "Trails within ... km" panel
+NEARBY_SHOWN = 8
  
 def load_trail_names():
-    return [{'label': name, 'value': name} for name in df['name'].unique()]
- 
-def gpx_to_points(gpx_path):
-    tree = ET.parse(gpx_path)
-    root = tree.getroot()
-    namespaces = {'default': 'http://www.topografix.com/GPX/1/1'}
-    route_points = [(float(pt.attrib['lat']), float(pt.attrib['lon'])) for pt in root.findall('.//default:trkpt', namespaces)]
-    return LineString(route_points)
+    return store.current().options
  
 def create_trail_card(trail_number, trail_name, duration, elevation_gain, distance):
     return dbc.Card(
@@ -53,99 +50,135 @@ def create_trail_card(trail_number, trail_name, duration, elevation_gain, distan
     )
    
  
+# Encoded images by path, keyed on mtime and size so a replaced file is re-encoded
+_encoded_images = {}
+
 def b64_image(img):
+    stat = os.stat(img)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _encoded_images.get(img)
+    record_cache('b64_image', cached is not None and cached[0] == signature)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
     with open(img, 'rb') as f:
         image = f.read()
-    return 'data:image/png;base64,' + base64.b64encode(image).decode('utf-8')
+    encoded = 'data:image/png;base64,' + base64.b64encode(image).decode('utf-8')
+    _encoded_images[img] = (signature, encoded)
+    return encoded
+
+def trail_name_from_path(pathname):
+    # '/Mount-Donna-Buang---Rainforest-Gallery' -> 'Mount Donna Buang - Rainforest Gallery'
+    splitname = [x.split('-') for x in pathname.lstrip('/').split('---')]
+    return ' - '.join([' '.join(x) for x in splitname])
+
+def background_images():
+    return html.Div([
+        html.Img(src=b64_image('assets/monutain_03.png'),
+            style={
+            'position': 'fixed',
+            'bottom': '0',
+            'right': '0',
+            'width': '60%',
+            'height': '60%',
+            'background-size': 'cover',
+            'background-attachment': 'fixed',
+            'z-index': '-1',
+        }),
+        html.Img(src=b64_image('assets/monutain_02.png'),
+            style={
+            'position': 'fixed',
+            'bottom': '0',
+            'right': '0',
+            'width': '60%',
+            'height': '60%',
+            'background-size': 'cover',
+            'background-attachment': 'fixed',
+            'z-index': '-1',
+        }),
+    ])
  
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    dbc.Row([
-        dbc.Col(
-            html.Header([
-                html.A('InSync', href='#', className='logo'),
-                html.Ul([
-                    html.Li(dcc.Link('Home', href='/', className='active')),
-                    html.Li(dcc.Link('My Trail', href='/my-trail')),
-                    html.Li(dcc.Link('All Trails', href='/all-trails')),
-                ], className='navigation')
-            ])
-        )
-    ]),
+# Built per page load so the dropdown always reflects the current trail data
+def layout():
+    return html.Div([
+        dbc.Row([
+            dbc.Col(
+                html.Header([
+                    html.A('InSync', href='#', className='logo'),
+                    html.Ul([
+                        html.Li(dcc.Link('Home', href='/', className='active')),
+                        html.Li(dcc.Link('My Trail', href='/my-trail')),
+                        html.Li(dcc.Link('All Trails', href='/all-trails')),
+                        html.Li(dcc.Link('Hiking', href='/hiking')),
+                    ], className='navigation')
+                ])
+            )
+        ]),
    
-    html.Section(className='sec', children=[
-        html.H2('Trails in Victoria'),
-        html.H4('Explore the diverse trails of Victoria with our carefully curated selection.'),
-        html.P('Our trails span across Victoria and offer a variety of terrains and difficulty levels. We provide average estimates of trail details to help you choose the perfect trail for your adventure.', style={'margin-right':'100px'}),
-        html.P("    "),
-        html.H4('Happy Hiking!', style={'margin-top': '20px'})
-    ]),
-    # html.Div(id='trail-cards-row'),
-    html.Div([
-        dcc.Dropdown(
-            id='trail-search-dropdown',
-            options=load_trail_names(),
-            searchable=True,
-            placeholder='Search for trails...',
-            style={
-                'width':'600px',
-                'padding': '12px',
-                'margin-top': '10px',
-                'margin-right': '16px',
-                'font-size': '16px',
-                'border-radius': '30px',
-                'vertical-align':'center'
-            }
+        html.Section(className='sec', children=[
+            html.H2('Trails in Victoria'),
+            html.H4('Explore the diverse trails of Victoria with our carefully curated selection.'),
+            html.P('Our trails span across Victoria and offer a variety of terrains and difficulty levels. We provide average estimates of trail details to help you choose the perfect trail for your adventure.', style={'margin-right':'100px'}),
+            html.P("    "),
+            html.H4('Happy Hiking!', style={'margin-top': '20px'})
+        ]),
+        # html.Div(id='trail-cards-row'),
+        html.Div([
+            dcc.Dropdown(
+                id='trail-search-dropdown',
+                options=load_trail_names(),
+                searchable=True,
+                placeholder='Search for trails...',
+                style={
+                    'width':'600px',
+                    'padding': '12px',
+                    'margin-top': '10px',
+                    'margin-right': '16px',
+                    'font-size': '16px',
+                    'border-radius': '30px',
+                    'vertical-align':'center'
+                }
+            ),
+            html.Div(id='trail-cards-row'),  # This is where the trail cards will be displayed
+        ], style={'padding-top': '20px', 'margin-left': '20px'}),
+        html.Div(id='trail-info'),
+        dl.Map(
+            id='trail-map',
+            children=[tile_layer(), dl.LayerGroup(id='trail-layer'), dl.LayerGroup(id='image-layer')],
+            style={'width': '70%', 'height': '500px', 'margin-top': '15px', 'margin-left': '200px', 'align': 'center', 'display': 'none'}  # Initially hide the trail-map
         ),
-        html.Div(id='trail-cards-row'),  # This is where the trail cards will be displayed
-    ], style={'padding-top': '20px', 'margin-left': '20px'}),
-    html.Div(id='trail-info'),
-    dl.Map(
-        id='trail-map',
-        children=[dl.TileLayer(), dl.LayerGroup(id='trail-layer'), dl.LayerGroup(id='image-layer')],
-        style={'width': '70%', 'height': '500px', 'margin-top': '15px', 'margin-left': '200px', 'align': 'center', 'display': 'none'}  # Initially hide the trail-map
-    ),
-    html.Div(id='mountain-backgrounds')
+        html.Div(id='mountain-backgrounds')
  
-])
+    ])
  
-@app.callback(
+# Run by the start-up warm-up in app.py so the first visitors hit warm caches
+def warm_up_shared(snapshot):
+    snapshot.cached('trail_cards', None, lambda: trail_cards(snapshot.catalog.trails()))
+    similarity_index(snapshot)
+    proximity_graph(snapshot)
+    background_images()
+
+def warm_up_trail(snapshot, trail_name):
+    if snapshot.has_gpx(trail_name):
+        # Parses the GPX and precompiles its GeoJSON and bbox
+        snapshot.feature(trail_name)
+    cached_trail_detail(snapshot, trail_name)
+
+@callback(
     Output('mountain-backgrounds', 'children'),
     [Input('url', 'pathname')]
 )
+@instrument
 def update_background_images(pathname):
     if pathname == '/' or pathname == '/all-trails':
-        return html.Div([
-            html.Img(src=b64_image('assets/monutain_03.png'),
-                style={
-                'position': 'fixed',
-                'bottom': '0',
-                'right': '0',
-                'width': '60%',
-                'height': '60%',
-                'background-size': 'cover',
-                'background-attachment': 'fixed',
-                'z-index': '-1',
-            }),
-            html.Img(src=b64_image('assets/monutain_02.png'),
-                style={
-                'position': 'fixed',
-                'bottom': '0',
-                'right': '0',
-                'width': '60%',
-                'height': '60%',
-                'background-size': 'cover',
-                'background-attachment': 'fixed',
-                'z-index': '-1',
-            }),
-        ])
+        return background_images()
     else:
         return None
  
-@app.callback(
+@callback(
     Output('trail-search-dropdown', 'style'),
     [Input('url', 'pathname')]
 )
+@instrument
 def toggle_search_visibility(pathname):
     if pathname == '/' or pathname == '/all-trails':
         return {
@@ -160,125 +193,189 @@ def toggle_search_visibility(pathname):
     else:
         return {'display': 'none'}
    
-@app.callback(
+def trail_cards(trails):
+    cards = [
+        dbc.Col(create_trail_card(trail.id+1, trail.name, trail.duration, trail.elevation_gain, trail.distance), width=4)
+        for trail in trails
+    ]
+    return html.Div(className='trail-cards', style={'padding-top': '20px', 'margin-left': '20px'}, children=[
+        dbc.Row(id='trail-cards-row', children=cards)
+    ])
+
+def similarity_index(snapshot):
+    return snapshot.cached('similar_trails', None, lambda: SimilarityIndex.for_snapshot(snapshot), gpx=True)
+
+def similar_trails(snapshot, trail_name):
+    catalog = snapshot.catalog
+    return catalog.trails(similarity_index(snapshot).similar(catalog.id(trail_name), SIMILAR_SHOWN))
+
+def nearby_trails(snapshot, trail_name):
+    catalog = snapshot.catalog
+    nearby = proximity_graph(snapshot).nearby(catalog.id(trail_name))[:NEARBY_SHOWN]
+    return [(catalog.names[id], km) for id, km in nearby]
+
+def nearby_panel(nearby):
+    if not nearby:
+        return None
+    return dbc.Row([
+        html.H3(f'Trails within {NEARBY_RADIUS_KM:g} km', style={'color': '#112434', 'margin-bottom': '20px'}),
+        html.Ul([
+            html.Li([
+                dcc.Link(trail_name, href=f'/{trail_name.replace(" ", "-")}', style={'color': '#112434'}),
+                html.Span(f" {km:.1f} km away", style={'color': '#808080'})
+            ]) for trail_name, km in nearby
+        ], style={'margin-left': '20px'})
+    ], style={'margin': '40px 30px 0', 'padding': '0 40px'})
+
+def similar_panel(similar):
+    if not similar:
+        return None
+    return dbc.Row([
+        html.H3('Similar trails', style={'color': '#112434', 'margin-bottom': '20px'}),
+        *[dbc.Col(create_trail_card(i+1, trail.name, trail.duration, trail.elevation_gain, trail.distance), width=4)
+          for i, trail in enumerate(similar)]
+    ], style={'margin': '40px 30px', 'padding': '0 40px'})
+
+def trail_detail(catalog, trail_name, similar=(), nearby=()):
+    trail = catalog.trail(trail_name)
+    image_path = f"assets/{trail_name}.jpg"
+    description = trail.description
+    duration = trail.duration
+    elevation_gain = trail.elevation_gain
+    distance = trail.distance
+    dist_mel = trail.distance_from_mel
+    time_mel = trail.drive_from_mel
+    loop = trail.loop
+   
+    return html.Div([
+        dbc.Row([
+            dcc.Link(html.I(className="fas fa-arrow-left", style={'margin-right': '5px'}), href='/'),
+            dcc.Link('View all trails', href='/', className='active'),
+            # A plain link, so the browser downloads the zip instead of the page router handling it
+            html.A([html.I(className="fas fa-download", style={'margin-right': '5px'}), 'Download for offline use'],
+                   href=pack_url([trail_name]), style={'margin-left': 'auto', 'color': '#112434'})
+            ], style={'margin': '0 auto', 'padding': '40px'}),
+        dbc.Row(html.H2(trail_name, style={'color': '#112434', 'text-decoration': 'none', 'margin-bottom': '15px',
+                                           'margin-left':'40px'})),
+        dbc.Row([
+            dbc.Col(html.Img(src=b64_image(image_path) if os.path.exists(image_path) else None,
+                             style={'max-width': '100%', 'height': 'auto'}), width=4),
+            dbc.Col([
+                html.P(description, style={'margin-left': '30px', 'text-align': 'justify'}),
+                html.Div([
+                    dbc.Row([
+                        dbc.Col([
+                            html.I(className="fas fa-clock", style={'color': '#808080', 'margin-right': '5px', 'margin-top': '20px', 'margin-left':'30px'}),
+                            html.Span(f"Duration: {duration}hours", style={'color': '#808080'}),
+                            html.Div(""),
+                            html.I(className="fas fa-mountain", style={'color': '#808080', 'margin-right': '5px', 'margin-left': '30px', 'margin-top':'15px'}),  # Mountain icon
+                            html.Span(f"Elevation Gain: {elevation_gain}m", style={'color': '#808080'}),
+                            html.Div(""),
+                            html.I(className="fas fa-route", style={'color': '#808080', 'margin-right': '5px', 'margin-left': '30px', 'margin-top':'15px'}),  # Route icon
+                            html.Span(f" Distance: {distance}km", style={'color': '#808080'}),
+                        ], width=3),
+                        dbc.Col([
+                            html.I(className="fas fa-solid fa-car", style={'color': '#808080', 'margin-right': '5px', 'margin-top': '20px', 'margin-left':'200px'}),
+                            html.Span(f"Drive from Melbourne: {time_mel}hours", style={'color': '#808080'}),
+                            html.Div(""),
+                            html.I(className="fas fa-map-pin", style={'color': '#808080', 'margin-right': '5px', 'margin-top': '15px', 'margin-left':'200px'}),
+                            html.Span(f"Distance from Melbourne: {dist_mel}km", style={'color': '#808080'}),
+                            html.Div(""),
+                            html.I(className="fas fa-redo", style={'color': '#808080', 'margin-right': '5px', 'margin-top': '15px', 'margin-left':'200px'}),
+                            html.Span(f"Trail route: {loop}", style={'color': '#808080'}),
+                        ], width=3),
+                    ], style={'display': 'flex'}),
+            ])], width=4)
+        ], style={'margin': '0 30px', 'padding': '40px', 'display': 'flex', 'border': '1px solid', 'border-color': 'rgba(0, 0, 0, 0.2)', 'border-radius': '50px', 'box-shadow': '0 2px 4px rgba(0, 0, 0, 0.1)',}),
+        dbc.Row([
+        dl.Map(
+            id='trail-map',
+            children=[tile_layer(), dl.LayerGroup(id='trail-layer'), dl.LayerGroup(id='image-layer')],
+            style={'width': '70%', 'height': '500px', 'margin-top': '15px', 'margin-left':'200px', 'align':'center'},
+            center=(-37.8136, 144.9631),
+            zoom=12)
+    ]),
+        nearby_panel(nearby),
+        similar_panel(similar)
+    ])
+
+def trail_not_found(trail_name):
+    return html.Div([
+        dbc.Row([
+            dcc.Link(html.I(className="fas fa-arrow-left", style={'margin-right': '5px'}), href='/'),
+            dcc.Link('View all trails', href='/', className='active'),
+            ], style={'margin': '0 auto', 'padding': '40px'}),
+        dbc.Row(html.H2('Trail not found', style={'color': '#112434', 'margin-bottom': '15px', 'margin-left': '40px'})),
+        dbc.Row(html.P(f"There is no trail called {trail_name}.", style={'margin-left': '40px'})),
+    ])
+ 
+def cached_trail_detail(snapshot, trail_name):
+    # The similar and nearby panels come from GPX start points, so GPX edits drop it too
+    return snapshot.cached('trail_detail', trail_name, lambda: trail_detail(
+        snapshot.catalog, trail_name, similar_trails(snapshot, trail_name), nearby_trails(snapshot, trail_name)),
+        gpx=True)
+       
+@callback(
     [Output('trail-cards-row', 'children'),
      Output('trail-info', 'children')],
     [Input('url', 'pathname'),
      Input('trail-search-dropdown', 'value')]
 )
+@instrument
 def update_trail_info(pathname, search_input):
+    snapshot = store.current()
+    catalog = snapshot.catalog
     url = pathname[1:]
-    if len(url) == 0:
+    if len(url) == 0 or url == 'all-trails':
         if search_input is None or search_input == '':
-            filtered_trails = df
-        else:
-            filtered_trails = df[df['name'].str.contains(search_input, case=False)]
- 
-        cards = [
-            dbc.Col(create_trail_card(index+1, row['name'], row['duration'], row['elevation_gain'], row['distance']), width=4)
-            for index, row in filtered_trails.iterrows()
-        ]
-        return html.Div(className='trail-cards', style={'padding-top': '20px', 'margin-left': '20px'}, children=[
-            dbc.Row(id='trail-cards-row', children=cards)
-        ]), None
+            return snapshot.cached('trail_cards', None, lambda: trail_cards(catalog.trails())), None
+        return trail_cards(catalog.trails(catalog.search(search_input))), None
     else:
-        splitname = [x.split('-') for x in url.split('---')]
-        trail_name = ' - '.join([' '.join(x) for x in splitname])
-        trail = df[df['name'] == trail_name]
-        description = trail['description'].values[0]
-        duration = trail['duration'].values[0]
-        elevation_gain = trail['elevation_gain'].values[0]
-        distance = trail['distance'].values[0]
-        dist_mel = trail['distance_from_mel'].values[0]
-        time_mel = trail['drive_from_mel'].values[0]
-        loop = trail['loop'].values[0]
-   
-        return None, html.Div([
-            dbc.Row([
-                dcc.Link(html.I(className="fas fa-arrow-left", style={'margin-right': '5px'}), href='/'),
-                dcc.Link('View all trails', href='/', className='active')
-                ], style={'margin': '0 auto', 'padding': '40px'}),
-            dbc.Row(html.H2(trail_name, style={'color': '#112434', 'text-decoration': 'none', 'margin-bottom': '15px',
-                                               'margin-left':'40px'})),
-            dbc.Row([
-                dbc.Col(html.Img(src=b64_image(f"assets/{trail_name}.jpg"),
-                                 style={'max-width': '100%', 'height': 'auto'}), width=4),
-                dbc.Col([
-                    html.P(description, style={'margin-left': '30px', 'text-align': 'justify'}),
-                    html.Div([
-                        dbc.Row([
-                            dbc.Col([
-                                html.I(className="fas fa-clock", style={'color': '#808080', 'margin-right': '5px', 'margin-top': '20px', 'margin-left':'30px'}),
-                                html.Span(f"Duration: {duration}hours", style={'color': '#808080'}),
-                                html.Div(""),
-                                html.I(className="fas fa-mountain", style={'color': '#808080', 'margin-right': '5px', 'margin-left': '30px', 'margin-top':'15px'}),  # Mountain icon
-                                html.Span(f"Elevation Gain: {elevation_gain}m", style={'color': '#808080'}),
-                                html.Div(""),
-                                html.I(className="fas fa-route", style={'color': '#808080', 'margin-right': '5px', 'margin-left': '30px', 'margin-top':'15px'}),  # Route icon
-                                html.Span(f" Distance: {distance}km", style={'color': '#808080'}),
-                            ], width=3),
-                            dbc.Col([
-                                html.I(className="fas fa-solid fa-car", style={'color': '#808080', 'margin-right': '5px', 'margin-top': '20px', 'margin-left':'200px'}),
-                                html.Span(f"Drive from Melbourne: {time_mel}hours", style={'color': '#808080'}),
-                                html.Div(""),
-                                html.I(className="fas fa-map-pin", style={'color': '#808080', 'margin-right': '5px', 'margin-top': '15px', 'margin-left':'200px'}),
-                                html.Span(f"Distance from Melbourne: {dist_mel}km", style={'color': '#808080'}),
-                                html.Div(""),
-                                html.I(className="fas fa-redo", style={'color': '#808080', 'margin-right': '5px', 'margin-top': '15px', 'margin-left':'200px'}),
-                                html.Span(f"Trail route: {loop}", style={'color': '#808080'}),
-                            ], width=3),
-                        ], style={'display': 'flex'}),
-                ])], width=4)
-            ], style={'margin': '0 30px', 'padding': '40px', 'display': 'flex', 'border': '1px solid', 'border-color': 'rgba(0, 0, 0, 0.2)', 'border-radius': '50px', 'box-shadow': '0 2px 4px rgba(0, 0, 0, 0.1)',}),
-            dbc.Row([
-            dl.Map(
-                id='trail-map',
-                children=[dl.TileLayer(), dl.LayerGroup(id='trail-layer'), dl.LayerGroup(id='image-layer')],
-                style={'width': '70%', 'height': '500px', 'margin-top': '15px', 'margin-left':'200px', 'align':'center'},
-                center=(-37.8136, 144.9631),
-                zoom=12)
-    ])
-    ])
-       
-@app.callback(
-    [Output('trail-layer', 'children'), Output('trail-map', 'center')],
+        trail_name = trail_name_from_path(pathname)
+        if trail_name not in catalog:
+            # Unknown paths never enter the traffic log
+            return None, trail_not_found(trail_name)
+        detail = cached_trail_detail(snapshot, trail_name)
+        traffic.record(trail_name)
+        return None, detail
+
+@callback(
+    [Output('trail-layer', 'children'), Output('trail-map', 'viewport')],
     [Input('url', 'pathname')],
     prevent_initial_call=True
 )
+@instrument
 def update_map(pathname):
-    if not pathname or pathname == '/':
+    if not pathname or pathname == '/' or pathname == '/all-trails':
+        return [], dash.no_update
+    trail_name = trail_name_from_path(pathname)
+    snapshot = store.current()
+    if not snapshot.has_gpx(trail_name):
         return [], dash.no_update
-    pathname = pathname[1:]
-    splitname = [x.split('-') for x in pathname.split('---')]
-    trail_name = ' - '.join([' '.join(x) for x in splitname])
-    gpx_path = os.path.join('data/trails', f'{trail_name}.gpx')
-    line_string = gpx_to_points(gpx_path)
-    centroid = line_string.centroid.coords[0]
-    positions = list(line_string.coords)
+    positions = list(snapshot.line_string(trail_name).coords)
     features = [dl.Polyline(positions=positions, color='blue')]
-    return features, centroid
+    return features, viewport(merge_bounds([snapshot.bbox(trail_name)]), *MAP_SIZE)
  
-@app.callback(
+@callback(
     [Output('image-layer', 'children')],
     [Input('url', 'pathname')],
     [State('trail-map', 'zoom')]
 )
+@instrument
 def display_image_marker(pathname, zoom):
     if zoom is None:
         zoom = 10
  
     markers = []
-    if not pathname or pathname == '/':
+    if not pathname or pathname == '/' or pathname == '/all-trails':
         return [dash.no_update]
-    pathname = pathname[1:]
-    splitname = [x.split('-') for x in pathname.split('---')]
-    trail_name = ' - '.join([' '.join(x) for x in splitname])
-    gpx_path = os.path.join('data/trails', f'{trail_name}.gpx')
+    trail_name = trail_name_from_path(pathname)
+    snapshot = store.current()
    
-    if not os.path.exists(gpx_path):
+    if not snapshot.has_gpx(trail_name):
         return [dash.no_update]
  
-    trail_points = gpx_to_points(gpx_path).coords
+    trail_points = snapshot.line_string(trail_name).coords
     start_marker = dl.Marker(
         position=trail_points[0],
         children=[dl.Tooltip("Start")],
@@ -299,8 +396,3 @@ def display_image_marker(pathname, zoom):
     )
     markers.extend([start_marker, finish_marker])
     return [markers]
- 
- 
- 
-if __name__ == '__main__':
-    app.run_server(debug=True)
\ No newline at end of file
@@ -0,0 +1,88 @@
+import os
+
+import dash
+from dash import html, dcc
+from dash.dependencies import Input, Output, State, ClientsideFunction
+
+import instrumentation
+import tile_cache
+import trail_pack
+import uploads
+import warmup
+from instrumentation import instrument
+from trail_store import store
+
+# Page modules register their callbacks on import; their heavy dependencies
+# (pandas, shapely, geopy) and the trail data are loaded by warmup
+import all_trails
+import hiking
+import my_trails
+
+# Warm the trail caches in the background after start-up, busiest trails first
+WARM_UP = os.environ.get('TRAIL_WARM_UP', '1') != '0'
+
+external_stylesheets = [
+    'https://fonts.googleapis.com/css?family=Poppins:300,400,500,600,700,800,900&display=swap',
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/css/all.min.css',
+    '/assets/style.css'
+]
+
+app = dash.Dash(__name__, external_stylesheets=external_stylesheets, suppress_callback_exceptions=True,
+                external_scripts=[
+                    'https://cdnjs.cloudflare.com/ajax/libs/gsap/3.5.1/gsap.min.js',
+                    'https://cdnjs.cloudflare.com/ajax/libs/gsap/3.5.1/ScrollTrigger.min.js'
+                ])
+server = app.server
+
+# Everything else ('/', '/all-trails' and '/<Trail-Name>') belongs to all_trails
+PAGES = {
+    '/hiking': hiking,
+    '/my-trail': my_trails,
+}
+
+
+def page_for(pathname):
+    return PAGES.get(pathname, all_trails)
+
+
+app.layout = html.Div([
+    dcc.Location(id='url', refresh=False),
+    dcc.Store(id='current-page'),
+    html.Div(id='page-content'),
+])
+
+
+@app.callback(
+    [Output('page-content', 'children'), Output('current-page', 'data')],
+    [Input('url', 'pathname')],
+    [State('current-page', 'data')]
+)
+@instrument
+def display_page(pathname, current_page):
+    page = page_for(pathname)
+    if page.__name__ == current_page:
+        # Same page: its own callbacks react to the new pathname
+        return dash.no_update, dash.no_update
+    return page.layout(), page.__name__
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='trigger_gsap_animation'),
+    Output('dummy-output', 'children'),
+    [Input('dummy-input', 'children')]
+)
+
+
+server.add_url_rule(hiking.CATALOG_URL, 'hiking_catalog', hiking.catalog_view)
+server.add_url_rule(trail_pack.PACK_URL, 'trail_pack', trail_pack.export_view)
+# Forks the upload workers on the first request, so its hook goes ahead of the ones that start threads
+uploads.install(app)
+tile_cache.install(app, [all_trails.MAP_SIZE, hiking.MAP_SIZE, my_trails.MAP_SIZE])
+instrumentation.install(app)
+# Started on the first request too, so pre-fork servers don't inherit the thread
+server.before_request(store.watch)
+warmup.install(app, warmup.WarmUp(shared=[all_trails.warm_up_shared, hiking.warm_up_shared],
+                                  per_trail=[all_trails.warm_up_trail]) if WARM_UP else None)
+
+if __name__ == '__main__':
+    app.run_server(debug=True)
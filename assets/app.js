@@ -1,5 +1,69 @@
 if (!window.dash_clientside) {window.dash_clientside = {};}
 
+// Hiking search catalog, fetched once per catalog version; the browser cache
+// revalidates it with the ETag, so revisits usually cost a 304
+var trailCatalog = {version: null, promise: null};
+
+function decodeColumn(encoded, ArrayType) {
+    var bytes = Uint8Array.from(atob(encoded), function(c) { return c.charCodeAt(0); });
+    return new ArrayType(bytes.buffer);
+}
+
+function loadTrailCatalog(filter) {
+    if (trailCatalog.version !== filter.version || !trailCatalog.promise) {
+        trailCatalog.version = filter.version;
+        trailCatalog.promise = fetch(filter.url, {cache: 'no-cache'})
+            .then(function(response) {
+                if (!response.ok) { throw new Error('catalog request failed: ' + response.status); }
+                return response.json();
+            })
+            .then(function(data) {
+                return {
+                    names: data.names,
+                    loops: data.loops,
+                    distance: decodeColumn(data.distance, Float64Array),
+                    max_elevation: decodeColumn(data.max_elevation, Float64Array),
+                    duration: decodeColumn(data.duration, Float64Array),
+                    loop: decodeColumn(data.loop, Uint8Array)
+                };
+            })
+            .catch(function(error) {
+                trailCatalog.promise = null;
+                throw error;
+            });
+    }
+    return trailCatalog.promise;
+}
+
+// Same conditions as filter_trails in hiking.py
+function matchTrails(catalog, distance, elevation, duration, loop) {
+    var loopCode = catalog.loops.indexOf(loop);
+    var names = [];
+    for (var i = 0; i < catalog.names.length; i++) {
+        if (catalog.distance[i] >= distance - 5 && catalog.distance[i] <= distance + 5 &&
+            catalog.max_elevation[i] >= elevation - 300 && catalog.max_elevation[i] <= elevation + 300 &&
+            catalog.duration[i] >= duration - 0.5 && catalog.duration[i] <= duration + 0.5 &&
+            catalog.loop[i] === loopCode) {
+            names.push(catalog.names[i]);
+        }
+    }
+    return names;
+}
+
+function unlessUnchanged(matches, previous) {
+    if (previous && JSON.stringify(matches) === JSON.stringify(previous)) {
+        return window.dash_clientside.no_update;
+    }
+    return matches;
+}
+
+// Functions referenced by dl.GeoJSON props, e.g. style={'variable': 'trailMap.style'}
+window.trailMap = {
+    style: function(feature) {
+        return {color: feature.properties.color, weight: 3, opacity: 0.9};
+    }
+};
+
 window.dash_clientside.clientside = {
     trigger_gsap_animation: function() {
         gsap.registerPlugin(ScrollTrigger);
@@ -16,12 +80,35 @@ window.dash_clientside.clientside = {
     scroll_to_map: function(selected_trail) {
         if(selected_trail) {
             setTimeout(function() {
-                document.getElementById('trail-map').scrollIntoView({
+                document.getElementById('my-trail-map').scrollIntoView({
                     behavior: 'smooth',
                     block: 'start'
                 });
             }, 100); // A slight delay to ensure the DOM has updated
         }
         return window.dash_clientside.no_update; // Prevent updating any Output
+    },
+
+    filter_trails: function(n_clicks1, n_clicks2, selected_trails, distance, elevation, duration, loop, filter, facets, previous) {
+        var triggered = window.dash_clientside.callback_context.triggered_id;
+        if (triggered === 'search-button') {
+            return unlessUnchanged({names: selected_trails || []}, previous);
+        }
+        var query = {distance: distance, elevation: elevation, duration: duration, loop: loop,
+                     facets: facets ? facets.expression : null};
+        if (!filter || filter.mode !== 'client' || (facets && !facets.names)) {
+            return unlessUnchanged({query: query}, previous);
+        }
+        return loadTrailCatalog(filter).then(function(catalog) {
+            var names = matchTrails(catalog, distance, elevation, duration, loop);
+            if (facets) {
+                var allowed = new Set(facets.names);
+                names = names.filter(function(name) { return allowed.has(name); });
+            }
+            return unlessUnchanged({names: names}, previous);
+        }, function() {
+            // Catalog unavailable: let the server filter instead
+            return unlessUnchanged({query: query}, previous);
+        });
     }
 }
@@ -0,0 +1,125 @@
+"""Compare request-time catalog access: the pandas DataFrame vs the compact TrailCatalog.
+
+Loads a synthetic catalog both ways and reports the memory each holds
+(deep: column buffers plus every Python string) and the per-request cost
+of what the callbacks do with it: the trail detail lookup, building card
+rows, the hiking slider filter and the dropdown's prefix search. The
+DataFrame versions are the code the callbacks ran before. Run from the
+repository root:
+
+    python benchmarks/bench_catalog.py
+    python benchmarks/bench_catalog.py --trails 50 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('TRAIL_DATA_WATCH_INTERVAL', '0')
+
+import synthetic  # noqa: E402
+from hiking import filter_trails  # noqa: E402
+from trail_catalog import Categories, TrailCatalog  # noqa: E402
+
+DETAIL_COLUMNS = ['description', 'duration', 'elevation_gain', 'distance', 'distance_from_mel', 'drive_from_mel', 'loop']
+CARD_ROWS = 1000
+
+
+def deep_size(catalog):
+    seen = set()
+
+    def size(value):
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        if hasattr(value, 'nbytes'):
+            return value.nbytes
+        if isinstance(value, Categories):
+            return size(value.codes) + size(value.values)
+        if isinstance(value, tuple):
+            return sys.getsizeof(value) + sum(size(item) for item in value)
+        return sys.getsizeof(value)
+    columns = sum(size(column) for column in catalog.columns.values()) + sys.getsizeof(catalog._ids)
+    # Built on the first name search
+    search = size(catalog.lower_names()) + size(catalog._prefix_index)
+    return columns, search
+
+
+def pandas_detail(df, trail_name):
+    trail = df[df['name'] == trail_name]
+    return [trail[column].values[0] for column in DETAIL_COLUMNS]
+
+
+def catalog_detail(catalog, trail_name):
+    trail = catalog.trail(trail_name)
+    return [getattr(trail, column) for column in DETAIL_COLUMNS]
+
+
+def pandas_cards(df):
+    return [(index + 1, row['name'], row['duration'], row['elevation_gain'], row['distance'])
+            for index, row in df.iterrows()]
+
+
+def catalog_cards(catalog, ids):
+    return [(trail.id + 1, trail.name, trail.duration, trail.elevation_gain, trail.distance)
+            for trail in catalog.trails(ids)]
+
+
+def pandas_filter(df, distance, elevation, duration, loop):
+    matches = df[(df['distance'] >= distance - 5) & (df['distance'] <= distance + 5) &
+                 (df['max_elevation'] >= elevation - 300) & (df['max_elevation'] <= elevation + 300) &
+                 (df['duration'] >= duration - 0.5) & (df['duration'] <= duration + 0.5) &
+                 (df['loop'] == loop)]
+    return matches['name'].tolist()
+
+
+def pandas_prefix(df, text):
+    return df[df['name'].str.lower().str.startswith(text.lower())]['name'].tolist()
+
+
+def best_ms(function, budget=1.0):
+    start = time.perf_counter()
+    function()
+    single = time.perf_counter() - start
+    number = max(1, min(1000, int(budget / 5 / max(single, 1e-6))))
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark request-time catalog access.')
+    parser.add_argument('--trails', type=int, nargs='+', default=[50, 1000000])
+    args = parser.parse_args()
+
+    for count in args.trails:
+        df = synthetic.trail_catalog(count)
+        start = time.perf_counter()
+        catalog = TrailCatalog.from_frame(df)
+        build = time.perf_counter() - start
+        name = df['name'].iloc[count // 2]
+        prefix = name[:-2]
+        rows = min(count, CARD_ROWS)
+        assert pandas_filter(df, 10, 400, 2.5, 'closed loop') == filter_trails(catalog, 10, 400, 2.5, 'closed loop')
+        assert pandas_prefix(df, prefix) == catalog.names_of(catalog.prefix(prefix))
+        catalog.prefix('')
+
+        print(f'\n{count:,} trails: catalog built in {build:.2f} s')
+        print(f'{"memory":<34} {"DataFrame":>12} {"TrailCatalog":>13}')
+        columns, search = deep_size(catalog)
+        print(f'{"deep size MB":<34} {df.memory_usage(deep=True).sum() / 2**20:>12.2f} {columns / 2**20:>13.2f}')
+        print(f'{"+ name search index MB":<34} {"":>12} {search / 2**20:>13.2f}')
+        print(f'{"per request, ms":<34} {"DataFrame":>12} {"TrailCatalog":>13}')
+        for label, old, new in (
+            ('trail detail lookup', lambda: pandas_detail(df, name), lambda: catalog_detail(catalog, name)),
+            (f'card rows ({rows})', lambda: pandas_cards(df.head(rows)), lambda: catalog_cards(catalog, range(rows))),
+            ('slider filter', lambda: pandas_filter(df, 10, 400, 2.5, 'closed loop'),
+             lambda: filter_trails(catalog, 10, 400, 2.5, 'closed loop')),
+            ('name prefix search', lambda: pandas_prefix(df, prefix), lambda: catalog.prefix(prefix)),
+        ):
+            print(f'{label:<34} {best_ms(old):>12.3f} {best_ms(new):>13.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Compare facet queries: pandas string matching vs boolean columns vs the bitmap index.
+
+Builds a synthetic catalog and answers the same facet queries three ways:
+pandas masks derived from the text columns on every query (what a naive
+filter does), pandas boolean columns precomputed once, and FacetIndex
+bitmaps. Reports per-query latency for the match count and for the
+matching names, the disjunctive facet counts the hiking page shows next to
+every checkbox, plus index build time and bitmap memory. Run from the
+repository root:
+
+    python benchmarks/bench_facets.py
+    python benchmarks/bench_facets.py --trails 10000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from facets import ATTRACTIONS, DRIVE_HOURS, SEASONS, FacetIndex, drive_label, selection_expression  # noqa: E402
+from trail_catalog import TrailCatalog  # noqa: E402
+
+QUERIES = {
+    '(spring|autumn) & loop & waterfall & <2h': {
+        'season': ['spring', 'autumn'], 'loop': ['closed loop'],
+        'attraction': ['waterfall'], 'drive': ['under 2 h'],
+    },
+    'summit & not one way': ['and', 'attraction:summit', ['not', 'loop:one way']],
+    'winter': {'season': ['winter']},
+}
+COUNTS_SELECTION = {'season': ['spring', 'autumn'], 'attraction': ['waterfall', 'lake']}
+
+
+def expression(query):
+    return selection_expression(query) if isinstance(query, dict) else query
+
+
+def pandas_masks(df):
+    """Facet masks straight from the DataFrame's text columns, as a naive filter would."""
+    seasons = df['season'].fillna('').str.lower()
+    all_year = seasons.str.strip() == 'all'
+    attractions = df['key_attraction'].fillna('').str.lower()
+    drive = df['drive_from_mel']
+    return {
+        'season': {season: all_year | seasons.str.contains(season, regex=False) for season in SEASONS},
+        'loop': {loop: df['loop'] == loop for loop in sorted(df['loop'].dropna().unique())},
+        'attraction': {name: attractions.str.contains('|'.join(keywords)) for name, keywords in ATTRACTIONS.items()},
+        'drive': {drive_label(hours): drive < hours for hours in DRIVE_HOURS},
+    }
+
+
+def mask_of(masks, expr):
+    """Evaluate an expression over {facet: {value: mask}} pandas masks."""
+    if isinstance(expr, str):
+        facet, _, value = expr.partition(':')
+        return masks[facet][value]
+    operator, *operands = expr
+    if operator == 'not':
+        return ~mask_of(masks, operands[0])
+    result = None
+    for operand in operands:
+        mask = mask_of(masks, operand)
+        result = mask if result is None else (result & mask if operator == 'and' else result | mask)
+    return result
+
+
+def pandas_counts(masks, selection):
+    clauses = {facet: mask_of(masks, ['or', *(f'{facet}:{value}' for value in values)])
+               for facet, values in selection.items() if values}
+    counts = {}
+    for facet, values in masks.items():
+        others = None
+        for other, mask in clauses.items():
+            if other != facet:
+                others = mask if others is None else others & mask
+        counts[facet] = {value: int((mask if others is None else others & mask).sum())
+                         for value, mask in values.items()}
+    return counts
+
+
+def best_ms(function, budget=1.0):
+    start = time.perf_counter()
+    function()
+    single = time.perf_counter() - start
+    number = max(1, min(1000, int(budget / 5 / max(single, 1e-6))))
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the facet engine.')
+    parser.add_argument('--trails', type=int, nargs='+', default=[10000, 1000000])
+    args = parser.parse_args()
+
+    for count in args.trails:
+        df = synthetic.trail_catalog(count)
+        start = time.perf_counter()
+        index = FacetIndex.from_catalog(TrailCatalog.from_frame(df))
+        build = time.perf_counter() - start
+        masks = pandas_masks(df)
+        names = df['name']
+        bitmaps = sum(len(values) for values in index.bitmaps.values())
+        size = sum(bitmap.__sizeof__() for values in index.bitmaps.values() for bitmap in values.values())
+        print(f'\n{count:,} trails: index built in {build:.2f} s, '
+              f'{bitmaps} bitmaps, {size / 1024:.0f} KB ({size / bitmaps / 1024:.1f} KB each)')
+
+        print(f'{"query":<42} {"matches":>8} {"engine":<14} {"count ms":>9} {"names ms":>9}')
+        for label, query in QUERIES.items():
+            expr = expression(query)
+            matches = index.count(expr)
+            assert matches == int(mask_of(masks, expr).sum())
+            engines = (
+                ('pandas text', lambda: mask_of(pandas_masks(df), expr).sum(),
+                 lambda: names[mask_of(pandas_masks(df), expr)].tolist()),
+                ('pandas bool', lambda: mask_of(masks, expr).sum(),
+                 lambda: names[mask_of(masks, expr)].tolist()),
+                ('bitmap', lambda: index.count(expr), lambda: index.query(expr)),
+            )
+            for engine, count_query, names_query in engines:
+                print(f'{label:<42} {matches:>8} {engine:<14} '
+                      f'{best_ms(count_query):>9.3f} {best_ms(names_query):>9.3f}')
+
+        assert pandas_counts(masks, COUNTS_SELECTION) == index.facet_counts(COUNTS_SELECTION)
+        print(f'{"facet counts (2 facets ticked)":<42} {"":>8} {"pandas bool":<14} '
+              f'{best_ms(lambda: pandas_counts(masks, COUNTS_SELECTION)):>9.3f}')
+        print(f'{"facet counts (2 facets ticked)":<42} {"":>8} {"bitmap":<14} '
+              f'{best_ms(lambda: index.facet_counts(COUNTS_SELECTION)):>9.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Compare the hiking map payload: one Polyline per trail vs one GeoJSON layer.
+
+Builds the multi-trail map output for 10, 100 and 1,000 synthetic trails
+both ways and serialises it the way Dash does for a callback response.
+Reports build + serialise time (geometry already cached, as after
+warm-up), the response size raw and gzipped, and how many components the
+browser has to create and reconcile. Render time itself needs a browser
+and is not measured here; the component count is the proxy. Run from the
+repository root:
+
+    python benchmarks/bench_geojson.py
+    python benchmarks/bench_geojson.py --trails 10 100 1000 --points 500
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('TRAIL_DATA_WATCH_INTERVAL', '0')
+
+import dash_leaflet as dl  # noqa: E402
+from dash._utils import to_json  # noqa: E402
+
+import synthetic  # noqa: E402
+from hiking import feature_collection  # noqa: E402
+from trail_store import TrailStore  # noqa: E402
+
+
+def polylines(snapshot, trail_names):
+    """The previous output: a Polyline with a nested Tooltip per trail."""
+    colors = ['blue', 'red', 'green', 'yellow', 'purple']
+    features = []
+    for i, trail_name in enumerate(trail_names):
+        line_string = snapshot.line_string(trail_name)
+        feature = dl.Polyline(positions=list(line_string.coords), color=colors[i % len(colors)])
+        feature.children = dl.Tooltip(trail_name)
+        features.append(feature)
+    return features
+
+
+def measure(build, snapshot, trail_names):
+    payload = to_json(build(snapshot, trail_names))
+    number = max(1, 200 // len(trail_names))
+    seconds = min(timeit.repeat(lambda: to_json(build(snapshot, trail_names)), number=number, repeat=5)) / number
+    return seconds, len(payload), len(gzip.compress(payload.encode('utf-8')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the multi-trail map payload.')
+    parser.add_argument('--trails', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--points', type=int, default=500, help='track points per trail')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic.write_dataset(tmp, max(args.trails), args.points)
+        snapshot = TrailStore(os.path.join(tmp, '50_trails.csv'), os.path.join(tmp, 'trails')).current()
+        names = snapshot.trail_names
+        # Steady state: geometry parsed and GeoJSON precompiled, as after warm-up
+        for name in names:
+            snapshot.feature(name)
+
+        print(f'{"trails":>7} {"layer":<10} {"build+json ms":>14} {"payload KB":>11} {"gzip KB":>9} {"components":>11}')
+        for count in args.trails:
+            for label, build, components in (('polyline', polylines, 2 * count), ('geojson', feature_collection, 1)):
+                seconds, size, gzipped = measure(build, snapshot, names[:count])
+                print(f'{count:>7} {label:<10} {seconds * 1000:>14.2f} {size / 1024:>11.1f} '
+                      f'{gzipped / 1024:>9.1f} {components:>11}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Measure the overhead the instrumentation layer adds to callbacks.
+
+Compares a bare function with the same function under @instrument and
+span(), then a full /_dash-update-component round trip through a small
+Dash app with and without instrumentation.install(). Run from the
+repository root:
+
+    python benchmarks/bench_instrumentation.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dash  # noqa: E402
+from dash import html, Input, Output  # noqa: E402
+
+import instrumentation  # noqa: E402
+from instrumentation import instrument, span  # noqa: E402
+
+
+def work(value):
+    return [value] * 10
+
+
+def work_in_span(value):
+    with span('bench'):
+        return [value] * 10
+
+
+def per_call_us(func, number=200_000):
+    return min(timeit.repeat(lambda: func(1), number=number, repeat=5)) / number * 1e6
+
+
+def build_app(instrumented):
+    app = dash.Dash(__name__)
+    app.layout = html.Div([html.Div(id='in'), html.Div(id='out')])
+
+    def update(value):
+        return [html.Li(str(i)) for i in range(20)]
+
+    app.callback(Output('out', 'children'), Input('in', 'children'))(instrument(update) if instrumented else update)
+    if instrumented:
+        instrumentation.install(app)
+    return app
+
+
+def per_request_us(app, number=2000):
+    client = app.server.test_client()
+    body = {'output': 'out.children', 'outputs': {'id': 'out', 'property': 'children'},
+            'inputs': [{'id': 'in', 'property': 'children', 'value': 'x'}], 'changedPropIds': ['in.children']}
+    client.post('/_dash-update-component', json=body)
+    timer = lambda: client.post('/_dash-update-component', json=body)  # noqa: E731
+    return min(timeit.repeat(timer, number=number, repeat=3)) / number * 1e6
+
+
+def main():
+    bare = per_call_us(work)
+    wrapped = per_call_us(instrument(work))
+    spanned = per_call_us(work_in_span)
+    print(f'function call: bare {bare:.2f} us, @instrument {wrapped:.2f} us (+{wrapped - bare:.2f} us), '
+          f'span {spanned:.2f} us (+{spanned - bare:.2f} us)')
+
+    plain = per_request_us(build_app(instrumented=False))
+    measured = per_request_us(build_app(instrumented=True))
+    print(f'dash request: plain {plain:.1f} us, instrumented {measured:.1f} us '
+          f'(+{measured - plain:.1f} us, {(measured - plain) / plain:+.1%})')
+
+
+if __name__ == '__main__':
+    main()
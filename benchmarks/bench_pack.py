@@ -0,0 +1,128 @@
+"""Benchmark the offline trail pack export: time to first byte and peak memory.
+
+Exports one trail and the whole catalog, from the real data/ directory
+and from a synthetic dataset with uploaded photos along its trails, the
+way the /export/trails.zip endpoint does: the ETag first, then the zip
+streamed chunk by chunk. Reports time to first byte and total time from a
+fresh snapshot (GPX parsing and GeoJSON simplification included) and from
+a warm one, the pack size, and the peak Python memory (tracemalloc) of a
+warm export streamed vs the same zip built in memory before sending it.
+Run from the repository root:
+
+    python benchmarks/bench_pack.py
+    python benchmarks/bench_pack.py --trails 5000 --points 2000 --photos 1000
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('TRAIL_DATA_WATCH_INTERVAL', '0')
+
+import synthetic  # noqa: E402
+import uploads  # noqa: E402
+from trail_pack import pack_chunks, pack_contents, pack_etag  # noqa: E402
+from trail_store import TrailStore  # noqa: E402
+from uploads import UploadIndex  # noqa: E402
+
+PHOTO_BYTES = 30_000
+
+
+def stream(snapshot, names, index, photos_dir):
+    """(seconds to first chunk, total seconds, bytes) for the endpoint's work."""
+    names = names or snapshot.trail_names
+    start = time.perf_counter()
+    pack_etag(snapshot, names, index)
+    first, size = None, 0
+    for chunk in pack_chunks(pack_contents(snapshot, names, index, photos_dir)):
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    return first, time.perf_counter() - start, size
+
+
+def in_memory(snapshot, names, index, photos_dir):
+    """The same pack written whole to a BytesIO, as a non-streaming endpoint would."""
+    names = names or snapshot.trail_names
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, source in pack_contents(snapshot, names, index, photos_dir):
+            if isinstance(source, bytes):
+                archive.writestr(name, source)
+            else:
+                with open(source, 'rb') as f:
+                    archive.writestr(name, f.read())
+    return out.getvalue()
+
+
+def peak_mb(function, *args):
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def photo_index(snapshot, count, photos_dir, seed=0):
+    """Thumbnails spread over the trails' start points, stored like the upload workers store them."""
+    rng = random.Random(seed)
+    records = []
+    names = [name for name in snapshot.trail_names if snapshot.has_gpx(name)]
+    for i in range(count):
+        lat, lon = snapshot.endpoints(rng.choice(names))[0]
+        name = f'photo{i:05d}.thumb.jpg'
+        with open(os.path.join(photos_dir, name), 'wb') as f:
+            f.write(rng.randbytes(PHOTO_BYTES))
+        records.append({'id': name, 'latitude': lat, 'longitude': lon, 'timestamp': None,
+                        'image': f'{uploads.UPLOADS_URL}/{name}', 'thumbnail': f'{uploads.UPLOADS_URL}/{name}'})
+    return UploadIndex(records)
+
+
+def report(label, paths, names, index, photos_dir):
+    snapshot = TrailStore(*paths).current()
+    cold_first, cold_total, size = stream(snapshot, names, index, photos_dir)
+    # Later downloads reuse the snapshot's parsed and simplified trails
+    first, total, _ = stream(snapshot, names, index, photos_dir)
+    streamed = peak_mb(stream, snapshot, names, index, photos_dir)
+    buffered = peak_mb(in_memory, snapshot, names, index, photos_dir)
+    print(f'{label:<28} {cold_first * 1000:>9.1f} {cold_total:>9.2f} {first * 1000:>9.1f} {total:>9.2f} '
+          f'{size / 2**20:>8.2f} {streamed:>10.2f} {buffered:>10.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the streaming trail pack export.')
+    parser.add_argument('--trails', type=int, default=2000, help='trails in the synthetic dataset')
+    parser.add_argument('--points', type=int, default=2000, help='GPX points per synthetic trail')
+    parser.add_argument('--photos', type=int, default=500, help='uploaded photos in the synthetic dataset')
+    args = parser.parse_args()
+
+    print(f'{"":<28} {"cold":>19} {"warm":>19}')
+    print(f'{"export":<28} {"TTFB ms":>9} {"total s":>9} {"TTFB ms":>9} {"total s":>9} {"size MB":>8} '
+          f'{"stream MB":>10} {"buffer MB":>10}')
+    real = ('data/50_trails.csv', 'data/trails')
+    empty = UploadIndex()
+    with tempfile.TemporaryDirectory() as tmp:
+        report('data/: one trail', real, ['Lerderderg Gorge'], empty, tmp)
+        report('data/: all 50 trails', real, None, empty, tmp)
+
+        synthetic.write_dataset(tmp, args.trails, args.points)
+        paths = (os.path.join(tmp, '50_trails.csv'), os.path.join(tmp, 'trails'))
+        photos_dir = os.path.join(tmp, 'uploads')
+        os.makedirs(photos_dir)
+        snapshot = TrailStore(*paths).current()
+        index = photo_index(snapshot, args.photos, photos_dir)
+        one = [next(name for name in snapshot.trail_names if index.near(snapshot, name))]
+        report('synthetic: one trail', paths, one, index, photos_dir)
+        report(f'synthetic: all {args.trails} trails', paths, None, index, photos_dir)
+
+
+if __name__ == '__main__':
+    main()
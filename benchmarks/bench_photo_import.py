@@ -0,0 +1,109 @@
+"""Benchmark batch photo import: EXIF geotagging in the upload worker pool.
+
+Builds a batch of synthetic phone photos taken along a real trail, some
+with EXIF GPS tags and all with capture times, and imports it through
+UploadQueue with each number of worker processes: decoding, checks, EXIF
+reading and storage in the pool, then placing the untagged photos along
+the trail by capture time and one batched insert into the index. Reports
+photos/s for each pool size next to the same work done serially in this
+process, and how far the interpolated photos land from where they were
+taken. Run from the repository root:
+
+    python benchmarks/bench_photo_import.py
+    python benchmarks/bench_photo_import.py --photos 500 --workers 1 2 4 8 --geotagged 0.1
+"""
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('TRAIL_DATA_WATCH_INTERVAL', '0')
+
+import numpy as np  # noqa: E402
+
+import synthetic  # noqa: E402
+from trail_store import store  # noqa: E402
+from uploads import UploadIndex, UploadQueue, place_along_trail, process_upload  # noqa: E402
+
+TRAIL_NAME = 'Wilsons Promontory Circuit'
+
+
+def photo_batch(coords, count, geotagged, n_bytes, seed):
+    """Data URLs of photos spread evenly along the trail over a day's walk, and where each was taken."""
+    points = np.asarray(coords)
+    along = np.r_[0.0, np.cumsum(np.hypot(np.diff(points[:, 0]) * 111.32,
+                                          np.diff(points[:, 1]) * 111.32 * np.cos(np.radians(points[0, 0]))))]
+    every = max(1, round(1 / geotagged)) if geotagged else count + 1
+    files, taken = [], []
+    for i in range(count):
+        fraction = i / max(1, count - 1)
+        latitude = float(np.interp(fraction * along[-1], along, points[:, 0]))
+        longitude = float(np.interp(fraction * along[-1], along, points[:, 1]))
+        minutes = round(fraction * 8 * 60)
+        timestamp = f'2024-03-02T{8 + minutes // 60:02d}:{minutes % 60:02d}:00'
+        tagged = i % every == 0 or i == count - 1
+        data = synthetic.jpeg_bytes(n_bytes, seed + i, latitude if tagged else None,
+                                    longitude if tagged else None, timestamp)
+        files.append('data:image/jpeg;base64,' + base64.b64encode(data).decode('ascii'))
+        taken.append((latitude, longitude))
+    return files, taken
+
+
+def serial_import(files, coords, directory):
+    records = [process_upload(None, contents, directory) for contents in files]
+    place_along_trail(records, coords)
+    UploadIndex(records)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batch photo import.')
+    parser.add_argument('--photos', type=int, default=500)
+    parser.add_argument('--photo-bytes', type=int, default=500_000, help='size of each photo')
+    parser.add_argument('--geotagged', type=float, default=0.1, help='share of photos with EXIF GPS')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    coords = store.current().line_string(TRAIL_NAME).coords
+    print(f'{os.cpu_count()} CPUs; {args.photos} photos of {args.photo_bytes / 1e3:.0f} KB, '
+          f'{args.geotagged:.0%} geotagged, along {TRAIL_NAME}')
+    print(f'{"workers":>8} {"seconds":>8} {"photos/s":>9} {"added":>6}')
+    # Fresh photo bytes per run so the content-addressed store never already has them
+    seed = int(time.time())
+    files, taken = photo_batch(coords, args.photos, args.geotagged, args.photo_bytes, seed)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        records = serial_import(files, coords, directory)
+        elapsed = time.perf_counter() - start
+        print(f'{"serial":>8} {elapsed:>8.2f} {args.photos / elapsed:>9.1f} {len(records):>6}')
+
+    for workers in args.workers:
+        seed += args.photos
+        files, taken = photo_batch(coords, args.photos, args.geotagged, args.photo_bytes, seed)
+        with tempfile.TemporaryDirectory() as directory:
+            queue = UploadQueue(UploadIndex(), workers, directory)
+            queue.start()
+            start = time.perf_counter()
+            job_id = queue.submit(files, TRAIL_NAME)
+            while not queue.status([job_id])[0]['finished']:
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            status = queue.status([job_id])[0]
+            queue.shutdown()
+            print(f'{workers:>8} {elapsed:>8.2f} {args.photos / elapsed:>9.1f} {status["added"]:>6}')
+
+    placed = [(record, where) for record, where in zip(queue.index.records, taken)
+              if record['located'] == 'capture time']
+    errors = [np.hypot((record['latitude'] - latitude) * 111.32, (record['longitude'] - longitude) * 88.0) * 1000
+              for record, (latitude, longitude) in placed]
+    if errors:
+        print(f'{len(placed)} photos placed by capture time: median {np.median(errors):.0f} m, '
+              f'max {max(errors):.0f} m from where they were taken')
+
+
+if __name__ == '__main__':
+    main()
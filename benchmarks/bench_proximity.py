@@ -0,0 +1,89 @@
+"""Benchmark the trails-within-radius graph: grid build vs brute force, and queries.
+
+Generates start/end points for a synthetic catalog and builds the
+ProximityGraph on its spatial grid. Reports build time, edge count and
+CSR size, the brute-force all-pairs time extrapolated from a sample, and
+the per-request cost of the detail page's neighbour list and the hiking
+results' neighbour counts. ``--layout uniform`` spreads trailheads over
+Victoria (about 0.4 trails per km2 at 100k); ``regions`` packs them into
+the nine clusters benchmarks/synthetic.py uses, which is far denser than
+any real catalog and shows how the per-trail cap bounds the graph. Run
+from the repository root:
+
+    python benchmarks/bench_proximity.py
+    python benchmarks/bench_proximity.py --trails 10000 100000 --radius 5 10 --layout regions
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+import synthetic  # noqa: E402
+from proximity import MAX_NEARBY, ProximityGraph, _planar_km  # noqa: E402
+
+# Victoria's bounding box: south, west, north, east
+VICTORIA = (-39.1, 141.0, -34.0, 150.0)
+SAMPLE = 200
+
+
+def trail_endpoints(count, layout, seed=0):
+    rng = np.random.default_rng(seed)
+    if layout == 'regions':
+        regions = np.array([(lat, lon, spread) for _, lat, lon, spread in synthetic.REGIONS])
+        region = regions[rng.integers(len(regions), size=count)]
+        starts = region[:, :2] + rng.uniform(-1, 1, (count, 2)) * region[:, 2:]
+    else:
+        south, west, north, east = VICTORIA
+        starts = np.column_stack([rng.uniform(south, north, count), rng.uniform(west, east, count)])
+    # One-way trails end a few km away, loops end where they start
+    ends = starts + rng.normal(0, 0.04, (count, 2)) * (rng.random((count, 1)) < 0.4)
+    return [[tuple(start), tuple(end)] for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+def brute_force_seconds(endpoints, radius):
+    """All-pairs endpoint distances for a sample of trails, scaled to the whole catalog."""
+    points = np.array(endpoints).reshape(-1, 2)
+    x, y = _planar_km(points[:, 0], points[:, 1])
+    rows = np.arange(min(SAMPLE, len(endpoints)) * 2)
+    start = time.perf_counter()
+    distances = np.hypot(x[rows, None] - x[None, :], y[rows, None] - y[None, :])
+    (distances <= radius).nonzero()
+    return (time.perf_counter() - start) * len(points) / len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the trail proximity graph.')
+    parser.add_argument('--trails', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--radius', type=float, nargs='+', default=[10.0])
+    parser.add_argument('--layout', choices=['uniform', 'regions'], default='uniform')
+    parser.add_argument('--limit', type=int, default=MAX_NEARBY, help='neighbours kept per trail')
+    args = parser.parse_args()
+
+    print(f'{"trails":>8} {"km":>5} {"build s":>8} {"brute s":>8} {"edges":>10} {"capped":>7} '
+          f'{"CSR MB":>7} {"nearby us":>10} {"counts 100 us":>14}')
+    for count in args.trails:
+        endpoints = trail_endpoints(count, args.layout)
+        for radius in args.radius:
+            start = time.perf_counter()
+            graph = ProximityGraph.build(endpoints, radius, args.limit)
+            build = time.perf_counter() - start
+            degrees = np.diff(graph.indptr)
+            size = (graph.indptr.nbytes + graph.indices.nbytes + graph.distances.nbytes) / 2**20
+            id = int(np.argmax(degrees))
+            ids = list(range(0, count, max(1, count // 100)))[:100]
+            number = 2000
+            nearby = min(timeit.repeat(lambda: graph.nearby(id), number=number, repeat=5)) / number
+            counts = min(timeit.repeat(lambda: [graph.degree(other) for other in ids], number=200, repeat=5)) / 200
+            print(f'{count:>8} {radius:>5g} {build:>8.2f} {brute_force_seconds(endpoints, radius):>8.1f} '
+                  f'{len(graph.indices):>10,} {np.mean(degrees == args.limit):>7.1%} {size:>7.1f} '
+                  f'{nearby * 1e6:>10.1f} {counts * 1e6:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Measure trail data hot-reload swaps and request latency around them.
+
+Copies data/ into a temporary directory, serves simulated requests from
+reader threads against a TrailStore pointed at the copy, and keeps editing
+the CSV and GPX files while reloading. Afterwards checks that removing a
+trail's GPX file takes it out of the nearby-trails graph on the next
+reload. Run from the repository root:
+
+    python benchmarks/bench_reload.py --seconds 10 --readers 4
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from proximity import proximity_graph  # noqa: E402
+from trail_store import TrailStore  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def simulated_request(store, trail_name):
+    # Roughly what update_filtered_trails does per trail
+    snapshot = store.current()
+    distances = snapshot.catalog.column('distance')
+    matches = snapshot.catalog.names_of(((distances >= 5) & (distances <= 15)).nonzero()[0].tolist())
+    coords = list(snapshot.line_string(trail_name).coords)
+    return len(matches) + len(coords)
+
+
+def reader(store, trail_names, stop, samples, reloading):
+    i = 0
+    while not stop.is_set():
+        trail_name = trail_names[i % len(trail_names)]
+        i += 1
+        start = time.perf_counter()
+        simulated_request(store, trail_name)
+        samples.append((reloading.is_set(), time.perf_counter() - start))
+
+
+def check_gpx_removal(store, trails_dir):
+    """Delete the GPX of a trail with neighbours, reload and confirm the graph no longer links it."""
+    snapshot = store.current()
+    graph = proximity_graph(snapshot)
+    trail_name = next(name for name in snapshot.trail_names if graph.degree(snapshot.catalog.id(name)))
+    os.remove(os.path.join(trails_dir, f'{trail_name}.gpx'))
+    store.reload()
+    reloaded = store.current()
+    id = reloaded.catalog.id(trail_name)
+    assert not reloaded.has_gpx(trail_name)
+    assert proximity_graph(reloaded) is not graph, 'nearby-trails graph survived a GPX reload'
+    assert proximity_graph(reloaded).degree(id) == 0, f'{trail_name} still has nearby trails without a GPX'
+    print(f'GPX removal: {trail_name} dropped from the nearby-trails graph after reload')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--data-dir', default='data')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = os.path.join(tmp, '50_trails.csv')
+        trails_dir = os.path.join(tmp, 'trails')
+        shutil.copy(os.path.join(args.data_dir, '50_trails.csv'), catalog_path)
+        shutil.copytree(os.path.join(args.data_dir, 'trails'), trails_dir)
+
+        store = TrailStore(catalog_path, trails_dir)
+        snapshot = store.current()
+        trail_names = [name for name in snapshot.trail_names if snapshot.has_gpx(name)]
+        for name in trail_names:
+            snapshot.line_string(name)
+
+        stop = threading.Event()
+        reloading = threading.Event()
+        samples = []
+        threads = [threading.Thread(target=reader, args=(store, trail_names, stop, samples, reloading))
+                   for _ in range(args.readers)]
+        for thread in threads:
+            thread.start()
+
+        deadline = time.time() + args.seconds
+        step = 0
+        while time.time() < deadline:
+            time.sleep(0.2)
+            # Alternate between a catalog edit and a single GPX edit
+            if step % 2 == 0:
+                path = catalog_path
+            else:
+                path = os.path.join(trails_dir, f'{trail_names[step % len(trail_names)]}.gpx')
+            with open(path, 'a') as f:
+                f.write('\n')
+            reloading.set()
+            store.reload()
+            reloading.clear()
+            step += 1
+
+        stop.set()
+        for thread in threads:
+            thread.join()
+        check_gpx_removal(store, trails_dir)
+
+    swaps = [d * 1000 for d in store.swap_durations]
+    steady = [d * 1000 for during, d in samples if not during]
+    during = [d * 1000 for during, d in samples if during]
+    print(f'swaps: {len(swaps)}  median {statistics.median(swaps):.2f} ms  max {max(swaps):.2f} ms')
+    for label, values in (('steady', steady), ('during reload', during)):
+        print(f'{label:>14}: n={len(values):<7} p50 {percentile(values, 50):.3f} ms  '
+              f'p95 {percentile(values, 95):.3f} ms  p99 {percentile(values, 99):.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
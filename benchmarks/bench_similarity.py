@@ -0,0 +1,75 @@
+"""Benchmark the "similar trails" index: build time, recall and lookup latency.
+
+Builds the SimilarityIndex for a synthetic catalog with synthetic start
+points and reports the time of each build stage, the memory of the stored
+neighbour table, recall@k against exact brute-force neighbours for a
+sample of trails (and what brute force would cost for the whole catalog),
+and the per-request lookup the detail page does. Run from the repository
+root:
+
+    python benchmarks/bench_similarity.py
+    python benchmarks/bench_similarity.py --trails 1000 100000 --trees 4 8
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+import synthetic  # noqa: E402
+from similarity import TOP_K, SimilarityIndex, feature_vectors, nearest_neighbours  # noqa: E402
+from trail_catalog import TrailCatalog  # noqa: E402
+
+SAMPLE = 500
+
+
+def exact_neighbours(vectors, rows, k):
+    squares = np.einsum('ij,ij->i', vectors, vectors)
+    distances = squares[rows, None] + squares[None, :] - 2 * vectors[rows] @ vectors.T
+    distances[np.arange(len(rows)), rows] = np.inf
+    return np.argpartition(distances, k, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the trail similarity index.')
+    parser.add_argument('--trails', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--trees', type=int, nargs='+', default=[8])
+    args = parser.parse_args()
+
+    print(f'{"trails":>8} {"trees":>6} {"features s":>11} {"neighbours s":>13} {"recall@k":>9} '
+          f'{"brute force s":>14} {"table MB":>9} {"lookup us":>10}')
+    for count in args.trails:
+        catalog = TrailCatalog.from_frame(synthetic.trail_catalog(count))
+        starts = [synthetic.track_points(1, seed=i)[0][:2] for i in range(count)]
+        start = time.perf_counter()
+        vectors = feature_vectors(catalog, starts)
+        features = time.perf_counter() - start
+
+        rows = np.random.default_rng(1).choice(count, min(SAMPLE, count), replace=False)
+        start = time.perf_counter()
+        exact = exact_neighbours(vectors, rows, TOP_K)
+        # Brute force over every trail, extrapolated from the sample
+        brute_force = (time.perf_counter() - start) * count / len(rows)
+
+        for trees in args.trees:
+            start = time.perf_counter()
+            index = SimilarityIndex(*nearest_neighbours(vectors, trees=trees))
+            neighbours = time.perf_counter() - start
+            assert not (index.neighbours == np.arange(count)[:, None]).any()
+            recall = np.mean([len(set(exact[i]) & set(index.neighbours[row])) / TOP_K for i, row in enumerate(rows)])
+            table = (index.neighbours.nbytes + index.distances.nbytes) / 2**20
+            name = catalog.names[count // 2]
+            number = 2000
+            lookup = min(timeit.repeat(lambda: catalog.trails(index.similar(catalog.id(name), 3)),
+                                       number=number, repeat=5)) / number
+            print(f'{count:>8} {trees:>6} {features:>11.2f} {neighbours:>13.2f} {recall:>9.3f} '
+                  f'{brute_force:>14.1f} {table:>9.1f} {lookup * 1e6:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Benchmark the map tile cache: hit rate, upstream requests and tile latency.
+
+Starts a local stand-in tile server that answers every tile after a fixed
+delay, like a distant public tile server, and the /tiles proxy in front of
+it. Simulated users then open trail maps, popular trails more often than
+the rest, and fetch the tiles Leaflet would load for each page's map and
+the first zoom in. Three runs over the same visits: browsers fetching
+straight from upstream, the proxy starting empty, and the proxy after
+prefetching every trail's tiles. Reports tile latency, hit rate, misses
+coalesced onto another user's fetch and requests that reached upstream.
+Run from the repository root:
+
+    python benchmarks/bench_tiles.py
+    python benchmarks/bench_tiles.py --users 20 --visits 400 --latency 0.1
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('TRAIL_DATA_WATCH_INTERVAL', '0')
+
+from flask import Flask  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+import all_trails  # noqa: E402
+import hiking  # noqa: E402
+import my_trails  # noqa: E402
+import synthetic  # noqa: E402
+import tile_cache  # noqa: E402
+from loadtest import percentile  # noqa: E402
+from trail_store import store  # noqa: E402
+
+MAP_SIZES = [all_trails.MAP_SIZE, hiking.MAP_SIZE, my_trails.MAP_SIZE]
+TILE_BYTES = 20_000
+
+
+def stand_in_server(port, latency, max_age):
+    """A tile server on ``port`` answering each tile after ``latency`` seconds; returns (server, counter)."""
+    served = {'requests': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                served['requests'] += 1
+            time.sleep(latency)
+            body = synthetic.png_bytes(TILE_BYTES, hash(self.path) & 0xffff)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', f'max-age={max_age}')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, served
+
+
+def proxy_server(port, cache):
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app = Flask(__name__)
+    app.add_url_rule(tile_cache.TILE_URL, 'map_tile', tile_cache.tile_view)
+    tile_cache.cache = cache
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def visits(trail_names, count, seed):
+    """Trails opened by users, a few popular ones most of the time (Zipf-like)."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(trail_names))]
+    return rng.choices(trail_names, weights, k=count)
+
+
+def browse(base_url, tiles_by_trail, visit_list, users):
+    """Open each visited trail's maps from ``users`` concurrent browsers; returns tile latencies."""
+    latencies = []
+    lock = threading.Lock()
+
+    def open_trail(name):
+        # A browser loads a map's tiles over a few parallel connections
+        def fetch(tile):
+            start = time.perf_counter()
+            with urllib.request.urlopen(base_url.format(z=tile[0], x=tile[1], y=tile[2])) as response:
+                response.read()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+        with ThreadPoolExecutor(6) as tiles:
+            list(tiles.map(fetch, tiles_by_trail[name]))
+
+    with ThreadPoolExecutor(users) as browsers:
+        list(browsers.map(open_trail, visit_list))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the map tile cache.')
+    parser.add_argument('--users', type=int, default=10, help='concurrent users')
+    parser.add_argument('--visits', type=int, default=200, help='trail maps opened in total')
+    parser.add_argument('--latency', type=float, default=0.08, help='seconds the stand-in server takes per tile')
+    parser.add_argument('--max-age', type=int, default=86400, help='max-age the stand-in server sends')
+    parser.add_argument('--port', type=int, default=18060, help='first of two local ports')
+    args = parser.parse_args()
+
+    snapshot = store.current()
+    names = [name for name in snapshot.trail_names if snapshot.has_gpx(name)]
+    tiles_by_trail = {name: sorted(tile_cache.trail_tiles(snapshot.bbox(name), MAP_SIZES)) for name in names}
+    visit_list = visits(names, args.visits, seed=0)
+    upstream, served = stand_in_server(args.port, args.latency, args.max_age)
+    upstream_url = f'http://127.0.0.1:{args.port}/{{z}}/{{x}}/{{y}}.png'
+    proxy_url = f'http://127.0.0.1:{args.port + 1}/tiles/{{z}}/{{x}}/{{y}}.png'
+    distinct = len(set().union(*(tiles_by_trail[name] for name in visit_list)))
+    print(f'{len(visit_list)} trail maps opened by {args.users} users: '
+          f'{sum(len(tiles_by_trail[name]) for name in visit_list)} tile requests, {distinct} distinct tiles; '
+          f'upstream answers in {args.latency * 1000:.0f} ms')
+    print(f'{"":<22} {"p50 ms":>8} {"p95 ms":>8} {"hit rate":>9} {"coalesced":>10} {"upstream":>9} {"prefetch s":>11}')
+
+    def row(label, latencies, cache, upstream_requests, prefetch_seconds=None):
+        hit_rate = f'{cache.hit_rate():.1%}' if cache else '-'
+        coalesced = cache.stats['coalesced'] if cache else '-'
+        prefetched = f'{prefetch_seconds:.1f}' if prefetch_seconds is not None else '-'
+        print(f'{label:<22} {percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} '
+              f'{hit_rate:>9} {coalesced:>10} {upstream_requests:>9} {prefetched:>11}')
+
+    latencies = browse(upstream_url, tiles_by_trail, visit_list, args.users)
+    row('direct to upstream', latencies, None, served['requests'])
+
+    for label, warm in (('proxy, empty cache', False), ('proxy, prefetched', True)):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = tile_cache.TileCache(directory, upstream_url)
+            proxy = proxy_server(args.port + 1, cache)
+            prefetch_seconds = None
+            if warm:
+                start = time.perf_counter()
+                tile_cache.prefetch(cache, snapshot, names, MAP_SIZES)
+                prefetch_seconds = time.perf_counter() - start
+                cache.stats = dict.fromkeys(cache.stats, 0)
+            served['requests'] = 0
+            latencies = browse(proxy_url, tiles_by_trail, visit_list, args.users)
+            row(label, latencies, cache, served['requests'], prefetch_seconds)
+            proxy.shutdown()
+    upstream.shutdown()
+
+
+if __name__ == '__main__':
+    main()
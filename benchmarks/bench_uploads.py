@@ -0,0 +1,114 @@
+"""Benchmark photo uploads: request latency and processing throughput.
+
+Starts the app locally (or targets --url) and drives the my_trails.py
+upload callbacks the way the page does: handle_upload queues the files
+and returns, then poll_uploads is called until the worker processes have
+finished. Reports, for one large upload, how long the upload request
+holds its connection and how long until the photo is on the map, next to
+the same processing run synchronously in the request as it used to be;
+then a burst of uploads from concurrent users, as photos processed per
+second. Run from the repository root:
+
+    python benchmarks/bench_uploads.py
+    python benchmarks/bench_uploads.py --large-bytes 10000000 --burst 100 --users 10
+"""
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from loadtest import Client, Stats, percentile, start_server, wait_for_uploads  # noqa: E402
+from uploads import process_upload  # noqa: E402
+
+POSITION = {'lat': -39.03112, 'lon': 146.32135}
+POLL_SECONDS = 0.05
+
+
+def data_url(n_bytes, seed):
+    return 'data:image/png;base64,' + base64.b64encode(synthetic.png_bytes(n_bytes, seed)).decode('ascii')
+
+
+def upload(client, contents):
+    """(request seconds, seconds until processed, ok) for one handle_upload call."""
+    values = {'upload-image.contents': contents, 'upload-image.filename': ['find.png'] * len(contents),
+              'device-location.data': {'position': POSITION, 'local_date': '2024-04-01T10:00:00'},
+              'upload-jobs.data': [], 'upload-version.data': None}
+    start = time.perf_counter()
+    data = client.callback('my_trails', 'handle_upload', 'upload-status.children', values, ['upload-image.contents'])
+    request = time.perf_counter() - start
+    ok = wait_for_uploads(client, values, data, poll=POLL_SECONDS)
+    return request, time.perf_counter() - start, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark queued photo uploads.')
+    parser.add_argument('--large-bytes', type=int, default=10_000_000, help='size of the single large upload')
+    parser.add_argument('--burst', type=int, default=100, help='uploads in the burst')
+    parser.add_argument('--burst-bytes', type=int, default=500_000, help='size of each upload in the burst')
+    parser.add_argument('--users', type=int, default=10, help='concurrent users sending the burst')
+    parser.add_argument('--url', help='use an already running server, e.g. http://127.0.0.1:8050')
+    parser.add_argument('--port', type=int, default=18051, help='port for the locally started server')
+    args = parser.parse_args()
+
+    process, url = None, args.url
+    if url is None:
+        process, url = start_server(args.port, 'client')
+    try:
+        stats = Stats()
+        client = Client(url, stats)
+        client.open_page('/my-trail')
+        # Seeds are offset per run so the content-addressed store never already has the photo
+        seed = int(time.time())
+        large = data_url(args.large_bytes, seed)
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory() as directory:
+            process_upload(None, large, directory)
+        inline = time.perf_counter() - start
+        request, processed, ok = upload(client, [data_url(args.large_bytes, seed + 1)])
+        print(f'{args.large_bytes / 1e6:.0f} MB upload: request {request * 1000:.0f} ms, on the map after '
+              f'{processed * 1000:.0f} ms{"" if ok else " (failed)"}; processed in the request, it would '
+              f'hold the connection for about {(request + inline) * 1000:.0f} ms')
+
+        burst = [data_url(args.burst_bytes, seed + 2 + i) for i in range(args.burst)]
+        results = []
+        lock = threading.Lock()
+
+        def user(index):
+            user_client = Client(url, stats)
+            user_client.open_page('/my-trail')
+            for contents in burst[index::args.users]:
+                result = upload(user_client, [contents])
+                with lock:
+                    results.append(result)
+
+        threads = [threading.Thread(target=user, args=(index,)) for index in range(args.users)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        requests = [request for request, _, _ in results]
+        processed = [seconds for _, seconds, _ in results]
+        failed = sum(1 for _, _, ok in results if not ok)
+        print(f'burst of {args.burst} x {args.burst_bytes / 1e3:.0f} KB from {args.users} users: '
+              f'{args.burst / elapsed:.1f} photos/s, {failed} failed')
+        print(f'{"":<24} {"p50 ms":>9} {"p95 ms":>9} {"max ms":>9}')
+        for label, values in (('upload request', requests), ('until processed', processed)):
+            print(f'{label:<24} {percentile(values, 50) * 1000:>9.0f} {percentile(values, 95) * 1000:>9.0f} '
+                  f'{max(values) * 1000:>9.0f}')
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
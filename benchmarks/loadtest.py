@@ -0,0 +1,519 @@
+"""Replay realistic user sessions against the Dash callback endpoint.
+
+Starts the app locally (or targets a server given with --url), then runs
+virtual users that each loop over session scripts: browsing /all-trails
+and a trail page, the hiking.py dropdown and slider search, and the
+my_trails.py geolocation and upload flow. Requests go to
+/_dash-update-component exactly as the browser sends them, with bodies
+built from the app's own /_dash-dependencies. External CDN assets in the
+page are never fetched; they are counted as stubbed, so no network is
+needed.
+
+The hiking slider search runs the way the browser does in the chosen
+--hiking-filter mode: 'client' fetches the columnar catalog once (then
+revalidates it with its ETag) and filters locally, 'server' sends every
+query. Compare the "requests per session" lines and the "hiking slider
+search" interaction latency between the two.
+
+Every map callback response is also checked for framing: the viewport's
+fitted zoom is compared with the fixed zoom 12 the maps used to open at
+around a centroid, counting the zoom steps (and the tiles they load) a
+user would have needed to bring the whole trail into view.
+
+    python benchmarks/loadtest.py --users 8 --seconds 30
+    python benchmarks/loadtest.py --sessions hiking_search --users 16 --json out.json
+    python benchmarks/loadtest.py --sessions hiking_search --hiking-filter server
+"""
+import argparse
+import base64
+import csv
+import http.client
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from framing import TILE_SIZE  # noqa: E402
+
+# How the maps were framed before fit-to-bounds: the centroid at zoom 12
+CENTROID_ZOOM = 12
+
+SERVER_SNIPPET = (
+    'import sys, app; from werkzeug.serving import run_simple; '
+    'run_simple("127.0.0.1", int(sys.argv[1]), app.server, threaded=True)'
+)
+
+TRAIL_NAMES = [
+    'Lerderderg Gorge', 'Mount Cannibal', 'Werribee Gorge Circuit', 'Sherbrooke Falls',
+    'You Yangs Circuit - Flinders Peak', 'Wilsons Promontory Circuit', 'The Pinnacle',
+    'Alpine National Park - Butcher Country Track',
+]
+
+
+with open(os.path.join(ROOT, 'data', '50_trails.csv'), encoding='utf-8') as f:
+    TRAIL_ROWS = list(csv.DictReader(f))
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sessions = 0
+        self.session_requests = defaultdict(list)
+        self.framing_steps = []
+        self.stubbed_assets = 0
+
+    def record_framing(self, data, map_id, map_size):
+        """Zoom steps centroid framing would have needed for this map response."""
+        try:
+            view = json.loads(data)['response'][map_id]['viewport']
+        except (TypeError, ValueError, KeyError):
+            return
+        if 'zoom' in view:
+            with self._lock:
+                self.framing_steps.append((abs(CENTROID_ZOOM - view['zoom']), map_size))
+
+    def record(self, label, seconds, ok):
+        with self._lock:
+            self.latencies[label].append(seconds)
+            if not ok:
+                self.errors[label] += 1
+
+
+def component_ids(node):
+    """Ids of the components in decoded layout JSON; pattern-matching ids are left out."""
+    ids = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if 'namespace' in node and isinstance(node.get('props', {}).get('id'), str):
+                ids.add(node['props']['id'])
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return ids
+
+
+class Client:
+    """One virtual user: a keep-alive connection, the app's dependency map and the components on its page."""
+
+    def __init__(self, url, stats):
+        self.url = urlsplit(url)
+        self.stats = stats
+        self.connection = None
+        self.dependencies = {}
+        self.current_page = None
+        self.app_components = set()
+        self.rendered = set()
+        self.requests = 0
+        self.catalog = None
+        self.catalog_etag = None
+
+    def request(self, method, path, label, body=None, headers=None):
+        self.requests += 1
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.url.hostname, self.url.port, timeout=60)
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            ok = response.status < 400
+            self.last_headers = response.headers
+        except (OSError, http.client.HTTPException):
+            self.connection = None
+            data, ok = b'', False
+        self.stats.record(label, time.perf_counter() - start, ok)
+        return data
+
+    def load_catalog(self):
+        """The hiking catalog, revalidated with its ETag like the browser's HTTP cache does."""
+        headers = {'If-None-Match': self.catalog_etag} if self.catalog_etag else {}
+        data = self.request('GET', '/hiking/catalog', 'GET hiking catalog', headers=headers)
+        if data:
+            catalog = json.loads(data)
+            for column, typecode in (('distance', 'd'), ('max_elevation', 'd'), ('duration', 'd'), ('loop', 'B')):
+                catalog[column] = array(typecode, base64.b64decode(catalog[column]))
+            self.catalog = catalog
+            self.catalog_etag = self.last_headers.get('ETag')
+        return self.catalog
+
+    def open_page(self, path):
+        """A full page load: index, layout, dependencies, static files and the page router."""
+        html = self.request('GET', path, 'GET page').decode('utf-8', 'replace')
+        layout = self.request('GET', '/_dash-layout', 'GET layout')
+        try:
+            self.app_components = component_ids(json.loads(layout))
+        except ValueError:
+            self.app_components = set()
+        self.rendered = set(self.app_components)
+        dependencies = self.request('GET', '/_dash-dependencies', 'GET dependencies')
+        try:
+            self.dependencies = {dep['output']: dep for dep in json.loads(dependencies)}
+        except ValueError:
+            self.dependencies = {}
+        # Same-origin scripts and styles are fetched, CDN ones are stubbed out
+        for url in re.findall(r'(?:src|href)="([^"]+\.(?:js|css)[^"]*)"', html):
+            if url.startswith(('http://', 'https://', '//')):
+                self.stats.stubbed_assets += 1
+            else:
+                self.request('GET', url, 'GET static')
+        self.current_page = None
+        self.navigate(path)
+
+    def navigate(self, path):
+        """Client-side navigation, as a dcc.Link click does."""
+        values = {'url.pathname': path, 'current-page.data': self.current_page}
+        data = self.callback('app', 'display_page', 'page-content.children', values, ['url.pathname'])
+        try:
+            response = json.loads(data)['response']
+            self.current_page = response['current-page']['data']
+            # A new page replaces everything under page-content
+            self.rendered = self.app_components | component_ids(response['page-content'])
+        except (TypeError, ValueError, KeyError):
+            pass
+
+    def callback(self, page, label, output, values, changed):
+        """Fire the callback whose output matches, taking input/state values from ``values``.
+
+        Fails without a request when one of its inputs or states isn't on
+        the page, as the browser's renderer refuses to fire it then.
+        """
+        dependency = next((dep for key, dep in self.dependencies.items()
+                           if output in key.strip('.').split('...')), None)
+        if dependency is None or any(not dep['id'].startswith('{') and dep['id'] not in self.rendered
+                                     for dep in dependency['inputs'] + dependency['state']):
+            self.stats.record(f'{page} {label}', 0.0, False)
+            return None
+        key = dependency['output']
+        outputs = [dict(zip(('id', 'property'), part.rsplit('.', 1))) for part in key.strip('.').split('...')]
+        body = {
+            'output': key,
+            'outputs': outputs if key.startswith('..') else outputs[0],
+            'inputs': [dict(dep, value=values.get(f'{dep["id"]}.{dep["property"]}')) for dep in dependency['inputs']],
+            'state': [dict(dep, value=values.get(f'{dep["id"]}.{dep["property"]}')) for dep in dependency['state']],
+            'changedPropIds': changed,
+        }
+        data = self.request('POST', '/_dash-update-component', f'{page} {label}', body)
+        if data:
+            # Components a callback returns, like dcc.Geolocation, can be used from then on
+            try:
+                self.rendered |= component_ids(json.loads(data))
+            except ValueError:
+                pass
+        return data
+
+
+def trail_path(trail_name):
+    return '/' + trail_name.replace(' ', '-')
+
+
+def all_trails_browse(client, rng):
+    client.open_page('/all-trails')
+    page = {'url.pathname': '/all-trails', 'trail-search-dropdown.value': None}
+    client.callback('all_trails', 'update_background_images', 'mountain-backgrounds.children', page, ['url.pathname'])
+    client.callback('all_trails', 'toggle_search_visibility', 'trail-search-dropdown.style', page, ['url.pathname'])
+    client.callback('all_trails', 'update_trail_info', 'trail-cards-row.children', page, ['url.pathname'])
+
+    trail_name = rng.choice(TRAIL_NAMES)
+    page['trail-search-dropdown.value'] = trail_name
+    client.callback('all_trails', 'update_trail_info', 'trail-cards-row.children', page, ['trail-search-dropdown.value'])
+
+    page = {'url.pathname': trail_path(trail_name), 'trail-search-dropdown.value': trail_name, 'trail-map.zoom': 12}
+    client.navigate(trail_path(trail_name))
+    client.callback('all_trails', 'update_trail_info', 'trail-cards-row.children', page, ['url.pathname'])
+    data = client.callback('all_trails', 'update_map', 'trail-layer.children', page, ['url.pathname'])
+    client.stats.record_framing(data, 'trail-map', (900, 500))
+    client.callback('all_trails', 'display_image_marker', 'image-layer.children', page, ['url.pathname'])
+    client.callback('all_trails', 'update_background_images', 'mountain-backgrounds.children', page, ['url.pathname'])
+    client.callback('all_trails', 'toggle_search_visibility', 'trail-search-dropdown.style', page, ['url.pathname'])
+
+
+def hiking_search(client, rng):
+    client.open_page('/hiking')
+    trail_name = rng.choice(TRAIL_NAMES)
+    for i in range(1, 4):
+        values = {'trail-dropdown.search_value': trail_name[:i]}
+        client.callback('hiking', 'update_trail_list', 'trail-dropdown.options', values, ['trail-dropdown.search_value'])
+
+    # Dropdown search: the clientside callback passes the selection straight through
+    shown = {'names': [trail_name]}
+    data = client.callback('hiking', 'update_filtered_trails', 'filtered-trails.children',
+                           {'hiking-matches.data': shown}, ['hiking-matches.data'])
+    client.stats.record_framing(data, 'hiking-map', (400, 500))
+
+    # Facet tick: live counts come back with the facet filter for the slider search
+    row = rng.choice(TRAIL_ROWS)
+    season = rng.choice(['spring', 'summer', 'autumn', 'winter'])
+    values = {'season-facet.value': [season], 'attraction-facet.value': [], 'drive-facet.value': '',
+              'loop-radio.value': row['loop'], 'hiking-filter.data': {'mode': client.hiking_filter}}
+    data = client.callback('hiking', 'update_facets', 'hiking-facets.data', values, ['season-facet.value'])
+    facets = json.loads(data)['response']['hiking-facets']['data'] if data else None
+
+    # Slider search: a few nudges around a real trail's attributes
+    catalog = None
+    for _ in range(SLIDER_SEARCHES):
+        query = {
+            'distance': max(0, round(float(row['distance']) + rng.uniform(-6, 6))),
+            'elevation': max(0, round(float(row['max_elevation']) + rng.uniform(-400, 400))),
+            'duration': max(0.0, round(2 * (float(row['duration']) + rng.uniform(-0.75, 0.75))) / 2),
+            'loop': row['loop'] if rng.random() < 0.8 else rng.choice(['closed loop', 'one way']),
+        }
+        start = time.perf_counter()
+        if client.hiking_filter == 'client':
+            # Fetched on the first slider search after a page load, a 304 after that
+            catalog = catalog or client.load_catalog()
+            matches = {'names': client_filter(catalog, **query)} if catalog else None
+            if matches and facets:
+                allowed = set(facets['names'])
+                matches['names'] = [name for name in matches['names'] if name in allowed]
+        else:
+            matches = None
+        if matches is None:
+            matches = {'query': dict(query, facets=facets['expression'] if facets else None)}
+        if matches != shown:
+            data = client.callback('hiking', 'update_filtered_trails', 'filtered-trails.children',
+                                   {'hiking-matches.data': matches}, ['hiking-matches.data'])
+            client.stats.record_framing(data, 'hiking-map', (400, 500))
+            shown = matches
+        client.stats.record('hiking slider search', time.perf_counter() - start, True)
+
+
+SLIDER_SEARCHES = 5
+
+
+def client_filter(catalog, distance, elevation, duration, loop):
+    """Python twin of matchTrails in assets/app.js."""
+    loop_code = catalog['loops'].index(loop) if loop in catalog['loops'] else -1
+    return [name for i, name in enumerate(catalog['names'])
+            if distance - 5 <= catalog['distance'][i] <= distance + 5
+            and elevation - 300 <= catalog['max_elevation'][i] <= elevation + 300
+            and duration - 0.5 <= catalog['duration'][i] <= duration + 0.5
+            and catalog['loop'][i] == loop_code]
+
+
+def my_trails_upload(client, rng, upload=None):
+    client.open_page('/my-trail')
+    trail_name = rng.choice(TRAIL_NAMES)
+    values = {'my-trail-dropdown.value': trail_name, 'my-trail-map.zoom': 12, 'upload-image.contents': None}
+    data = client.callback('my_trails', 'update_map', 'my-trail-layer.children', values, ['my-trail-dropdown.value'])
+    client.stats.record_framing(data, 'my-trail-map', (700, 800))
+    client.callback('my_trails', 'display_image_marker', 'my-image-layer.children', values, ['my-trail-dropdown.value'])
+
+    values.update({'find-btn.n_clicks': 1, 'close-modal.n_clicks': 0, 'modal.is_open': False})
+    client.callback('my_trails', 'toggle_trail_modal', 'modal.is_open', values, ['find-btn.n_clicks'])
+    client.callback('my_trails', 'display_geolocation', 'location-div.children', values, ['find-btn.n_clicks'])
+
+    # The browser shares a position a little off the trail start, so the proximity check does real work
+    start = synthetic.track_points(1, seed=rng.randint(0, 10_000))[0]
+    position = {'lat': start[0], 'lon': start[1]}
+    values.update({
+        'geo.position': position, 'geo.local_date': '2024-04-01T10:00:00', 'geo.position_error': None,
+        'close-too-far-modal.n_clicks': 0, 'too-far-modal.is_open': False,
+    })
+    data = client.callback('my_trails', 'store_device_location', 'device-location.data', values, ['geo.position'])
+    try:
+        values['device-location.data'] = json.loads(data)['response']['device-location']['data']
+    except (TypeError, ValueError, KeyError):
+        pass
+    client.callback('my_trails', 'handle_too_far_modal', 'too-far-modal.is_open', values, ['geo.position'])
+    client.callback('my_trails', 'update_button_visibility', 'find-btn.style', values, ['geo.local_date'])
+
+    if upload is not None:
+        values.update({'upload-image.contents': [upload], 'upload-image.filename': ['find.png'],
+                       'upload-jobs.data': [], 'upload-version.data': None})
+        start = time.perf_counter()
+        data = client.callback('my_trails', 'handle_upload', 'upload-status.children', values, ['upload-image.contents'])
+        if wait_for_uploads(client, values, data):
+            client.stats.record('upload processed', time.perf_counter() - start, True)
+            client.callback('my_trails', 'display_image_marker', 'my-image-layer.children', values,
+                            ['upload-version.data'])
+        else:
+            client.stats.record('upload processed', time.perf_counter() - start, False)
+
+
+# How often the upload page polls, and how long a session waits for its upload
+UPLOAD_POLL_SECONDS = 0.5
+UPLOAD_TIMEOUT = 60
+
+
+def wait_for_uploads(client, values, data, poll=UPLOAD_POLL_SECONDS, timeout=UPLOAD_TIMEOUT):
+    """Poll like the page's dcc.Interval until handle_upload's jobs finish; False on errors or timeout."""
+    try:
+        values['upload-jobs.data'] = json.loads(data)['response']['upload-jobs']['data']
+    except (TypeError, ValueError, KeyError):
+        return False
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        time.sleep(poll)
+        data = client.callback('my_trails', 'poll_uploads', 'upload-version.data', values, ['upload-poll.n_intervals'])
+        try:
+            response = json.loads(data)['response']
+        except (TypeError, ValueError, KeyError):
+            return False
+        if 'upload-version' in response:
+            values['upload-version.data'] = response['upload-version']['data']
+        if response['upload-poll']['disabled']:
+            return True
+    return False
+
+
+SESSIONS = {
+    'all_trails_browse': all_trails_browse,
+    'hiking_search': hiking_search,
+    'my_trails_upload': my_trails_upload,
+}
+
+
+def start_server(port, hiking_filter):
+    # Keep the load test's visits out of the traffic log that orders warm-up
+    env = dict(os.environ, TRAIL_DATA_WATCH_INTERVAL='0', TRAIL_TRAFFIC_PATH='', HIKING_FILTER_MODE=hiking_filter,
+               TRAIL_UPLOADS_DIR=os.path.join(tempfile.gettempdir(), 'trail-loadtest-uploads'))
+    process = subprocess.Popen([sys.executable, '-c', SERVER_SNIPPET, str(port)],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while True:
+        try:
+            # Wait for readiness the way a load balancer would
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/ready')
+            if connection.getresponse().status == 200:
+                return process, f'http://127.0.0.1:{port}'
+            raise ConnectionError('warming up')
+        except OSError:
+            if time.time() > deadline or process.poll() is not None:
+                process.terminate()
+                raise RuntimeError(f'app did not start on port {port}')
+            time.sleep(0.2)
+
+
+def user_loop(user, args, url, stats, deadline, upload):
+    rng = random.Random(args.seed + user)
+    client = Client(url, stats)
+    client.hiking_filter = args.hiking_filter
+    while time.time() < deadline:
+        name = rng.choice(args.sessions)
+        session = SESSIONS[name]
+        before = client.requests
+        if session is my_trails_upload:
+            session(client, rng, upload if args.upload_bytes else None)
+        else:
+            session(client, rng)
+        with stats._lock:
+            stats.sessions += 1
+            stats.session_requests[name].append(client.requests - before)
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def report(stats, elapsed):
+    rows = []
+    total = sum(len(v) for v in stats.latencies.values())
+    errors = sum(stats.errors.values())
+    print(f'\n{stats.sessions} sessions, {total} requests in {elapsed:.1f}s: '
+          f'{total / elapsed:.1f} req/s, {stats.sessions / elapsed:.2f} sessions/s, '
+          f'error rate {errors / max(total, 1):.2%}, {stats.stubbed_assets} CDN assets stubbed')
+    print(f'{"request":<44} {"count":>7} {"err%":>7} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+    for label in sorted(stats.latencies):
+        values = stats.latencies[label]
+        row = {
+            'request': label,
+            'count': len(values),
+            'error_rate': stats.errors[label] / len(values),
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+        }
+        rows.append(row)
+        print(f'{label:<44} {row["count"]:>7} {row["error_rate"]:>7.1%} {row["p50_ms"]:>9.2f} '
+              f'{row["p95_ms"]:>9.2f} {row["p99_ms"]:>9.2f}')
+    per_session = {name: sum(counts) / len(counts) for name, counts in sorted(stats.session_requests.items())}
+    for name, mean in per_session.items():
+        print(f'requests per session, {name}: {mean:.1f}')
+    framing = None
+    if stats.framing_steps:
+        views = len(stats.framing_steps)
+        steps = sum(step for step, _ in stats.framing_steps)
+        # Each zoom step reloads the visible tiles
+        tiles = sum(step * (width // TILE_SIZE + 2) * (height // TILE_SIZE + 2)
+                    for step, (width, height) in stats.framing_steps)
+        framing = {'map_views': views, 'centroid_zoom_steps': steps / views, 'centroid_tiles': tiles / views,
+                   'mis_framed': sum(1 for step, _ in stats.framing_steps if step) / views}
+        print(f'map framing over {views} map views: centroid framing at zoom {CENTROID_ZOOM} would need '
+              f'{steps / views:.2f} follow-up zoom steps (~{tiles / views:.0f} tile requests) per view and '
+              f'mis-frame {framing["mis_framed"]:.0%} of them; fit-to-bounds needs none')
+    return {'elapsed_s': elapsed, 'sessions': stats.sessions, 'requests': total,
+            'throughput_rps': total / elapsed, 'error_rate': errors / max(total, 1), 'callbacks': rows,
+            'requests_per_session': per_session, 'framing': framing}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the Dash apps with scripted sessions.')
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--sessions', nargs='+', choices=sorted(SESSIONS), default=sorted(SESSIONS))
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean pause between sessions (s)')
+    parser.add_argument('--upload-bytes', type=int, default=200_000, help='size of each uploaded image, 0 to skip uploads')
+    parser.add_argument('--hiking-filter', choices=['client', 'server'], default='client',
+                        help='where the hiking slider search filters (sets HIKING_FILTER_MODE on the local server)')
+    parser.add_argument('--url', help='use an already running server, e.g. http://127.0.0.1:8050')
+    parser.add_argument('--port', type=int, default=18050, help='port for the locally started server')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the report as JSON to this file')
+    args = parser.parse_args()
+
+    process, url = None, args.url
+    if url is None:
+        process, url = start_server(args.port, args.hiking_filter)
+
+    upload = None
+    if args.upload_bytes:
+        upload = 'data:image/png;base64,' + base64.b64encode(synthetic.png_bytes(args.upload_bytes)).decode('ascii')
+
+    stats = Stats()
+    try:
+        start = time.time()
+        deadline = start + args.seconds
+        threads = [threading.Thread(target=user_loop, args=(user, args, url, stats, deadline, upload))
+                   for user in range(args.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result = report(stats, time.time() - start)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Micro-benchmarks for the hot request-path functions.
+
+Each benchmark runs at several input scales on synthetic data from
+benchmarks/synthetic.py. Results can be saved as a baseline and later runs
+compared against it; anything slower than the threshold is reported as a
+regression and the exit status is 1. Baselines are machine specific, so
+record one on the box that will run the comparisons. Run from the
+repository root:
+
+    python benchmarks/run.py --save-baseline
+    python benchmarks/run.py                      # compare with the baseline
+    python benchmarks/run.py --filter gpx --quick
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Importing the app modules must not start the data watcher
+os.environ.setdefault('TRAIL_DATA_WATCH_INTERVAL', '0')
+
+import plotly  # noqa: E402
+
+import synthetic  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+BENCHMARKS = []
+
+
+def benchmark(name, scales, quick_scales=None):
+    """Register ``setup(scale, tmp) -> callable`` as a benchmark."""
+    def register(setup):
+        BENCHMARKS.append((name, scales, quick_scales or scales[:2], setup))
+        return setup
+    return register
+
+
+@benchmark('gpx_to_points', [100, 1_000, 10_000, 100_000])
+def bench_gpx_to_points(points, tmp):
+    from trail_store import gpx_to_points
+    path = synthetic.write_gpx(os.path.join(tmp, f'track-{points}.gpx'), points, seed=points)
+    return lambda: gpx_to_points(path)
+
+
+@benchmark('is_within_distance', [100, 1_000, 5_000])
+def bench_is_within_distance(points, tmp):
+    from my_trails import is_within_distance
+    trail_points = [(lat, lon) for lat, lon, _ in synthetic.track_points(points, seed=points)]
+    # A point far from the trail forces a check against every trail point
+    far_away = (-36.0, 149.0)
+    return lambda: is_within_distance(far_away, trail_points)
+
+
+@benchmark('slider_filter', [50, 1_000, 10_000, 100_000])
+def bench_slider_filter(trails, tmp):
+    from hiking import filter_trails
+    from trail_catalog import TrailCatalog
+    catalog = TrailCatalog.from_frame(synthetic.trail_catalog(trails, seed=trails))
+    return lambda: filter_trails(catalog, 10, 400, 2.5, 'closed loop')
+
+
+def _trail_geometry(trails):
+    from shapely.geometry import LineString
+    return [LineString([(lat, lon) for lat, lon, _ in synthetic.track_points(500, seed=i)]) for i in range(trails)]
+
+
+@benchmark('map_framing_centroid', [1, 10, 100, 1_000])
+def bench_map_framing_centroid(trails, tmp):
+    # The previous framing: average the shapely centroids on every request
+    line_strings = _trail_geometry(trails)
+
+    def frame():
+        centroids = [line_string.centroid.coords[0] for line_string in line_strings]
+        return (sum(c[0] for c in centroids) / len(centroids), sum(c[1] for c in centroids) / len(centroids))
+    return frame
+
+
+@benchmark('map_framing_bounds', [1, 10, 100, 1_000])
+def bench_map_framing_bounds(trails, tmp):
+    from framing import bbox, merge_bounds, viewport
+    bboxes = [bbox(line_string.coords) for line_string in _trail_geometry(trails)]
+    return lambda: viewport(merge_bounds(bboxes), 400, 500)
+
+
+@benchmark('create_trail_card', [1, 50, 1_000])
+def bench_create_trail_card(cards, tmp):
+    from all_trails import create_trail_card
+    df = synthetic.trail_catalog(cards, seed=cards)
+    rows = list(df[['name', 'duration', 'elevation_gain', 'distance']].itertuples(index=False))
+
+    def render():
+        # Build the cards and serialise them the way Dash does for a response
+        built = [create_trail_card(i + 1, *row) for i, row in enumerate(rows)]
+        return json.dumps(built, cls=plotly.utils.PlotlyJSONEncoder)
+    return render
+
+
+@benchmark('b64_image', [10_000, 100_000, 1_000_000, 5_000_000])
+def bench_b64_image(size, tmp):
+    from all_trails import _encoded_images, b64_image
+    path = synthetic.write_png(os.path.join(tmp, f'image-{size}.png'), size, seed=size)
+
+    def encode():
+        # Measure the encode itself, not the cache hit requests usually get
+        _encoded_images.clear()
+        return b64_image(path)
+    return encode
+
+
+def measure(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    per_op = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {'min': min(per_op), 'median': statistics.median(per_op), 'number': number}
+
+
+def run(selected, quick, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, scales, quick_scales, setup in BENCHMARKS:
+            if selected and not any(part in name for part in selected):
+                continue
+            for scale in (quick_scales if quick else scales):
+                key = f'{name}[{scale}]'
+                results[key] = measure(setup(scale, tmp), repeat)
+                print(f'{key:<32} {format_seconds(results[key]["min"]):>12}   '
+                      f'(median {format_seconds(results[key]["median"])})', flush=True)
+    return results
+
+
+def format_seconds(seconds):
+    for unit, factor in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= factor:
+            return f'{seconds / factor:.3f} {unit}'
+    return f'{seconds / 1e-9:.1f} ns'
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f'\ncompared with baseline from {baseline.get("machine", "?")} ({baseline.get("python", "?")})')
+    for key, result in results.items():
+        previous = baseline['results'].get(key)
+        if previous is None:
+            continue
+        change = result['min'] / previous['min'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(key)
+        print(f'{key:<32} {change:+8.1%}{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the hot-path micro-benchmarks.')
+    parser.add_argument('--filter', action='append', help='only benchmarks whose name contains this')
+    parser.add_argument('--quick', action='store_true', help='only the two smallest scales')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='fractional slowdown that counts as a regression (default 0.25)')
+    args = parser.parse_args()
+
+    results = run(args.filter, args.quick, args.repeat)
+
+    if args.save_baseline:
+        baseline = {'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(machine=platform.node(), python=platform.python_version())
+        baseline['results'].update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f'\nbaseline saved to {args.baseline}')
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) beyond {args.threshold:.0%}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
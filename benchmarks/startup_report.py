@@ -0,0 +1,181 @@
+"""Cold-start report for the composed Dash app.
+
+Runs ``python -X importtime -c "import app"`` in a fresh interpreter and
+lists the slowest imports, then starts the app in a subprocess and times
+the first responses a browser needs (page, layout, dependencies, router,
+trail list and a trail detail page) with background warm-up on and off.
+With warm-up on it also reports how long /ready took to turn 200. Run from
+the repository root:
+
+    python benchmarks/startup_report.py
+    python benchmarks/startup_report.py --top 25 --json
+"""
+import argparse
+import csv
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_SNIPPET = '''
+import sys, time
+start = time.perf_counter()
+import app
+print('imported', time.perf_counter() - start, flush=True)
+from werkzeug.serving import run_simple
+run_simple('127.0.0.1', int(sys.argv[1]), app.server, threaded=True)
+'''
+
+
+def import_times(top):
+    env = dict(os.environ, TRAIL_DATA_WATCH_INTERVAL='0', TRAIL_WARM_UP='0')
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                          cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    # Indentation is nesting depth: ' app' at 0, its own imports at 1, theirs at 2
+    depth = {row: (len(row[0]) - len(row[0].lstrip()) - 1) // 2 for row in rows}
+    top_level = [row for row in rows if depth[row] == 0]
+    nested = [row for row in rows if depth[row] in (1, 2)]
+    loaded = {name.strip().split('.')[0] for name, _, _ in rows}
+    return {
+        'process_seconds': wall,
+        'import_seconds': sum(row[2] for row in top_level) / 1e6,
+        'cumulative': [{'module': name.strip(), 'ms': cumulative / 1000}
+                       for name, _, cumulative in sorted(nested, key=lambda row: -row[2])[:top]],
+        'self': [{'module': name.strip(), 'ms': self_us / 1000}
+                 for name, self_us, _ in sorted(rows, key=lambda row: -row[1])[:top]],
+        'heavy_loaded': sorted(loaded & {'pandas', 'numpy', 'shapely', 'geopy'}),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def busiest_trail():
+    # The traffic log is empty on a fresh checkout, so just take the first trail
+    with open(os.path.join(ROOT, 'data', '50_trails.csv'), encoding='utf-8') as f:
+        return next(csv.DictReader(f))['name']
+
+
+def timed(url, body=None):
+    start = time.perf_counter()
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def callback_body(output, inputs, state=()):
+    outputs = [dict(zip(('id', 'property'), part.rsplit('.', 1))) for part in output.strip('.').split('...')]
+    return {'output': output, 'outputs': outputs, 'inputs': list(inputs), 'state': list(state),
+            'changedPropIds': [f'{item["id"]}.{item["property"]}' for item in inputs]}
+
+
+def wait_ready(url, started):
+    while True:
+        try:
+            with urllib.request.urlopen(url + '/ready', timeout=60):
+                return time.perf_counter() - started
+        except urllib.error.HTTPError:
+            time.sleep(0.01)
+
+
+def first_requests(warm_up, idle):
+    port = free_port()
+    env = dict(os.environ, TRAIL_DATA_WATCH_INTERVAL='0', TRAIL_WARM_UP='1' if warm_up else '0')
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-c', SERVER_SNIPPET, str(port)], cwd=ROOT, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        imported = float(server.stdout.readline().split()[1])
+        url = f'http://127.0.0.1:{port}'
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.01)
+        listening = time.perf_counter() - started
+        ready = wait_ready(url, started) if warm_up else None
+        # Give warm-up the time a real deployment gets between listening and traffic
+        time.sleep(max(0.0, idle - (time.perf_counter() - started - listening)))
+        url_input = {'id': 'url', 'property': 'pathname', 'value': '/'}
+        trail_input = dict(url_input, value='/' + busiest_trail().replace(' ', '-'))
+        timings = {
+            'GET /': timed(url + '/'),
+            'GET /_dash-layout': timed(url + '/_dash-layout'),
+            'GET /_dash-dependencies': timed(url + '/_dash-dependencies'),
+            'router callback': timed(url + '/_dash-update-component', callback_body(
+                '..page-content.children...current-page.data..', [url_input],
+                [{'id': 'current-page', 'property': 'data', 'value': None}])),
+            'update_trail_info': timed(url + '/_dash-update-component', callback_body(
+                '..trail-cards-row.children...trail-info.children..',
+                [url_input, {'id': 'trail-search-dropdown', 'property': 'value', 'value': None}])),
+            'trail detail': timed(url + '/_dash-update-component', callback_body(
+                '..trail-cards-row.children...trail-info.children..',
+                [trail_input, {'id': 'trail-search-dropdown', 'property': 'value', 'value': None}])),
+            'trail map': timed(url + '/_dash-update-component', callback_body(
+                '..trail-layer.children...trail-map.viewport..', [trail_input])),
+        }
+        return {'import_seconds': imported, 'listening_seconds': listening, 'ready_seconds': ready,
+                'idle_seconds': idle, 'first_requests_ms': timings}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report import time and first-request latency.')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--idle', type=float, default=0.0,
+                        help='seconds between the server listening and the first request '
+                             '(with warm-up, at least until /ready)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    report = {'imports': import_times(args.top),
+              'warm_up': first_requests(True, args.idle),
+              'no_warm_up': first_requests(False, args.idle)}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    imports = report['imports']
+    print(f'import app: {imports["import_seconds"]:.3f} s of imports, '
+          f'{imports["process_seconds"]:.3f} s including interpreter start-up')
+    print(f'heavy packages loaded at import: {", ".join(imports["heavy_loaded"]) or "none"}\n')
+    print(f'{"slowest imports (cumulative)":<44}{"ms":>10}')
+    for row in imports['cumulative']:
+        print(f'{row["module"]:<44}{row["ms"]:>10.1f}')
+    print(f'\n{"slowest modules (self)":<44}{"ms":>10}')
+    for row in imports['self']:
+        print(f'{row["module"]:<44}{row["ms"]:>10.1f}')
+
+    for key in ('warm_up', 'no_warm_up'):
+        run = report[key]
+        ready = f', ready after {run["ready_seconds"]:.3f} s' if run['ready_seconds'] is not None else ''
+        print(f'\n{key.replace("_", " ")}: imported in {run["import_seconds"]:.3f} s, listening after '
+              f'{run["listening_seconds"]:.3f} s{ready}')
+        for name, ms in run['first_requests_ms'].items():
+            print(f'  {name:<28}{ms:>10.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Deterministic synthetic trail data for benchmarks.
+
+Everything is driven by a seeded random.Random, so the same arguments
+always produce byte-identical output.
+"""
+import math
+import os
+import random
+import struct
+import zlib
+
+import pandas as pd
+
+# Trailheads are drawn from these areas so coordinates look like Victoria
+REGIONS = [
+    ('Melbourne', -37.8136, 144.9631, 0.25),
+    ('Dandenong Ranges', -37.8700, 145.3500, 0.15),
+    ('Yarra Ranges', -37.7500, 145.7000, 0.30),
+    ('Macedon Ranges', -37.3800, 144.5800, 0.20),
+    ('Grampians', -37.1500, 142.4500, 0.40),
+    ('Great Ocean Road', -38.6800, 143.5500, 0.50),
+    ('Wilsons Promontory', -39.0300, 146.3200, 0.20),
+    ('Alpine', -36.9000, 147.1000, 0.60),
+    ('Gippsland', -37.8500, 147.6000, 0.50),
+]
+
+SEASONS = ['spring', 'summer', 'autumn', 'winter']
+ATTRACTIONS = ['Waterfall', 'Lookout', 'Gorge', 'Lake', 'Beach', 'Summit', 'Historic hut', 'Rainforest', 'River crossing']
+WORDS = ('scenic trail through bushland with views of the ranges, creek crossings, fern gullies, '
+         'granite outcrops and coastal cliffs; popular with families and keen hikers alike').split()
+
+
+def _trailhead(rng):
+    _, lat, lon, spread = rng.choice(REGIONS)
+    return lat + rng.uniform(-spread, spread), lon + rng.uniform(-spread, spread)
+
+
+def track_points(n_points, seed=0, step_m=25.0):
+    """A smooth random walk of (lat, lon, ele) points starting at a Victorian trailhead."""
+    rng = random.Random(seed)
+    lat, lon = _trailhead(rng)
+    ele = rng.uniform(20, 1200)
+    heading = rng.uniform(0, 2 * math.pi)
+    points = []
+    for _ in range(n_points):
+        points.append((lat, lon, ele))
+        heading += rng.gauss(0, 0.25)
+        lat += step_m * math.cos(heading) / 111_320
+        lon += step_m * math.sin(heading) / (111_320 * math.cos(math.radians(lat)))
+        ele = max(0.0, ele + rng.gauss(0, 2))
+    return points
+
+
+def gpx_document(n_points, seed=0, name='Synthetic Trail'):
+    points = track_points(n_points, seed)
+    trkpts = ''.join(f'<trkpt lat="{lat:.6f}" lon="{lon:.6f}"><ele>{ele:.1f}</ele></trkpt>\n'
+                     for lat, lon, ele in points)
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<gpx version="1.1" creator="benchmarks" xmlns="http://www.topografix.com/GPX/1/1">\n'
+            f'<trk><name>{name}</name><trkseg>\n{trkpts}</trkseg></trk>\n</gpx>\n')
+
+
+def write_gpx(path, n_points, seed=0, name='Synthetic Trail'):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(gpx_document(n_points, seed, name))
+    return path
+
+
+def trail_catalog(n_trails, seed=0):
+    """A DataFrame with the same columns as data/50_trails.csv."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_trails):
+        distance = round(rng.lognormvariate(2.3, 0.8), 1)
+        elevation_gain = int(distance * rng.uniform(5, 60))
+        lat, lon = _trailhead(rng)
+        distance_from_mel = int(math.hypot(lat + 37.8136, (lon - 144.9631) * 0.79) * 111)
+        rows.append({
+            'name': f'Synthetic Trail {i:06d}',
+            'distance': distance,
+            'elevation_gain': elevation_gain,
+            'max_elevation': int(rng.uniform(10, 1900)),
+            'duration': round(distance / 4.5 + elevation_gain / 600, 2),
+            'loop': rng.choice(['closed loop', 'one way']),
+            'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(15, 60))).capitalize() + '.',
+            'distance_from_mel': distance_from_mel,
+            'drive_from_mel': round(distance_from_mel / 80, 2),
+            'season': 'all' if rng.random() < 0.4 else ', '.join(sorted(rng.sample(SEASONS, rng.randint(1, 3)), key=SEASONS.index)),
+            'key_attraction': ', '.join(rng.sample(ATTRACTIONS, rng.randint(1, 3))),
+        })
+    return pd.DataFrame(rows)
+
+
+def write_catalog(path, n_trails, seed=0):
+    trail_catalog(n_trails, seed).to_csv(path, index=False)
+    return path
+
+
+def png_bytes(n_bytes, seed=0):
+    """A valid PNG of roughly n_bytes filled with incompressible noise."""
+    rng = random.Random(seed)
+    width = max(1, int(math.sqrt(n_bytes / 3)))
+    height = max(1, n_bytes // (width * 3))
+    raw = b''.join(b'\x00' + rng.randbytes(width * 3) for _ in range(height))
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw, 1)) + chunk(b'IEND', b'')
+
+
+def write_png(path, n_bytes, seed=0):
+    with open(path, 'wb') as f:
+        f.write(png_bytes(n_bytes, seed))
+    return path
+
+
+def _exif_directory(entries, offset):
+    """One little-endian TIFF directory at ``offset``; values over 4 bytes follow it."""
+    data_offset = offset + 2 + 12 * len(entries) + 4
+    head, tail = [struct.pack('<H', len(entries))], b''
+    for tag, kind, count, payload in entries:
+        if len(payload) <= 4:
+            head.append(struct.pack('<HHI', tag, kind, count) + payload.ljust(4, b'\x00'))
+        else:
+            head.append(struct.pack('<HHII', tag, kind, count, data_offset + len(tail)))
+            tail += payload
+    return b''.join(head) + b'\x00\x00\x00\x00' + tail
+
+
+def _rational_degrees(value):
+    value = abs(value)
+    minutes = (value - int(value)) * 60
+    return struct.pack('<6I', int(value), 1, int(minutes), 1, round((minutes - int(minutes)) * 60 * 10000), 10000)
+
+
+def exif_tiff(latitude=None, longitude=None, timestamp=None):
+    """An EXIF block as a phone writes it: DateTimeOriginal ('YYYY-MM-DDTHH:MM:SS') and GPS position."""
+    pointers = [(0x8769, 4, 1, None)] + ([(0x8825, 4, 1, None)] if latitude is not None else [])
+    exif_offset = 8 + 2 + 12 * len(pointers) + 4
+    taken = (timestamp or '2024-01-01T00:00:00').replace('-', ':').replace('T', ' ').encode('ascii') + b'\x00'
+    details = _exif_directory([(0x9003, 2, len(taken), taken)] if timestamp else [], exif_offset)
+    gps_offset = exif_offset + len(details)
+    gps = b''
+    if latitude is not None:
+        gps = _exif_directory([
+            (1, 2, 2, b'S\x00' if latitude < 0 else b'N\x00'), (2, 5, 3, _rational_degrees(latitude)),
+            (3, 2, 2, b'W\x00' if longitude < 0 else b'E\x00'), (4, 5, 3, _rational_degrees(longitude)),
+        ], gps_offset)
+    offsets = [exif_offset, gps_offset]
+    root = _exif_directory([(tag, kind, count, struct.pack('<I', offsets[i]))
+                            for i, (tag, kind, count, _) in enumerate(pointers)], 8)
+    return b'II*\x00' + struct.pack('<I', 8) + root + details + gps
+
+
+def jpeg_bytes(n_bytes, seed=0, latitude=None, longitude=None, timestamp=None):
+    """A JPEG-framed file of roughly n_bytes: EXIF APP1 segment, then noise as scan data.
+
+    Enough for type sniffing and EXIF reading; it doesn't decode to a picture.
+    """
+    rng = random.Random(seed)
+    app1 = b'Exif\x00\x00' + exif_tiff(latitude, longitude, timestamp)
+    head = b'\xff\xd8' + b'\xff\xe1' + struct.pack('>H', len(app1) + 2) + app1 + b'\xff\xda' + struct.pack('>H', 2)
+    return head + rng.randbytes(max(0, n_bytes - len(head) - 2)) + b'\xff\xd9'
+
+
+def write_dataset(directory, n_trails, points_per_trail=500, seed=0):
+    """A data/ style directory: 50_trails.csv plus one GPX per trail."""
+    trails_dir = os.path.join(directory, 'trails')
+    os.makedirs(trails_dir, exist_ok=True)
+    df = trail_catalog(n_trails, seed)
+    df.to_csv(os.path.join(directory, '50_trails.csv'), index=False)
+    for i, name in enumerate(df['name']):
+        write_gpx(os.path.join(trails_dir, f'{name}.gpx'), points_per_trail, seed + i, name)
+    return df
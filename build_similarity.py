@@ -0,0 +1,34 @@
+"""Build the "similar trails" neighbour table offline and store it for the app.
+
+    python build_similarity.py
+    python build_similarity.py --output /srv/trails/similar_trails.npz   # then set TRAIL_SIMILARITY_INDEX
+
+The app loads the stored table when its inputs (catalog rows, GPX start
+points and index settings) match the data it serves, and builds the index
+itself otherwise, so rerun this after editing data/.
+"""
+import argparse
+import time
+
+from similarity import INDEX_PATH, SimilarityIndex, input_digest, start_points
+from trail_store import store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the similar-trails index offline.')
+    parser.add_argument('--output', default=INDEX_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot = store.current()
+    starts = start_points(snapshot)
+    loaded = time.perf_counter()
+    index = SimilarityIndex.build(snapshot.catalog, starts)
+    built = time.perf_counter()
+    index.save(args.output, input_digest(snapshot.catalog, starts))
+    print(f'{len(snapshot.catalog)} trails: data {loaded - start:.2f} s, index {built - loaded:.2f} s; '
+          f'written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
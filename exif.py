@@ -0,0 +1,104 @@
+import struct
+
+# TIFF field types and their sizes in bytes
+TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+DATE_TIME = 0x0132
+DATE_TIME_ORIGINAL = 0x9003
+GPS_LATITUDE_REF, GPS_LATITUDE = 1, 2
+GPS_LONGITUDE_REF, GPS_LONGITUDE = 3, 4
+
+
+def _tiff_block(data):
+    """The TIFF structure holding a JPEG's or PNG's EXIF data, or None."""
+    if data[:3] == b'\xff\xd8\xff':
+        position = 2
+        while position + 4 <= len(data) and data[position] == 0xFF:
+            marker = data[position + 1]
+            length = struct.unpack('>H', data[position + 2:position + 4])[0]
+            segment = data[position + 4:position + 2 + length]
+            if marker == 0xE1 and segment[:6] == b'Exif\x00\x00':
+                return segment[6:]
+            # Metadata segments all come before the start of scan
+            if marker == 0xDA:
+                return None
+            position += 2 + length
+    elif data[:8] == b'\x89PNG\r\n\x1a\n':
+        position = 8
+        while position + 8 <= len(data):
+            length, tag = struct.unpack('>I4s', data[position:position + 8])
+            if tag == b'eXIf':
+                return data[position + 8:position + 8 + length]
+            if tag in (b'IDAT', b'IEND'):
+                return None
+            position += 12 + length
+    return None
+
+
+def _entries(tiff, order, offset):
+    """{tag: value} for one image file directory; numbers come back as tuples, text as str."""
+    entries = {}
+    if offset + 2 > len(tiff):
+        return entries
+    count = struct.unpack(order + 'H', tiff[offset:offset + 2])[0]
+    for index in range(count):
+        start = offset + 2 + 12 * index
+        if start + 12 > len(tiff):
+            break
+        tag, kind, length = struct.unpack(order + 'HHI', tiff[start:start + 8])
+        size = TYPE_SIZES.get(kind, 0) * length
+        if not size:
+            continue
+        if size <= 4:
+            raw = tiff[start + 8:start + 8 + size]
+        else:
+            value_offset = struct.unpack(order + 'I', tiff[start + 8:start + 12])[0]
+            raw = tiff[value_offset:value_offset + size]
+        if len(raw) < size:
+            continue
+        if kind == 2:
+            entries[tag] = raw.split(b'\x00', 1)[0].decode('ascii', 'replace')
+        elif kind in (5, 10):
+            numbers = struct.unpack(order + ('I' if kind == 5 else 'i') * (2 * length), raw)
+            entries[tag] = tuple(a / b if b else 0.0 for a, b in zip(numbers[::2], numbers[1::2]))
+        elif kind in (3, 4, 9):
+            entries[tag] = struct.unpack(order + {3: 'H', 4: 'I', 9: 'i'}[kind] * length, raw)
+        else:
+            entries[tag] = raw
+    return entries
+
+
+def _degrees(value, reference):
+    if not isinstance(value, tuple) or len(value) != 3:
+        return None
+    degrees = value[0] + value[1] / 60 + value[2] / 3600
+    return -degrees if reference in ('S', 'W') else degrees
+
+
+def read_exif(data):
+    """GPS position and capture time from an image's EXIF data.
+
+    Returns a dict with 'latitude'/'longitude' when the photo is geotagged
+    and 'timestamp' (ISO 8601, camera local time) when it has a capture
+    date; empty when there is no readable EXIF. Only JPEG APP1 and PNG eXIf
+    blocks are read, which covers what phones and cameras produce.
+    """
+    tiff = _tiff_block(data)
+    if not tiff or len(tiff) < 8 or tiff[:2] not in (b'II', b'MM'):
+        return {}
+    order = '<' if tiff[:2] == b'II' else '>'
+    root = _entries(tiff, order, struct.unpack(order + 'I', tiff[4:8])[0])
+    found = {}
+    details = _entries(tiff, order, root[EXIF_IFD][0]) if EXIF_IFD in root else {}
+    taken = details.get(DATE_TIME_ORIGINAL) or root.get(DATE_TIME)
+    if isinstance(taken, str) and len(taken) >= 19:
+        found['timestamp'] = taken[:10].replace(':', '-') + 'T' + taken[11:19]
+    if GPS_IFD in root:
+        gps = _entries(tiff, order, root[GPS_IFD][0])
+        latitude = _degrees(gps.get(GPS_LATITUDE), gps.get(GPS_LATITUDE_REF))
+        longitude = _degrees(gps.get(GPS_LONGITUDE), gps.get(GPS_LONGITUDE_REF))
+        if latitude is not None and longitude is not None:
+            found['latitude'], found['longitude'] = latitude, longitude
+    return found
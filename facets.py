@@ -0,0 +1,150 @@
+import math
+import re
+
+# Facet values derived from the catalog's free-text columns at load time
+SEASONS = ['spring', 'summer', 'autumn', 'winter']
+ATTRACTIONS = {
+    'waterfall': ('falls', 'waterfall', 'cascade'),
+    'lookout': ('lookout', 'view', 'platform', 'skyline', 'point'),
+    'gorge': ('gorge',),
+    'summit': ('peak', 'summit'),
+    'lake': ('lake',),
+    'river': ('river', 'creek', 'springs'),
+    'coast': ('beach', 'bay', 'coast', 'lighthouse'),
+    'rainforest': ('rainforest', 'fern'),
+    'historic': ('historic', 'station', 'hut', 'railway', 'geoglyph'),
+}
+# Cumulative, so 'under 2 h' is one bitmap rather than an OR of buckets
+DRIVE_HOURS = [1, 2, 3]
+
+
+def drive_label(hours):
+    return f'under {hours} h'
+
+
+def _in_season(season):
+    def test(value):
+        value = (value or '').lower()
+        return value.strip() == 'all' or season in value
+    return test
+
+
+def _has_attraction(keywords):
+    # Whole words, plurals included: 'hut' and 'huts' but not 'shut', 'bay' but not 'Baynton'
+    pattern = re.compile(r'\b(?:%s)(?:e?s)?\b' % '|'.join(map(re.escape, keywords)))
+
+    def test(value):
+        return pattern.search((value or '').lower()) is not None
+    return test
+
+
+def facet_masks(trails):
+    """Boolean masks per facet value: {facet: {value: mask}}.
+
+    Text tests run once per distinct value of a column, not once per row.
+    """
+    drive = trails.column('drive_from_mel')
+    loops = sorted(loop for loop in trails.distinct('loop') if loop is not None)
+    return {
+        'season': {season: trails.map('season', _in_season(season), bool) for season in SEASONS},
+        'loop': {loop: trails.map('loop', lambda value, loop=loop: value == loop, bool) for loop in loops},
+        'attraction': {name: trails.map('key_attraction', _has_attraction(keywords), bool)
+                       for name, keywords in ATTRACTIONS.items()},
+        'drive': {drive_label(hours): drive < hours for hours in DRIVE_HOURS},
+    }
+
+
+def _bitmap(mask):
+    import numpy as np
+    return int.from_bytes(np.packbits(np.asarray(mask, dtype=bool), bitorder='little').tobytes(), 'little')
+
+
+class FacetIndex:
+    """One bitmap per facet value over the catalog rows.
+
+    Bitmaps are plain Python ints (bit i is row i), so AND/OR/NOT and counts
+    run in C over whole machine words. Expressions are JSON-friendly:
+    ``'season:spring'``, ``['and', e1, e2, ...]``, ``['or', ...]`` and
+    ``['not', e]``; ``['and']`` matches every trail.
+    """
+
+    def __init__(self, names, bitmaps):
+        self.names = names
+        self.size = len(names)
+        self.universe = (1 << self.size) - 1
+        self.bitmaps = bitmaps
+        self._names = None
+
+    @classmethod
+    def from_catalog(cls, trails):
+        bitmaps = {facet: {value: _bitmap(mask) for value, mask in values.items()}
+                   for facet, values in facet_masks(trails).items()}
+        return cls(list(trails.names), bitmaps)
+
+    def bitmap(self, term):
+        facet, _, value = term.partition(':')
+        try:
+            return self.bitmaps[facet][value]
+        except KeyError:
+            raise ValueError(f'unknown facet value {term!r}') from None
+
+    def evaluate(self, expression):
+        if isinstance(expression, str):
+            return self.bitmap(expression)
+        operator, *operands = expression
+        if operator == 'not':
+            (operand,) = operands
+            return self.universe ^ self.evaluate(operand)
+        if operator == 'and':
+            result = self.universe
+            for operand in operands:
+                result &= self.evaluate(operand)
+                if not result:
+                    break
+            return result
+        if operator == 'or':
+            result = 0
+            for operand in operands:
+                result |= self.evaluate(operand)
+            return result
+        raise ValueError(f'unknown operator {operator!r}')
+
+    def count(self, expression):
+        return self.evaluate(expression).bit_count()
+
+    def rows(self, bitmap):
+        """Row numbers of the set bits, in catalog order, as a numpy array."""
+        import numpy as np
+        packed = np.frombuffer(bitmap.to_bytes(math.ceil(self.size / 8), 'little'), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(packed, bitorder='little'))
+
+    def query(self, expression):
+        import numpy as np
+        if self._names is None:
+            self._names = np.array(self.names, dtype=object)
+        return self._names[self.rows(self.evaluate(expression))].tolist()
+
+    def facet_counts(self, selection, base=None):
+        """Live counts for a UI where values are ORed within a facet and facets are ANDed.
+
+        Each facet's counts apply every *other* facet's selection, so ticking
+        a season never zeroes the other seasons. ``base`` is an optional
+        expression every count must also satisfy.
+        """
+        clauses = {facet: self.evaluate(['or', *(f'{facet}:{value}' for value in values)])
+                   for facet, values in selection.items() if values}
+        base_bitmap = self.universe if base is None else self.evaluate(base)
+        counts = {}
+        for facet, values in self.bitmaps.items():
+            others = base_bitmap
+            for other, bitmap in clauses.items():
+                if other != facet:
+                    others &= bitmap
+            counts[facet] = {value: (others & bitmap).bit_count() for value, bitmap in values.items()}
+        return counts
+
+
+def selection_expression(selection):
+    """The AND-of-ORs expression for a {facet: [values]} UI selection."""
+    return ['and', *(['or', *(f'{facet}:{value}' for value in values)]
+                     for facet, values in selection.items() if values)]
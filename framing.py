@@ -0,0 +1,63 @@
+import math
+
+# Leaflet's tile size, and the closest a map is zoomed when framing trails
+TILE_SIZE = 256
+MAX_FIT_ZOOM = 16
+FIT_PADDING = 20
+
+MELBOURNE = (-37.8136, 144.9631)
+
+
+def bbox(coords):
+    """GeoJSON bbox [west, south, east, north] of (lat, lon) points."""
+    lats = [lat for lat, _ in coords]
+    lons = [lon for _, lon in coords]
+    return [min(lons), min(lats), max(lons), max(lats)]
+
+
+def merge_bounds(bboxes):
+    """Leaflet bounds [[south, west], [north, east]] covering every bbox, or None."""
+    west = south = math.inf
+    east = north = -math.inf
+    for box in bboxes:
+        west = min(west, box[0])
+        south = min(south, box[1])
+        east = max(east, box[2])
+        north = max(north, box[3])
+    if west == math.inf:
+        return None
+    return [[south, west], [north, east]]
+
+
+def _mercator_y(lat):
+    lat = max(min(lat, 85.0511), -85.0511)
+    return math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+
+
+def fit_zoom(bounds, width, height, padding=FIT_PADDING):
+    """The largest whole zoom at which ``bounds`` fits a width x height px map, as fitBounds picks it."""
+    (south, west), (north, east) = bounds
+    lon_fraction = (east - west) / 360
+    lat_fraction = (_mercator_y(north) - _mercator_y(south)) / (2 * math.pi)
+    zooms = [MAX_FIT_ZOOM]
+    for fraction, pixels in ((lon_fraction, width), (lat_fraction, height)):
+        if fraction > 0:
+            zooms.append(math.log2(max(pixels - 2 * padding, 1) / TILE_SIZE / fraction))
+    return max(0, min(MAX_FIT_ZOOM, math.floor(min(zooms))))
+
+
+def viewport(bounds, width, height):
+    """A dl.Map viewport that frames ``bounds`` on a map of roughly width x height px.
+
+    The browser fits the bounds to the real map size; center and zoom are
+    the server's estimate, used as is for trails too short to fit sensibly.
+    """
+    if bounds is None:
+        return {'center': MELBOURNE, 'transition': 'flyTo'}
+    (south, west), (north, east) = bounds
+    center = [(south + north) / 2, (west + east) / 2]
+    zoom = fit_zoom(bounds, width, height)
+    if zoom >= MAX_FIT_ZOOM:
+        return {'center': center, 'zoom': MAX_FIT_ZOOM, 'transition': 'flyTo'}
+    return {'bounds': bounds, 'center': center, 'zoom': zoom, 'transition': 'flyToBounds',
+            'options': {'padding': [FIT_PADDING, FIT_PADDING]}}
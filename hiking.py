@@ -1,429 +1,420 @@
-import dash
-from dash import html, dcc
-import dash_leaflet as dl
-import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output, State, ClientsideFunction
-import pandas as pd
-import os
+# Trail search page, served at /hiking by app.py
 import base64
-import xml.etree.ElementTree as ET
-from shapely.geometry import LineString
-
-# Initialize the Dash app
-app = dash.Dash(__name__)
-
-# External CSS
-external_stylesheets = [
-    'https://fonts.googleapis.com/css?family=Poppins:300,400,500,600,700,800,900&display=swap',
-    '/assets/style.css'
-]
-
-
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets, external_scripts=[
-    'https://cdnjs.cloudflare.com/ajax/libs/gsap/3.5.1/gsap.min.js',
-    'https://cdnjs.cloudflare.com/ajax/libs/gsap/3.5.1/ScrollTrigger.min.js'
-])
-
-df_trails = pd.read_csv('data/50_trails.csv')
-
-def gpx_to_points(gpx_path):
-    tree = ET.parse(gpx_path)
-    root = tree.getroot()
-    namespaces = {'default': 'http://www.topografix.com/GPX/1/1'}
-    route_points = [(float(pt.attrib['lat']), float(pt.attrib['lon'])) for pt in root.findall('.//default:trkpt', namespaces)]
-    return LineString(route_points)
-
-@app.callback(
-    [Output('filtered-trails', 'children'), Output('trail-layer', 'children'), Output('trail-map', 'center')],
-    [Input('search-button', 'n_clicks'), Input('search-button2', 'n_clicks')],
-    [State('trail-dropdown', 'value'),
-     State('distance-slider', 'value'),
-     State('elevation-slider', 'value'),
-     State('duration-slider', 'value'),
-     State('loop-radio', 'value')]
-)
-def update_filtered_trails(n_clicks1, n_clicks2, selected_trails, distance, elevation, duration, loop):
-    ctx = dash.callback_context
-    if not ctx.triggered:
-        button_id = None
-    else:
-        button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-
-    if button_id == 'search-button':
-        n_clicks = n_clicks1
-        trails_to_display = selected_trails
-        print("debug1 trails:", trails_to_display)
-    elif button_id == 'search-button2':
-        n_clicks = n_clicks2
-        trails_to_display = df_trails[
-            (df_trails['distance'] >= distance - 5) &
-            (df_trails['distance'] <= distance + 5) &
-            (df_trails['max_elevation'] >= elevation - 300) &
-            (df_trails['max_elevation'] <= elevation + 300) &
-            (df_trails['duration'] >= duration - 0.5) &
-            (df_trails['duration'] <= duration + 0.5) &
-            (df_trails['loop'] == loop)
-        ]
-        trails_to_display = trails_to_display['name'].tolist()
-        print("debug2 trails:", trails_to_display)
-
-    else:
-        n_clicks = 0
-
-    if n_clicks == 0:
-        return dash.no_update, dash.no_update, dash.no_update
-    
-    # Display filtered trails under "Search" button 2
-    if trails_to_display==[]:
-        filtered_trails_output = html.P("No trails match the selected criteria.")
-    else:
-        filtered_trails_output = html.Ul([
-            html.Li(trail_name) for trail_name in trails_to_display
-        ])
-    
-    # Display filtered trails on the map
-    features = []
-    centroids = []
-    colors = ['blue', 'red', 'green', 'yellow', 'purple']
-    
-    for i, trail_name in enumerate(trails_to_display):
-        gpx_path = os.path.join('data/trails', f'{trail_name}.gpx')
-        line_string = gpx_to_points(gpx_path)
-        centroid = line_string.centroid.coords[0]
-        centroids.append(centroid)  
-        color = colors[i % len(colors)]
-        feature = dl.Polyline(positions=list(line_string.coords), color=color)
-        feature.children = dl.Tooltip(trail_name)
-        features.append(feature)
-    
-    # Calculate center based on centroids of filtered trails
-    if centroids:
-        center_latitude = sum([centroid[0] for centroid in centroids]) / len(centroids)
-        center_longitude = sum([centroid[1] for centroid in centroids]) / len(centroids)
-        center = (center_latitude, center_longitude)
-    else:
-        # Default center if no trails are found
-        center = (-37.8136, 144.9631)
-    
-    return filtered_trails_output, features, center
-
-def load_trail_names():
-    df = pd.read_csv('data/50_trails.csv', encoding='utf-8')
-    return [{'label': name, 'value': name} for name in df['name'].unique()]
-
-# Get all trail names
-all_trail_names = df_trails['name'].tolist()
-
-@app.callback(
-    Output('trail-dropdown', 'options'),
-    [Input('trail-dropdown', 'search_value')]
-)
-def update_trail_list(search_term):
-    if search_term:
-        # Filter trail names based on the input
-        search_term_lower = search_term.lower()
-        filtered_trails = df_trails[df_trails['name'].str.lower().str.startswith(search_term_lower)]
-        if not filtered_trails.empty:
-            # Extract just the 'name' column from the filtered DataFrame
-            trail_names = filtered_trails['name']
-            # Create a list of options for dropdown
-            options = [{'label': name, 'value': name} for name in trail_names]
-            return options
-    # If no search term provided or no matching trails found, return all trail options
-    return [{'label': trail, 'value': trail} for trail in all_trail_names]
-
-# hiking.py
+import hashlib
+import json
+import os
 
 import dash
-from dash import html, dcc
+from dash import html, dcc, callback, clientside_callback
 import dash_leaflet as dl
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output, State, ClientsideFunction
-import pandas as pd
-import os
-import base64
-import xml.etree.ElementTree as ET
-from shapely.geometry import LineString
-
-# Initialize the Dash app
-app = dash.Dash(__name__)
-
-# External CSS
-external_stylesheets = [
-    'https://fonts.googleapis.com/css?family=Poppins:300,400,500,600,700,800,900&display=swap',
-    '/assets/style.css'
-]
-
-
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets, external_scripts=[
-    'https://cdnjs.cloudflare.com/ajax/libs/gsap/3.5.1/gsap.min.js',
-    'https://cdnjs.cloudflare.com/ajax/libs/gsap/3.5.1/ScrollTrigger.min.js'
-])
-
-df_trails = pd.read_csv('data/50_trails.csv')
-
-def gpx_to_points(gpx_path):
-    tree = ET.parse(gpx_path)
-    root = tree.getroot()
-    namespaces = {'default': 'http://www.topografix.com/GPX/1/1'}
-    route_points = [(float(pt.attrib['lat']), float(pt.attrib['lon'])) for pt in root.findall('.//default:trkpt', namespaces)]
-    return LineString(route_points)
-
-@app.callback(
-    [Output('filtered-trails', 'children'), Output('trail-layer', 'children'), Output('trail-map', 'center')],
+from flask import Response, request
+
+from facets import ATTRACTIONS, DRIVE_HOURS, SEASONS, FacetIndex, drive_label, selection_expression
+from framing import merge_bounds, viewport
+from proximity import NEARBY_RADIUS_KM, proximity_graph
+from instrumentation import instrument
+from tile_cache import tile_layer
+from trail_pack import pack_url
+from trail_store import store
+
+# 'client' filters the slider search in the browser, 'server' on every click,
+# 'auto' picks client unless the catalog is too big to ship to the browser
+FILTER_MODE = os.environ.get('HIKING_FILTER_MODE', 'auto')
+CLIENT_FILTER_MAX_TRAILS = int(os.environ.get('HIKING_CLIENT_FILTER_MAX_TRAILS', '20000'))
+CATALOG_URL = '/hiking/catalog'
+LOOPS = ['closed loop', 'one way']
+# Rough size of the map on a desktop layout, for the server's zoom estimate
+MAP_SIZE = (400, 500)
+# Longest result list that gets an offline download link; the URL names every trail
+MAX_PACK_TRAILS = 50
+
+def filter_trails(trails, distance, elevation, duration, loop):
+    import numpy as np
+    distances = trails.column('distance')
+    elevations = trails.column('max_elevation')
+    durations = trails.column('duration')
+    matches = (
+        (distances >= distance - 5) &
+        (distances <= distance + 5) &
+        (elevations >= elevation - 300) &
+        (elevations <= elevation + 300) &
+        (durations >= duration - 0.5) &
+        (durations <= duration + 0.5) &
+        trails.map('loop', lambda value: value == loop, bool)
+    )
+    return trails.names_of(np.flatnonzero(matches).tolist())
+
+def feature_collection(snapshot, trail_names):
+    """All matched trails as one GeoJSON layer; style and tooltip come from the properties."""
+    colors = ['blue', 'red', 'green', 'yellow', 'purple']
+    features = []
+    for i, trail_name in enumerate(trail_names):
+        if not snapshot.has_gpx(trail_name):
+            # A browser catalog from before a reload can name a removed trail
+            continue
+        features.append({
+            'type': 'Feature',
+            'geometry': snapshot.feature(trail_name),
+            'properties': {'name': trail_name, 'tooltip': trail_name, 'color': colors[i % len(colors)]},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+def facet_index(snapshot):
+    return snapshot.cached('facets', None, lambda: FacetIndex.from_catalog(snapshot.catalog))
+
+def facet_selection(seasons, attractions, drive, loop):
+    return {
+        'season': seasons or [],
+        'attraction': attractions or [],
+        'drive': [drive] if drive else [],
+        'loop': [loop] if loop in LOOPS else [],
+    }
+
+def facet_options(counts, values):
+    return [{'label': f'{value.capitalize()} ({counts[value]})', 'value': value} for value in values]
+
+def drive_options(counts):
+    return [{'label': 'Any', 'value': ''}] + facet_options(counts, [drive_label(hours) for hours in DRIVE_HOURS])
+
+def nearby_note(snapshot, trail_name):
+    # How many other walks could be chained with this one on the same trip
+    if trail_name not in snapshot.catalog:
+        return None
+    count = proximity_graph(snapshot).degree(snapshot.catalog.id(trail_name))
+    if not count:
+        return None
+    return html.Span(f" ({count} {'trail' if count == 1 else 'trails'} within {NEARBY_RADIUS_KM:g} km)",
+                     style={'color': '#cccccc', 'font-size': '14px'})
+
+def filter_mode(snapshot):
+    if FILTER_MODE == 'auto':
+        return 'client' if len(snapshot.trail_names) <= CLIENT_FILTER_MAX_TRAILS else 'server'
+    return FILTER_MODE
+
+def _column(values, dtype):
+    import numpy as np
+    return base64.b64encode(np.asarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+def build_catalog(trails):
+    """The slider-search columns as little-endian typed arrays, plus an ETag.
+
+    Decoded by filter_trails in assets/app.js, which must apply the same
+    conditions as filter_trails above.
+    """
+    loop_codes = trails.map('loop', lambda value: LOOPS.index(value) if value in LOOPS else 255, 'u1')
+    body = json.dumps({
+        'names': list(trails.names),
+        'loops': LOOPS,
+        'distance': _column(trails.column('distance'), '<f8'),
+        'max_elevation': _column(trails.column('max_elevation'), '<f8'),
+        'duration': _column(trails.column('duration'), '<f8'),
+        'loop': _column(loop_codes, 'u1'),
+    }, separators=(',', ':'))
+    return body, hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+def catalog(snapshot):
+    return snapshot.cached('hiking_catalog', None, lambda: build_catalog(snapshot.catalog))
+
+def warm_up_shared(snapshot):
+    catalog(snapshot)
+    facet_index(snapshot)
+
+def catalog_view():
+    body, etag = catalog(store.current())
+    response = Response(body, mimetype='application/json')
+    # Revalidated on every use, answered with 304 while the catalog is unchanged
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+# Turns either search button into the trails to show: the dropdown selection,
+# the slider matches filtered in the browser, or the slider query for the
+# server to filter. Unchanged results never reach the server.
+clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='filter_trails'),
+    Output('hiking-matches', 'data'),
     [Input('search-button', 'n_clicks'), Input('search-button2', 'n_clicks')],
     [State('trail-dropdown', 'value'),
      State('distance-slider', 'value'),
      State('elevation-slider', 'value'),
      State('duration-slider', 'value'),
-     State('loop-radio', 'value')]
+     State('loop-radio', 'value'),
+     State('hiking-filter', 'data'),
+     State('hiking-facets', 'data'),
+     State('hiking-matches', 'data')],
+    prevent_initial_call=True
 )
-def update_filtered_trails(n_clicks1, n_clicks2, selected_trails, distance, elevation, duration, loop):
-    ctx = dash.callback_context
-    if not ctx.triggered:
-        button_id = None
-    else:
-        button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-
-    if button_id == 'search-button':
-        n_clicks = n_clicks1
-        trails_to_display = selected_trails
-        print("debug1 trails:", trails_to_display)
-    elif button_id == 'search-button2':
-        n_clicks = n_clicks2
-        trails_to_display = df_trails[
-            (df_trails['distance'] >= distance - 5) &
-            (df_trails['distance'] <= distance + 5) &
-            (df_trails['max_elevation'] >= elevation - 300) &
-            (df_trails['max_elevation'] <= elevation + 300) &
-            (df_trails['duration'] >= duration - 0.5) &
-            (df_trails['duration'] <= duration + 0.5) &
-            (df_trails['loop'] == loop)
-        ]
-        trails_to_display = trails_to_display['name'].tolist()
-        print("debug2 trails:", trails_to_display)
-
-    else:
-        n_clicks = 0
 
-    if n_clicks == 0:
+# Live counts next to every facet value, and the facet filter the slider
+# search applies: names for the browser to intersect with, or an expression
+# for the server
+@callback(
+    [Output('season-facet', 'options'), Output('attraction-facet', 'options'),
+     Output('drive-facet', 'options'), Output('hiking-facets', 'data')],
+    [Input('season-facet', 'value'), Input('attraction-facet', 'value'),
+     Input('drive-facet', 'value'), Input('loop-radio', 'value')],
+    [State('hiking-filter', 'data')],
+    prevent_initial_call=True
+)
+@instrument
+def update_facets(seasons, attractions, drive, loop, hiking_filter):
+    index = facet_index(store.current())
+    selection = facet_selection(seasons, attractions, drive, loop)
+    counts = index.facet_counts(selection)
+    # Loop is matched by the slider search itself, so here it only narrows the counts
+    expression = selection_expression({facet: values for facet, values in selection.items() if facet != 'loop'})
+    facets = None
+    if len(expression) > 1:
+        facets = {'expression': expression}
+        if hiking_filter and hiking_filter['mode'] == 'client':
+            facets['names'] = index.query(expression)
+    return (facet_options(counts['season'], SEASONS), facet_options(counts['attraction'], ATTRACTIONS),
+            drive_options(counts['drive']), facets)
+
+@callback(
+    [Output('filtered-trails', 'children'), Output('hiking-trail-layer', 'data'), Output('hiking-map', 'viewport')],
+    [Input('hiking-matches', 'data')],
+    prevent_initial_call=True
+)
+@instrument
+def update_filtered_trails(matches):
+    snapshot = store.current()
+    if not matches:
         return dash.no_update, dash.no_update, dash.no_update
+    if 'names' in matches:
+        # Already filtered in the browser: only the geometry is needed from here
+        trails_to_display = matches['names']
+    else:
+        query = matches['query']
+        trails_to_display = filter_trails(snapshot.catalog, query['distance'], query['elevation'],
+                                          query['duration'], query['loop'])
+        if query.get('facets'):
+            allowed = set(facet_index(snapshot).query(query['facets']))
+            trails_to_display = [name for name in trails_to_display if name in allowed]
     
     # Display filtered trails under "Search" button 2
     if trails_to_display==[]:
         filtered_trails_output = html.P("No trails match the selected criteria.", style={'color': 'white'})
     else:
         filtered_trails_output = html.Ul([
-            html.Li(trail_name, style={'color': 'white'}) for trail_name in trails_to_display
+            html.Li([trail_name, nearby_note(snapshot, trail_name)], style={'color': 'white'})
+            for trail_name in trails_to_display
         ])
+        if len(trails_to_display) <= MAX_PACK_TRAILS:
+            filtered_trails_output = html.Div([
+                filtered_trails_output,
+                html.A('Download these trails for offline use', href=pack_url(trails_to_display),
+                       style={'color': 'white', 'text-decoration': 'underline'})
+            ])
     
-    # Display filtered trails on the map
-    features = []
-    centroids = []
-    colors = ['blue', 'red', 'green', 'yellow', 'purple']
+    # Display filtered trails on the map as a single GeoJSON layer
+    collection = feature_collection(snapshot, trails_to_display)
     
-    for i, trail_name in enumerate(trails_to_display):
-        gpx_path = os.path.join('data/trails', f'{trail_name}.gpx')
-        line_string = gpx_to_points(gpx_path)
-        centroid = line_string.centroid.coords[0]
-        centroids.append(centroid)  
-        color = colors[i % len(colors)]
-        feature = dl.Polyline(positions=list(line_string.coords), color=color)
-        feature.children = dl.Tooltip(trail_name)
-        features.append(feature)
+    # Frame the map on the trails' precomputed extents, merged in O(k)
+    bounds = merge_bounds(feature['geometry']['bbox'] for feature in collection['features'])
     
-    # Calculate center based on centroids of filtered trails
-    if centroids:
-        center_latitude = sum([centroid[0] for centroid in centroids]) / len(centroids)
-        center_longitude = sum([centroid[1] for centroid in centroids]) / len(centroids)
-        center = (center_latitude, center_longitude)
-    else:
-        # Default center if no trails are found
-        center = (-37.8136, 144.9631)
-    
-    return filtered_trails_output, features, center
-
-def load_trail_names():
-    df = pd.read_csv('data/50_trails.csv', encoding='utf-8')
-    return [{'label': name, 'value': name} for name in df['name'].unique()]
-
-# Get all trail names
-all_trail_names = df_trails['name'].tolist()
+    return filtered_trails_output, collection, viewport(bounds, *MAP_SIZE)
 
-@app.callback(
+@callback(
     Output('trail-dropdown', 'options'),
     [Input('trail-dropdown', 'search_value')]
 )
+@instrument
 def update_trail_list(search_term):
+    snapshot = store.current()
     if search_term:
-        # Filter trail names based on the input
-        search_term_lower = search_term.lower()
-        filtered_trails = df_trails[df_trails['name'].str.lower().str.startswith(search_term_lower)]
-        if not filtered_trails.empty:
-            # Extract just the 'name' column from the filtered DataFrame
-            trail_names = filtered_trails['name']
+        # Filter trail names based on the input, by binary search over the sorted names
+        matching_ids = snapshot.catalog.prefix(search_term)
+        if matching_ids:
+            trail_names = snapshot.catalog.names_of(matching_ids)
             # Create a list of options for dropdown
             options = [{'label': name, 'value': name} for name in trail_names]
             return options
     # If no search term provided or no matching trails found, return all trail options
-    return [{'label': trail, 'value': trail} for trail in all_trail_names]
-
-# App layout
-app.layout = html.Div([
-    html.Header([
-        html.A('InSync', href='#', className='logo'),
-        html.Ul([
-            html.Li(html.A('Home', href='#', className='active')),
-            html.Li(html.A('My Trail', href='#')),
-            html.Li(html.A('About', href='#')),
-        ], className='navigation')
-    ]),
-    html.Section(className='parallax', children=[
-        html.H2('Start Your Hiking Journey', id='text'),
-        html.Img(src='/assets/monutain_01.png', id='m1'),
-        html.Img(src='/assets/trees_02.png', id='t2'),
-        html.Img(src='/assets/monutain_02.png', id='m2'),
-        html.Img(src='/assets/trees_01.png', id='t1'),
-        html.Img(src='/assets/man.png', id='man'),
-        html.Img(src='/assets/plants.png', id='plants')
-    ]),
-    html.Div(id='dummy-input', style={'display': 'none'}),
-    html.Div(id='dummy-output', style={'display': 'none'}),
-    html.Section(className='sec', children=[
-        html.H2('Trail in Vic'),
-        html.P('Start your journey'),
-        html.Br(), 
-        dbc.Row([
-            dbc.Col([
-                html.H2('Trail Search'),
-
-                dcc.Dropdown(
-                    id='trail-dropdown',
-                    options=[{'label': trail, 'value': trail} for trail in all_trail_names],
-                    value=[],
-                    multi=True,
-                    placeholder="Select a trail.."
-                ),
-
-                html.Div([
-                    html.Button(
-                        'Search',
-                        id='search-button',
-                        n_clicks=0,
-                        className='search-button'
-                    )
-                ], style={'text-align': 'center'}),
-
-                html.H4('OR'),
-                html.Br(),
-
-                html.Div([
-                    html.Label('Distance:', style={'color': 'white'}),
-                    dcc.Slider(
-                        id='distance-slider',
-                        min=0,
-                        max=120,
-                        step=1,
-                        value=5,
-                        marks={i: f'{i} km' for i in range(0, 121, 10)},
-                        tooltip={'always_visible': True, 'placement': 'bottom'}
-                    ),
-                ], style={'text-align': 'left', 'margin-top': '20px'}),
-
-                html.Div([
-                    html.Label('Elevation:', style={'color': 'white'}),
-                    dcc.Slider(
-                        id='elevation-slider',
-                        min=0,
-                        max=3900,
-                        step=1,
-                        value=5,
-                        marks={i: f'{i}m' for i in range(0, 4000, 300)},
-                        tooltip={'always_visible': True, 'placement': 'bottom'}
-                    ),
-                ], style={'text-align': 'left', 'margin-top': '20px'}),
-
-                html.Div([
-                    html.Label('Duration:', style={'color': 'white'}),
-                    dcc.Slider(
-                        id='duration-slider',
-                        min=0,
-                        max=30,
-                        step=0.5,
-                        value=1,
-                        marks={i: f'{i}hr' for i in range(0, 31 , 3)},
-                        tooltip={'always_visible': True, 'placement': 'bottom'}
+    return snapshot.options
+
+# Page layout, built per page load so it always reflects the current trail data
+def layout():
+    snapshot = store.current()
+    all_trail_names = snapshot.trail_names
+    mode = filter_mode(snapshot)
+    counts = facet_index(snapshot).facet_counts({})
+    return html.Div([
+        dcc.Store(id='hiking-filter', data={
+            'mode': mode,
+            'url': CATALOG_URL,
+            'version': catalog(snapshot)[1] if mode == 'client' else None,
+        }),
+        dcc.Store(id='hiking-matches'),
+        html.Header([
+            html.A('InSync', href='#', className='logo'),
+            html.Ul([
+                html.Li(html.A('Home', href='/')),
+                html.Li(html.A('My Trail', href='/my-trail')),
+                html.Li(html.A('All Trails', href='/all-trails')),
+                html.Li(html.A('Hiking', href='/hiking', className='active')),
+                html.Li(html.A('About', href='#')),
+            ], className='navigation')
+        ]),
+        html.Section(className='parallax', children=[
+            html.H2('Start Your Hiking Journey', id='text'),
+            html.Img(src='/assets/monutain_01.png', id='m1'),
+            html.Img(src='/assets/trees_02.png', id='t2'),
+            html.Img(src='/assets/monutain_02.png', id='m2'),
+            html.Img(src='/assets/trees_01.png', id='t1'),
+            html.Img(src='/assets/man.png', id='man'),
+            html.Img(src='/assets/plants.png', id='plants')
+        ]),
+        html.Div(id='dummy-input', style={'display': 'none'}),
+        html.Div(id='dummy-output', style={'display': 'none'}),
+        html.Section(className='sec', children=[
+            html.H2('Trail in Vic'),
+            html.P('Start your journey'),
+            html.Br(), 
+            dbc.Row([
+                dbc.Col([
+                    html.H2('Trail Search'),
+
+                    dcc.Dropdown(
+                        id='trail-dropdown',
+                        options=[{'label': trail, 'value': trail} for trail in all_trail_names],
+                        value=[],
+                        multi=True,
+                        placeholder="Select a trail.."
                     ),
-                ], style={'text-align': 'left', 'margin-top': '20px'}),
-
-                html.Div([
-                    html.Label('Loop:', style={'color': 'white'}),
-                    dcc.RadioItems(
-                        id='loop-radio',
-                        options=[
-                            {'label': 'Closed Loop', 'value': 'closed loop'},
-                            {'label': 'One Way', 'value': 'one way'}
-                        ],
-                        value='closed',  # Default value
-                        labelStyle={'color': 'white', 'display': 'block', 'margin-top': '5px'} # Style for the radio item labels
-                    )
-                ], style={'text-align': 'left', 'margin-top': '20px'}),
-
-                html.Div([
-                    html.Button(
-                        'Search',
-                        id='search-button2',
-                        n_clicks=0,
-                        className='search-button'
-                    )
-                ], style={'text-align': 'center'}),
-
-                html.Br(),
-                html.Br(),
-
-                html.Div(id='filtered-trails'),
-                html.Br(),
-                html.Br()
-
-            ], width=6),
-
-            dbc.Col([
-                dl.Map(
-                    id='trail-map',
-                    children=[dl.TileLayer(), dl.LayerGroup(id='trail-layer')],
-                    style={'width': '100%', 'height': '500px'},
-                    center=(-37.8136, 144.9631),
-                    zoom=12
-                ),
-                dcc.Location(id='url', refresh=False)
-            ], width=4),
-        ], style={'margin': '0 auto', 'width': '100%'}),
-    ]),
-])
-
-# app.layout = app.layout + gdc.Import(src="https://cdn.jsdelivr.net/npm/gsap@3.12.5/dist/gsap.min.js") + gdc.Import(src="https://cdn.jsdelivr.net/npm/gsap@3.12.5/dist/ScrollTrigger.min.js")
-
-
-
-app.clientside_callback(
-    ClientsideFunction(namespace='clientside', function_name='trigger_gsap_animation'),
-    Output('dummy-output', 'children'),
-    [Input('dummy-input', 'children')]
-)
-
-if __name__ == '__main__':
-    app.run_server(debug=True)
-
-
-# app.layout = app.layout + gdc.Import(src="https://cdn.jsdelivr.net/npm/gsap@3.12.5/dist/gsap.min.js") + gdc.Import(src="https://cdn.jsdelivr.net/npm/gsap@3.12.5/dist/ScrollTrigger.min.js")
 
+                    html.Div([
+                        html.Button(
+                            'Search',
+                            id='search-button',
+                            n_clicks=0,
+                            className='search-button'
+                        )
+                    ], style={'text-align': 'center'}),
+
+                    html.H4('OR'),
+                    html.Br(),
+
+                    html.Div([
+                        html.Label('Distance:', style={'color': 'white'}),
+                        dcc.Slider(
+                            id='distance-slider',
+                            min=0,
+                            max=120,
+                            step=1,
+                            value=5,
+                            marks={i: f'{i} km' for i in range(0, 121, 10)},
+                            tooltip={'always_visible': True, 'placement': 'bottom'}
+                        ),
+                    ], style={'text-align': 'left', 'margin-top': '20px'}),
+
+                    html.Div([
+                        html.Label('Elevation:', style={'color': 'white'}),
+                        dcc.Slider(
+                            id='elevation-slider',
+                            min=0,
+                            max=3900,
+                            step=1,
+                            value=5,
+                            marks={i: f'{i}m' for i in range(0, 4000, 300)},
+                            tooltip={'always_visible': True, 'placement': 'bottom'}
+                        ),
+                    ], style={'text-align': 'left', 'margin-top': '20px'}),
+
+                    html.Div([
+                        html.Label('Duration:', style={'color': 'white'}),
+                        dcc.Slider(
+                            id='duration-slider',
+                            min=0,
+                            max=30,
+                            step=0.5,
+                            value=1,
+                            marks={i: f'{i}hr' for i in range(0, 31 , 3)},
+                            tooltip={'always_visible': True, 'placement': 'bottom'}
+                        ),
+                    ], style={'text-align': 'left', 'margin-top': '20px'}),
+
+                    html.Div([
+                        html.Label('Loop:', style={'color': 'white'}),
+                        dcc.RadioItems(
+                            id='loop-radio',
+                            options=[
+                                {'label': 'Closed Loop', 'value': 'closed loop'},
+                                {'label': 'One Way', 'value': 'one way'}
+                            ],
+                            value='closed',  # Default value
+                            labelStyle={'color': 'white', 'display': 'block', 'margin-top': '5px'} # Style for the radio item labels
+                        )
+                    ], style={'text-align': 'left', 'margin-top': '20px'}),
+
+                    html.Div([
+                        html.Label('Season:', style={'color': 'white'}),
+                        dcc.Checklist(
+                            id='season-facet',
+                            options=facet_options(counts['season'], SEASONS),
+                            value=[],
+                            inline=True,
+                            labelStyle={'color': 'white', 'margin-right': '15px'}
+                        ),
+                        html.Label('Attractions:', style={'color': 'white', 'margin-top': '10px'}),
+                        dcc.Checklist(
+                            id='attraction-facet',
+                            options=facet_options(counts['attraction'], ATTRACTIONS),
+                            value=[],
+                            inline=True,
+                            labelStyle={'color': 'white', 'margin-right': '15px'}
+                        ),
+                        html.Label('Drive from Melbourne:', style={'color': 'white', 'margin-top': '10px'}),
+                        dcc.RadioItems(
+                            id='drive-facet',
+                            options=drive_options(counts['drive']),
+                            value='',
+                            inline=True,
+                            labelStyle={'color': 'white', 'margin-right': '15px'}
+                        ),
+                        dcc.Store(id='hiking-facets'),
+                    ], style={'text-align': 'left', 'margin-top': '20px'}),
+
+                    html.Div([
+                        html.Button(
+                            'Search',
+                            id='search-button2',
+                            n_clicks=0,
+                            className='search-button'
+                        )
+                    ], style={'text-align': 'center'}),
+
+                    html.Br(),
+                    html.Br(),
+
+                    html.Div(id='filtered-trails'),
+                    html.Br(),
+                    html.Br()
+
+                ], width=6),
+
+                dbc.Col([
+                    dl.Map(
+                        id='hiking-map',
+                        children=[
+                            tile_layer(),
+                            # Styled, highlighted and zoomed-to in the browser, see trailMap in assets/app.js
+                            dl.GeoJSON(
+                                id='hiking-trail-layer',
+                                data={'type': 'FeatureCollection', 'features': []},
+                                style={'variable': 'trailMap.style'},
+                                hoverStyle={'weight': 6, 'opacity': 1},
+                                zoomToBoundsOnClick=True
+                            ),
+                        ],
+                        style={'width': '100%', 'height': '500px'},
+                        center=(-37.8136, 144.9631),
+                        zoom=12
+                    ),
+                ], width=4),
+            ], style={'margin': '0 auto', 'width': '100%'}),
+        ]),
+    ])
 
-
-app.clientside_callback(
-    ClientsideFunction(namespace='clientside', function_name='trigger_gsap_animation'),
-    Output('dummy-output', 'children'),
-    [Input('dummy-input', 'children')]
-)
-
-if __name__ == '__main__':
-    app.run_server(debug=True)
\ No newline at end of file
@@ -0,0 +1,221 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from dash.exceptions import PreventUpdate
+from flask import Response, g, has_request_context, request
+
+from profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this get a structured log line
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', '0.5'))
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+HELP = {
+    'trail_callback_calls_total': ('counter', 'Dash callback invocations.'),
+    'trail_callback_errors_total': ('counter', 'Dash callback invocations that raised.'),
+    'trail_callback_wall_seconds': ('histogram', 'Dash callback wall-clock time.'),
+    'trail_callback_cpu_seconds': ('histogram', 'Dash callback CPU time on the request thread.'),
+    'trail_callback_response_bytes': ('histogram', 'Size of the callback response body.'),
+    'trail_span_seconds': ('histogram', 'Time spent in named sub-spans such as GPX parsing.'),
+    'trail_cache_requests_total': ('counter', 'Cache lookups by cache and result.'),
+    'trail_warm_up_seconds': ('histogram', 'Time from start-up until the cache warm-up finished.'),
+    'trail_warm_up_tasks_total': ('counter', 'Cache warm-up tasks by result.'),
+    'trail_uploads_total': ('counter', 'Processed photo uploads by result.'),
+    'trail_upload_seconds': ('histogram', 'Time from an upload being queued until it was processed.'),
+    'trail_tile_requests_total': ('counter', 'Map tile requests by result: hit, miss, coalesced, stale or error.'),
+    'trail_tile_upstream_seconds': ('histogram', 'Time to fetch a map tile from the upstream tile server.'),
+}
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Process-wide counters and histograms, rendered as Prometheus text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets=TIME_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def counter_value(self, name, labels):
+        return self._counters.get((name, labels), 0)
+
+    def histogram(self, name, labels):
+        return self._histograms.get((name, labels))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h.counts), h.sum, h.count, h.buckets))
+                                for key, h in self._histograms.items())
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described and name in HELP:
+                kind, text = HELP[name]
+                lines.append(f'# HELP {name} {text}')
+                lines.append(f'# TYPE {name} {kind}')
+            described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+        for (name, labels), (counts, total, count, buckets) in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+registry = Registry()
+
+
+def instrument(func):
+    """Record call count, wall/CPU time and errors for a Dash callback.
+
+    Also applies on-demand profiling (see profiling.py). Put it below ``@app.callback(...)`` so Dash registers the wrapped function.
+    """
+    name = f'{func.__module__}.{func.__name__}'
+    labels = (('callback', name),)
+    func = profiled(func, name)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            registry.inc('trail_callback_errors_total', labels)
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            registry.inc('trail_callback_calls_total', labels)
+            registry.observe('trail_callback_wall_seconds', labels, wall)
+            registry.observe('trail_callback_cpu_seconds', labels, cpu)
+            if has_request_context():
+                g.trail_callback = name
+                g.trail_callback_cpu = cpu
+
+    return wrapper
+
+
+@contextmanager
+def span(name):
+    """Time a piece of work inside a callback, e.g. ``with span('gpx_parse'):``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe('trail_span_seconds', (('span', name),), elapsed)
+        if has_request_context():
+            spans = g.setdefault('trail_spans', {})
+            spans[name] = spans.get(name, 0.0) + elapsed
+
+
+def record_cache(cache, hit):
+    registry.inc('trail_cache_requests_total', (('cache', cache), ('result', 'hit' if hit else 'miss')))
+
+
+def _start_request():
+    g.trail_request_start = time.perf_counter()
+
+
+def _finish_request(response):
+    start = g.get('trail_request_start')
+    callback = g.get('trail_callback')
+    if start is None or callback is None:
+        return response
+    wall = time.perf_counter() - start
+    size = response.content_length
+    if size is None and not response.is_streamed:
+        size = len(response.get_data())
+    if size is not None:
+        registry.observe('trail_callback_response_bytes', (('callback', callback),), size, BYTE_BUCKETS)
+    if wall >= SLOW_REQUEST_SECONDS:
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'path': request.path,
+            'callback': callback,
+            'status': response.status_code,
+            'wall_ms': round(wall * 1000, 2),
+            'cpu_ms': round(g.get('trail_callback_cpu', 0.0) * 1000, 2),
+            'response_bytes': size,
+            'spans_ms': {name: round(seconds * 1000, 2) for name, seconds in g.get('trail_spans', {}).items()},
+        }))
+    return response
+
+
+def _metrics_view():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def install(app):
+    """Hook request timing into a Dash app's server and expose /metrics."""
+    server = app.server
+    if 'trail_metrics' in server.view_functions:
+        return
+    server.before_request(_start_request)
+    server.after_request(_finish_request)
+    server.add_url_rule('/metrics', 'trail_metrics', _metrics_view)
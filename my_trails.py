@@ -1,173 +1,150 @@
+# Upload-your-find page, served at /my-trail by app.py
 import dash
-from dash import dcc, html, Input, Output, State, ClientsideFunction
+from dash import dcc, html, Input, Output, State, ClientsideFunction, callback, clientside_callback
 import dash_leaflet as dl
 import dash_bootstrap_components as dbc
 from dash.exceptions import PreventUpdate
-import xml.etree.ElementTree as ET
-from shapely.geometry import LineString, Point
-import os
-import pandas as pd
-from geopy.distance import geodesic
-import base64
- 
-external_stylesheets = [
-    'https://fonts.googleapis.com/css?family=Poppins:300,400,500,600,700,800,900&display=swap',
-    '/assets/style.css',
-    'https://cdnjs.cloudflare.com/ajax/libs/gsap/3.5.1/gsap.min.js',
-    'https://cdnjs.cloudflare.com/ajax/libs/gsap/3.5.1/ScrollTrigger.min.js',
-    dbc.themes.BOOTSTRAP
-]
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets, suppress_callback_exceptions=True,
-                external_scripts=[
-                    'https://cdnjs.cloudflare.com/ajax/libs/gsap/3.5.1/gsap.min.js',
-                    'https://cdnjs.cloudflare.com/ajax/libs/gsap/3.5.1/ScrollTrigger.min.js'
-                ])
- 
-app.clientside_callback(
-    ClientsideFunction(namespace='clientside', function_name='trigger_gsap_animation'),
-    Output('dummy-output', 'children'),
-    [Input('dummy-input', 'children')]
-)
 
-app.clientside_callback(
+from framing import merge_bounds, viewport
+from instrumentation import instrument, span
+from tile_cache import tile_layer
+from trail_store import store
+import uploads
+
+# Rough size of the map on a desktop layout, for the zoom estimate
+MAP_SIZE = (700, 800)
+# How often the page asks how its uploads are getting on, in ms
+UPLOAD_POLL_INTERVAL = 500
+# Upload batches a page keeps tracking; older ones drop off the progress list
+MAX_TRACKED_UPLOADS = 20
+ 
+clientside_callback(
     ClientsideFunction(namespace='clientside', function_name='scroll_to_map'),
     Output('dummy-output-2', 'children'),  # Dummy output, we don't actually need to update anything in the layout
-    [Input('trail-search-dropdown', 'value')]
+    [Input('my-trail-dropdown', 'value')]
 )
  
-# Dummy DataFrame for storing uploads - for demonstration purposes
-df_uploads = pd.DataFrame(columns=['timestamp', 'latitude', 'longitude', 'image_bytes'])
-# Adding a dummy entry
-df_uploads = pd.DataFrame({
-    'timestamp': ['2023-01-01 12:00:00', '2023-01-02 13:00:00', '2023-01-03 14:00:00'],
-    'latitude': [-39.03112, -39.12374, -38.94000],
-    'longitude': [146.32135, 146.42132, 146.35000],
-    'image_bytes': [
-        'https://via.placeholder.com/150/0000FF/808080',
-        'https://via.placeholder.com/150/FF0000/FFFFFF',
-        'https://via.placeholder.com/150/008000/FFFFFF'
-    ]
-})
- 
-def gpx_to_points(gpx_path):
-    tree = ET.parse(gpx_path)
-    root = tree.getroot()
-    namespaces = {'default': 'http://www.topografix.com/GPX/1/1'}
-    route_points = [(float(pt.attrib['lat']), float(pt.attrib['lon'])) for pt in root.findall('.//default:trkpt', namespaces)]
-    return LineString(route_points)
- 
 def load_trail_names():
-    df = pd.read_csv('data/50_trails.csv', encoding='utf-8')
-    return [{'label': name, 'value': name} for name in df['name'].unique()]
+    return store.current().options
  
 def is_within_distance(point, trail_points, max_distance=500):
-    return any(geodesic(point, trail_point).meters <= max_distance for trail_point in trail_points)
- 
-def b64_image(img):
-    with open(img, 'rb') as f:
-        image = f.read()
-    return 'data:image/png;base64,' + base64.b64encode(image).decode('utf-8')
+    from geopy.distance import geodesic
+    with span('geodesic_check'):
+        return any(geodesic(point, trail_point).meters <= max_distance for trail_point in trail_points)
  
  
-app.layout = dbc.Container(fluid=True, children=[
-    dbc.Row([
-        dbc.Col(
-            html.Header([
-                html.A('InSync', href='#', className='logo'),
-                html.Ul([
-                    html.Li(dcc.Link('Home', href='/')),
-                    html.Li(dcc.Link('My Trail', href='/my-trail', className='active')),
-                    html.Li(dcc.Link('All Trails', href='/all-trails')),
-                ], className='navigation')
-            ])
-        )
-    ]),
-    html.Section(className='parallax', children=[
-        html.H2('Start your Trail', id='text2'),
-        dcc.Dropdown(
-                id='trail-search-dropdown',
-                options=load_trail_names(),
-                searchable=True,
-                placeholder='Search for trails...',
-                style={
-                    'width': '55%',  # Adjusts the width to fit its container
-                    'margin': '0 auto',  # Centers the dropdown if its container allows
-                    'borderRadius': '20px',  # Matches the CSS for rounded corners
-                    'fontFamily': '"Poppins", sans-serif',  # Ensure the font matches
-                    'fontSize': '16px'  # Slightly larger font for readability
-                }
-            ),
-        html.Img(src='/assets/monutain_01.png', id='m1'),
-        html.Img(src='/assets/trees_02.png', id='t2', style={'top': '16px'}),
-        html.Img(src='/assets/monutain_02.png', id='m2'),
-        html.Img(src='/assets/trees_01.png', id='t1'),
-        # html.Img(src='/assets/man.png', id='man'),
-        html.Img(src='/assets/plants.png', id='plants')
-    ]),
-    html.Div(id='scroll-trigger', style={'display': 'none'}),
-    html.Div(id='dummy-input', style={'display': 'none'}),
-    html.Div(id='dummy-output', style={'display': 'none'}),
-    html.Div(id='dummy-output-2', style={'display': 'none'}),
-    dbc.Row([
-        dbc.Col([
-            dl.Map(
-                id='trail-map',
-                children=[dl.TileLayer(), dl.LayerGroup(id='trail-layer'), dl.LayerGroup(id='image-layer')],
-                style={'width': '100%', 'height': '800px'},
-                center=(-37.8136, 144.9631),
-                zoom=12
+# Built per page load so the dropdown always reflects the current trail data
+def layout():
+    return dbc.Container(fluid=True, children=[
+        # Bootstrap styling only applies on this page
+        html.Link(rel='stylesheet', href=dbc.themes.BOOTSTRAP),
+        dbc.Row([
+            dbc.Col(
+                html.Header([
+                    html.A('InSync', href='#', className='logo'),
+                    html.Ul([
+                        html.Li(dcc.Link('Home', href='/')),
+                        html.Li(dcc.Link('My Trail', href='/my-trail', className='active')),
+                        html.Li(dcc.Link('All Trails', href='/all-trails')),
+                        html.Li(dcc.Link('Hiking', href='/hiking')),
+                    ], className='navigation')
+                ])
             )
-        ], width=15, lg=7),  # Map takes up 6 columns on large screens, full width on smaller ones
+        ]),
+        html.Section(className='parallax', children=[
+            html.H2('Start your Trail', id='text2'),
+            dcc.Dropdown(
+                    id='my-trail-dropdown',
+                    options=load_trail_names(),
+                    searchable=True,
+                    placeholder='Search for trails...',
+                    style={
+                        'width': '55%',  # Adjusts the width to fit its container
+                        'margin': '0 auto',  # Centers the dropdown if its container allows
+                        'borderRadius': '20px',  # Matches the CSS for rounded corners
+                        'fontFamily': '"Poppins", sans-serif',  # Ensure the font matches
+                        'fontSize': '16px'  # Slightly larger font for readability
+                    }
+                ),
+            html.Img(src='/assets/monutain_01.png', id='m1'),
+            html.Img(src='/assets/trees_02.png', id='t2', style={'top': '16px'}),
+            html.Img(src='/assets/monutain_02.png', id='m2'),
+            html.Img(src='/assets/trees_01.png', id='t1'),
+            # html.Img(src='/assets/man.png', id='man'),
+            html.Img(src='/assets/plants.png', id='plants')
+        ]),
+        html.Div(id='scroll-trigger', style={'display': 'none'}),
+        html.Div(id='dummy-input', style={'display': 'none'}),
+        html.Div(id='dummy-output', style={'display': 'none'}),
+        html.Div(id='dummy-output-2', style={'display': 'none'}),
+        dbc.Row([
+            dbc.Col([
+                dl.Map(
+                    id='my-trail-map',
+                    children=[tile_layer(), dl.LayerGroup(id='my-trail-layer'), dl.LayerGroup(id='my-image-layer')],
+                    style={'width': '100%', 'height': '800px'},
+                    center=(-37.8136, 144.9631),
+                    zoom=12
+                )
+            ], width=15, lg=7),  # Map takes up 6 columns on large screens, full width on smaller ones
         
-        dbc.Col([
-            dbc.Row(justify="center", className="h-100 align-items-center", children=[
-                dbc.Col([
-                    dbc.Button('Found something interesting? Upload your find!', id='find-btn', n_clicks=0,
-                               color="primary", className="mb-3", style={'display': 'block', 'width': '100%','marginLeft': '100px'}),
-                    dcc.Upload(
-                        id='upload-image',
-                        children=html.Div(['Drag and Drop or ', html.A('Select Files')]),
-                        style={
-                            'width': '100%', 'height': '60px', 'lineHeight': '60px',
-                            'borderWidth': '1px', 'borderStyle': 'dashed', 'borderRadius': '5px',
-                            'textAlign': 'center', 'margin': '0 auto', 'display': 'block','marginLeft': '100px'
-                        },
-                        accept='.png,.jpg,.jpeg,.heic',
-                        multiple=True
-                    )
-                ], width=10)  # Adjust width as needed for aesthetic preferences
-            ])
-        ], width=9, lg=5, className="d-flex"),  # Make the column a flex container
-    ]),
-    dbc.Modal([
-        dbc.ModalHeader(dbc.ModalTitle("Action Required")),
-        dbc.ModalBody("Please select a trail before uploading."),
-        dbc.ModalFooter(dbc.Button("Close", id="close-modal", className="ms-auto", n_clicks=0))
-    ], id="modal", is_open=False),
-    dbc.Modal([
-        dbc.ModalHeader("Location Sharing Required"),
-        dbc.ModalBody("You need to share your location before uploading an image."),
-        dbc.ModalFooter(dbc.Button("OK", id="close-location-modal", className="ms-auto", n_clicks=0))
-    ], id="location-error-modal", is_open=False),
-    dbc.Modal([
-        dbc.ModalHeader(dbc.ModalTitle("Too Far From Trail")),
-        dbc.ModalBody("You are too far from the selected trail to upload images."),
-        dbc.ModalFooter(
-            dbc.Button("Close", id="close-too-far-modal", className="ms-auto", n_clicks=0)
-        )
-    ], id="too-far-modal", is_open=False),
-    html.Div(id='upload-status', style={'display': 'none'})
+            dbc.Col([
+                dbc.Row(justify="center", className="h-100 align-items-center", children=[
+                    dbc.Col([
+                        dbc.Button('Found something interesting? Upload your find!', id='find-btn', n_clicks=0,
+                                   color="primary", className="mb-3", style={'display': 'block', 'width': '100%','marginLeft': '100px'}),
+                        dcc.Upload(
+                            id='upload-image',
+                            children=html.Div(['Drag and Drop or ', html.A('Select Files')]),
+                            style={
+                                'width': '100%', 'height': '60px', 'lineHeight': '60px',
+                                'borderWidth': '1px', 'borderStyle': 'dashed', 'borderRadius': '5px',
+                                'textAlign': 'center', 'margin': '0 auto', 'display': 'block','marginLeft': '100px'
+                            },
+                            accept='.png,.jpg,.jpeg,.heic',
+                            multiple=True
+                        ),
+                        html.Div(id='upload-status', style={'marginLeft': '100px', 'marginTop': '10px'}),
+                        html.Div(id='location-div'),
+                        # Where the browser put the user, once they have shared their location
+                        dcc.Store(id='device-location'),
+                        dcc.Store(id='upload-jobs', data=[]),
+                        dcc.Store(id='upload-version'),
+                        dcc.Interval(id='upload-poll', interval=UPLOAD_POLL_INTERVAL, disabled=True)
+                    ], width=10)  # Adjust width as needed for aesthetic preferences
+                ])
+            ], width=9, lg=5, className="d-flex"),  # Make the column a flex container
+        ]),
+        dbc.Modal([
+            dbc.ModalHeader(dbc.ModalTitle("Action Required")),
+            dbc.ModalBody("Please select a trail before uploading."),
+            dbc.ModalFooter(dbc.Button("Close", id="close-modal", className="ms-auto", n_clicks=0))
+        ], id="modal", is_open=False),
+        dbc.Modal([
+            dbc.ModalHeader("Location Sharing Required"),
+            dbc.ModalBody("You need to share your location before uploading an image."),
+            dbc.ModalFooter(dbc.Button("OK", id="close-location-modal", className="ms-auto", n_clicks=0))
+        ], id="location-error-modal", is_open=False),
+        dbc.Modal([
+            dbc.ModalHeader(dbc.ModalTitle("Too Far From Trail")),
+            dbc.ModalBody("You are too far from the selected trail to upload images."),
+            dbc.ModalFooter(
+                dbc.Button("Close", id="close-too-far-modal", className="ms-auto", n_clicks=0)
+            )
+        ], id="too-far-modal", is_open=False),
+ 
  
+    ])
  
-])
  
  
-@app.callback(
+@callback(
     Output('modal', 'is_open'),
     [Input('find-btn', 'n_clicks'), Input('close-modal', 'n_clicks')],
-    [State('trail-search-dropdown', 'value'), State('modal', 'is_open')],
+    [State('my-trail-dropdown', 'value'), State('modal', 'is_open')],
     prevent_initial_call=True
 )
+@instrument
 def toggle_trail_modal(find_clicks, close_clicks, selected_trail, is_open):
     ctx = dash.callback_context
     if not ctx.triggered or selected_trail is not None:
@@ -183,22 +160,24 @@ def toggle_trail_modal(find_clicks, close_clicks, selected_trail, is_open):
             return False
     return is_open
  
-@app.callback(
+@callback(
     Output('location-div', 'children'),
     [Input('find-btn', 'n_clicks')],
-    [State('trail-search-dropdown', 'value')]
+    [State('my-trail-dropdown', 'value')]
 )
+@instrument
 def display_geolocation(n, selected_trail):
     if n > 0 and selected_trail:
         return dcc.Geolocation(id='geo')
     return []
  
-@app.callback(
+@callback(
     Output('location-error-modal', 'is_open'),
     [Input('close-location-modal', 'n_clicks'), Input('geo', 'position_error')],
     [State('location-error-modal', 'is_open')],
     prevent_initial_call=True
 )
+@instrument
 def toggle_location_error_modal(close_clicks, position_error, is_open):
     ctx = dash.callback_context
     triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
@@ -209,14 +188,23 @@ def toggle_location_error_modal(close_clicks, position_error, is_open):
         return True
     return is_open
  
-@app.callback(
+@callback(
+    Output('device-location', 'data'),
+    [Input('geo', 'position'), Input('geo', 'local_date'), Input('geo', 'position_error')]
+)
+@instrument
+def store_device_location(position, local_date, position_error):
+    return {'position': None if position_error else position, 'local_date': local_date}
+ 
+@callback(
     Output('too-far-modal', 'is_open'),
     [Input('close-too-far-modal', 'n_clicks'),
      Input('geo', 'position')],
-    [State('trail-search-dropdown', 'value'),
+    [State('my-trail-dropdown', 'value'),
      State('too-far-modal', 'is_open')],
     prevent_initial_call=True
 )
+@instrument
 def handle_too_far_modal(close_clicks, position, selected_trail, is_open):
     ctx = dash.callback_context
     if not ctx.triggered:
@@ -227,8 +215,7 @@ def handle_too_far_modal(close_clicks, position, selected_trail, is_open):
     elif triggered_id == 'geo':
         if not position or not selected_trail:
             return False
-        gpx_path = os.path.join('data/trails', f'{selected_trail}.gpx')
-        trail_points = gpx_to_points(gpx_path).coords
+        trail_points = store.current().line_string(selected_trail).coords
         user_position = (position['lat'], position['lon'])
         if is_within_distance(user_position, trail_points):
             return False
@@ -236,11 +223,12 @@ def handle_too_far_modal(close_clicks, position, selected_trail, is_open):
             return True
     return is_open
  
-@app.callback(
+@callback(
     [Output('find-btn', 'style'), Output('upload-image', 'style')],
     [Input('geo', 'local_date'), Input('geo', 'position_error'), Input('close-too-far-modal', 'n_clicks')],
     prevent_initial_call=True
 )
+@instrument
 def update_button_visibility(local_date, position_error, close_clicks):
     ctx = dash.callback_context
     if not ctx.triggered:
@@ -265,47 +253,77 @@ def update_button_visibility(local_date, position_error, close_clicks):
  
     return {'display': 'block', 'marginLeft': '550px'}, {'display': 'none'}
  
-@app.callback(
-    Output('upload-status', 'children'),  # An Output to indicate the upload status
-    [Input('upload-image', 'contents'),  # Contents from the upload component
-     Input('geo', 'local_date')],  # Date from the geolocation component
-    [State('geo', 'position'),  # Position state from geolocation
-     State('geo', 'position_error')],  # Position error state from geolocation
+def upload_progress(statuses, names):
+    rows = []
+    for status in statuses:
+        if status['finished']:
+            text = f"{status['added']} photo{'' if status['added'] == 1 else 's'} added to the map"
+            if status['error']:
+                text = f"{text}. {status['error']}" if status['added'] else status['error']
+            color = 'warning' if status['error'] and status['added'] else 'danger' if status['error'] else 'success'
+        else:
+            text, color = f"Processing {status['processed']} of {status['count']}...", 'primary'
+        rows.append(html.Div([
+            html.Small(f"{names.get(status['id']) or 'Photos'}: {text}"),
+            dbc.Progress(value=round(status['progress'] * 100), color=color, striped=not status['finished'],
+                         animated=not status['finished'], style={'height': '6px'}),
+        ], className='mb-2'))
+    return rows
+ 
+@callback(
+    [Output('upload-jobs', 'data'), Output('upload-poll', 'disabled'), Output('upload-status', 'children')],
+    [Input('upload-image', 'contents')],  # Contents from the upload component
+    [State('upload-image', 'filename'),
+     State('my-trail-dropdown', 'value'),
+     State('device-location', 'data'),  # Empty until the user shares their location
+     State('upload-jobs', 'data')],
     prevent_initial_call=True
 )
-def handle_upload(contents, local_date, position, position_error):
-    if contents is None:
+@instrument
+def handle_upload(contents, filenames, trail, device, jobs):
+    if not contents:
         # If no image is uploaded, do nothing
-        return "No image uploaded."
-    if position_error:
-        # Handle case where geolocation failed
-        return "Failed to get geolocation data."
-    content_type, content_string = contents[0].split(',')  # Taking the first uploaded file
-    image_bytes = content_string  # base64 encoded string of the first image
-    latitude = position['lat']
-    longitude = position['lon']
-    global df_uploads
-    df_uploads = df_uploads.append({
-        'timestamp': local_date,  # Use the date provided by the geolocation component
-        'latitude': latitude,
-        'longitude': longitude,
-        'image_bytes': image_bytes
-    }, ignore_index=True)
-    print(df_uploads)
-    return "Image uploaded successfully!"
+        return dash.no_update, dash.no_update, "No image uploaded."
+    # EXIF GPS tags and capture times along the trail place the photos; the device position is a fallback
+    device = device or {}
+    # The whole selection is one batch for the upload workers; the page polls for progress
+    job_id = uploads.queue.submit(contents, trail, device.get('position'), device.get('local_date'))
+    name = filenames[0] if filenames and len(filenames) == 1 else f'{len(contents)} photos'
+    jobs = ((jobs or []) + [{'id': job_id, 'name': name}])[-MAX_TRACKED_UPLOADS:]
+    statuses = uploads.queue.status([job['id'] for job in jobs])
+    return jobs, False, upload_progress(statuses, {job['id']: job['name'] for job in jobs})
  
-@app.callback(
-    [Output('image-layer', 'children')],
-    [Input('upload-image', 'contents'),
-     Input('trail-search-dropdown', 'value')],
-    [State('trail-map', 'zoom')]  # Include map zoom as state
+@callback(
+    [Output('upload-status', 'children', allow_duplicate=True),
+     Output('upload-poll', 'disabled', allow_duplicate=True),
+     Output('upload-version', 'data')],
+    [Input('upload-poll', 'n_intervals')],
+    [State('upload-jobs', 'data'), State('upload-version', 'data')],
+    prevent_initial_call=True
 )
-def display_image_marker(contents, trail, zoom):
+@instrument
+def poll_uploads(n_intervals, jobs, version):
+    jobs = jobs or []
+    statuses = uploads.queue.status([job['id'] for job in jobs])
+    # The markers redraw once a finished upload has reached the index
+    latest = uploads.index.version
+    return (upload_progress(statuses, {job['id']: job['name'] for job in jobs}),
+            all(status['finished'] for status in statuses),
+            latest if latest != version else dash.no_update)
+ 
+@callback(
+    [Output('my-image-layer', 'children')],
+    [Input('upload-version', 'data'),
+     Input('my-trail-dropdown', 'value')],
+    [State('my-trail-map', 'zoom')]  # Include map zoom as state
+)
+@instrument
+def display_image_marker(version, trail, zoom):
     markers = []
     if not trail:
         return [dash.no_update]
-    gpx_path = os.path.join('data/trails', f'{trail}.gpx')
-    trail_points = gpx_to_points(gpx_path).coords
+    snapshot = store.current()
+    trail_points = snapshot.line_string(trail).coords
     # Start and finish markers with a custom className for targeting
     start_marker = dl.Marker(
         position=trail_points[0],
@@ -326,39 +344,34 @@ def display_image_marker(contents, trail, zoom):
         }
     )
     markers.extend([start_marker, finish_marker])
-    # Image markers
-    if contents and not df_uploads.empty:
-        filtered_df = df_uploads[df_uploads.apply(lambda row: is_within_distance((row['latitude'], row['longitude']), trail_points), axis=1)]
-        for _, row in filtered_df.iterrows():
-            image_url = row['image_bytes']
-            image_element = html.Img(src=image_url, style={'width': '100px', 'height': 'auto'})
-            image_marker = dl.Marker(
-                position=[row['latitude'], row['longitude']],
-                children=[dl.Popup(children=[image_element])],
-                icon={
-                    "iconUrl": image_url,
-                    "iconSize": [zoom * 5, zoom * 5],  # Adjust size dynamically based on zoom
-                    "className": "dynamic-icon"  # Use this class to adjust the icon size via JS if needed
-                }
-            )
-            markers.append(image_marker)
+    # Image markers: processed uploads near this trail, served as files rather than inlined
+    with span('upload_index'):
+        nearby = uploads.index.near(snapshot, trail)
+    for upload in nearby:
+        image_element = html.A(html.Img(src=upload['thumbnail'], style={'width': '100px', 'height': 'auto'}),
+                               href=upload['image'], target='_blank')
+        image_marker = dl.Marker(
+            position=[upload['latitude'], upload['longitude']],
+            children=[dl.Popup(children=[image_element])],
+            icon={
+                "iconUrl": upload['thumbnail'],
+                "iconSize": [zoom * 5, zoom * 5],  # Adjust size dynamically based on zoom
+                "className": "dynamic-icon"  # Use this class to adjust the icon size via JS if needed
+            }
+        )
+        markers.append(image_marker)
  
     return [markers]
  
-@app.callback(
-    [Output('trail-layer', 'children'), Output('trail-map', 'center')],
-    [Input('trail-search-dropdown', 'value')]
+@callback(
+    [Output('my-trail-layer', 'children'), Output('my-trail-map', 'viewport')],
+    [Input('my-trail-dropdown', 'value')]
 )
+@instrument
 def update_map(trail_name):
     if not trail_name:
         return [], dash.no_update
-    gpx_path = os.path.join('data/trails', f'{trail_name}.gpx')
-    line_string = gpx_to_points(gpx_path)
-    centroid = line_string.centroid.coords[0]
-    positions = list(line_string.coords)
+    snapshot = store.current()
+    positions = list(snapshot.line_string(trail_name).coords)
     features = [dl.Polyline(positions=positions, color='blue')]
-    return features, centroid
- 
- 
-if __name__ == '__main__':
-    app.run_server(debug=True)
\ No newline at end of file
+    return features, viewport(merge_bounds([snapshot.bbox(trail_name)]), *MAP_SIZE)
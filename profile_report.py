@@ -0,0 +1,91 @@
+"""Summarise the callback profiles written by profiling.py.
+
+    python profile_report.py                      # top frames across all captures
+    python profile_report.py --callback update_trail_info --top 30
+    python profile_report.py --folded-out all.folded   # merged input for flamegraph.pl
+    python profile_report.py --sign display_image_marker   # X-Trail-Profile header value
+"""
+import argparse
+import glob
+import os
+import pstats
+from collections import Counter
+
+import profiling
+
+
+def find_profiles(directory, callback, extension):
+    paths = sorted(glob.glob(os.path.join(directory, f'*.{extension}')))
+    if callback:
+        paths = [path for path in paths if f'.{callback}-' in os.path.basename(path)
+                 or f'-{callback}-' in os.path.basename(path)]
+    return paths
+
+
+def report_pstats(paths, top, sort):
+    stats = pstats.Stats(paths[0])
+    for path in paths[1:]:
+        stats.add(path)
+    print(f'{len(paths)} cProfile captures')
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+
+
+def report_folded(paths, top, folded_out):
+    stacks = Counter()
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack:
+                    stacks[stack] += int(count)
+    total = sum(stacks.values()) or 1
+
+    own = Counter()
+    inclusive = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+
+    print(f'{len(paths)} sampled captures, {total} samples')
+    print(f'{"self %":>8} {"total %":>8}  frame')
+    for frame, count in own.most_common(top):
+        print(f'{count / total:8.1%} {inclusive[frame] / total:8.1%}  {frame}')
+
+    if folded_out:
+        with open(folded_out, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        print(f'merged stacks written to {folded_out}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarise captured callback profiles.')
+    parser.add_argument('--dir', default=profiling.PROFILE_DIR)
+    parser.add_argument('--callback', help='only captures for this callback name')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--sort', default='cumulative', help='pstats sort key')
+    parser.add_argument('--folded-out', help='write all sampled stacks merged into this file')
+    parser.add_argument('--sign', metavar='CALLBACK', help='print a signed X-Trail-Profile header value')
+    args = parser.parse_args()
+
+    if args.sign:
+        if not profiling.PROFILE_SECRET:
+            parser.error('TRAIL_PROFILE_SECRET is not set')
+        print(f'{profiling.HEADER}: {profiling.header_value(args.sign)}')
+        return
+
+    pstats_paths = find_profiles(args.dir, args.callback, 'pstats')
+    folded_paths = find_profiles(args.dir, args.callback, 'folded')
+    if not pstats_paths and not folded_paths:
+        print(f'no profiles found in {args.dir}')
+        return
+    if pstats_paths:
+        report_pstats(pstats_paths, args.top, args.sort)
+    if folded_paths:
+        report_folded(folded_paths, args.top, args.folded_out)
+
+
+if __name__ == '__main__':
+    main()
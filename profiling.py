@@ -0,0 +1,158 @@
+import cProfile
+import hashlib
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from flask import has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+# Callbacks to profile on every call, e.g. "display_image_marker,update_trail_info" or "*"
+PROFILE_TARGETS = {name.strip() for name in os.environ.get('TRAIL_PROFILE', '').split(',') if name.strip()}
+# When set, a request can ask for a profile with a signed X-Trail-Profile header
+PROFILE_SECRET = os.environ.get('TRAIL_PROFILE_SECRET', '')
+# "cprofile" writes .pstats, "sample" writes collapsed stacks (.folded) for flamegraph tools
+PROFILE_MODE = os.environ.get('TRAIL_PROFILE_MODE', 'cprofile')
+PROFILE_DIR = os.environ.get('TRAIL_PROFILE_DIR', 'profiles')
+PROFILE_KEEP = int(os.environ.get('TRAIL_PROFILE_KEEP', '200'))
+SAMPLE_INTERVAL = float(os.environ.get('TRAIL_PROFILE_SAMPLE_INTERVAL', '0.001'))
+
+HEADER = 'X-Trail-Profile'
+
+# cProfile can't nest, so only one request is profiled at a time
+_active = threading.Lock()
+_sequence = 0
+
+
+def sign(callback, expires):
+    message = f'{callback}:{expires}'.encode()
+    return hmac.new(PROFILE_SECRET.encode(), message, hashlib.sha256).hexdigest()
+
+
+def header_value(callback, ttl=3600):
+    """Build an X-Trail-Profile value that asks for one callback to be profiled."""
+    expires = int(time.time()) + ttl
+    return f'{callback}:{expires}:{sign(callback, expires)}'
+
+
+def _matches(target, name):
+    return target == '*' or target == name or name.endswith('.' + target)
+
+
+def _requested_by_header(name):
+    if not has_request_context():
+        return False
+    value = request.headers.get(HEADER)
+    if not value:
+        return False
+    try:
+        target, expires, signature = value.rsplit(':', 2)
+        expires = int(expires)
+    except ValueError:
+        return False
+    if expires < time.time() or not _matches(target, name):
+        return False
+    return hmac.compare_digest(signature, sign(target, expires))
+
+
+def profiled(func, name):
+    """Wrap a callback so selected calls are profiled to PROFILE_DIR.
+
+    Returns ``func`` itself when profiling isn't configured for it, so the
+    disabled case costs nothing.
+    """
+    always = any(_matches(target, name) for target in PROFILE_TARGETS)
+    if not always and not PROFILE_SECRET:
+        return func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not (always or _requested_by_header(name)):
+            return func(*args, **kwargs)
+        if not _active.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            if PROFILE_MODE == 'sample':
+                return _run_sampled(func, name, args, kwargs)
+            return _run_cprofile(func, name, args, kwargs)
+        finally:
+            _active.release()
+
+    return wrapper
+
+
+def _run_cprofile(func, name, args, kwargs):
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, *args, **kwargs)
+    finally:
+        _write(name, 'pstats', profile.dump_stats)
+
+
+def _run_sampled(func, name, args, kwargs):
+    target = threading.get_ident()
+    entry = getattr(func, '__code__', None)
+    stacks = Counter()
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                if code is entry:
+                    # Frames above the callback are just the server plumbing
+                    break
+                frame = frame.f_back
+            if stack and not done.is_set():
+                stacks[';'.join(reversed(stack))] += 1
+
+    sampler = threading.Thread(target=sample, name='trail-profile-sampler', daemon=True)
+    sampler.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        done.set()
+        sampler.join()
+
+        def dump(path):
+            with open(path, 'w') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f'{stack} {count}\n')
+
+        _write(name, 'folded', dump)
+
+
+def _write(name, extension, dump):
+    global _sequence
+    _sequence += 1
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(PROFILE_DIR, f'{stamp}-{name}-{os.getpid()}-{_sequence}.{extension}')
+        dump(path)
+        _rotate()
+        logger.info('wrote profile %s', path)
+    except OSError:
+        logger.exception('could not write profile for %s', name)
+
+
+def _rotate():
+    entries = [entry for entry in os.scandir(PROFILE_DIR)
+               if entry.is_file() and entry.name.endswith(('.pstats', '.folded'))]
+    if len(entries) <= PROFILE_KEEP:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - PROFILE_KEEP]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
@@ -0,0 +1,138 @@
+import os
+
+# Trails are linked when a start or end point lies within this many km of
+# the other's; queries can ask for any smaller radius
+NEARBY_RADIUS_KM = float(os.environ.get('TRAIL_NEARBY_RADIUS_KM', '10'))
+# Closest neighbours kept per trail, so dense areas can't blow up the graph
+MAX_NEARBY = int(os.environ.get('TRAIL_MAX_NEARBY', '25'))
+# Trails per batch of candidate pairs
+CHUNK_TRAILS = 10000
+
+KM_PER_DEGREE = 111.32
+
+
+def _planar_km(lats, lons):
+    import numpy as np
+    return lons * KM_PER_DEGREE * np.cos(np.radians(lats)), lats * KM_PER_DEGREE
+
+
+def _chunk_edges(sources, cells, width, radius):
+    """(trail, other trail, km) with the closest endpoint pair of each trail pair, for the ``sources`` points.
+
+    Both are (trails, x, y, cell keys) arrays; ``cells`` is sorted by cell
+    key, so each cell's points are one contiguous run.
+    """
+    import numpy as np
+    source_trails, source_x, source_y, source_keys = sources
+    cell_trails, cell_x, cell_y, cell_keys = cells
+    trails, others, distances = [], [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            target = source_keys + dx * width + dy
+            low = np.searchsorted(cell_keys, target, 'left')
+            counts = np.searchsorted(cell_keys, target, 'right') - low
+            total = int(counts.sum())
+            if not total:
+                continue
+            source = np.repeat(np.arange(len(source_keys)), counts)
+            other = np.arange(total) + np.repeat(low - (np.cumsum(counts) - counts), counts)
+            distance = np.hypot(source_x[source] - cell_x[other], source_y[source] - cell_y[other])
+            keep = (distance <= radius).nonzero()[0]
+            source_trail, other_trail = source_trails[source[keep]], cell_trails[other[keep]]
+            different = source_trail != other_trail
+            trails.append(source_trail[different])
+            others.append(other_trail[different])
+            distances.append(distance[keep[different]])
+    if not trails:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32)
+    # Sort by trail pair, then keep each pair's smallest distance
+    pairs = np.concatenate(trails).astype(np.int64) << 32 | np.concatenate(others)
+    distances = np.concatenate(distances)
+    order = np.argsort(pairs)
+    pairs, distances = pairs[order], distances[order]
+    firsts = np.r_[True, pairs[1:] != pairs[:-1]].nonzero()[0]
+    distances = np.minimum.reduceat(distances, firsts)
+    pairs = pairs[firsts]
+    return pairs >> 32, pairs & 0xFFFFFFFF, distances
+
+
+class ProximityGraph:
+    """Trails whose start or end points lie within a radius of each other.
+
+    Stored as CSR adjacency: the neighbours of trail ``id`` are
+    ``indices[indptr[id]:indptr[id + 1]]``, closest first, with their
+    distances in km alongside. Built on a grid of radius-sized cells, so
+    each endpoint is only compared with the points in its 3x3 block and
+    construction is near-linear while density is bounded.
+    """
+
+    def __init__(self, indptr, indices, distances, radius):
+        self.indptr = indptr
+        self.indices = indices
+        self.distances = distances
+        self.radius = radius
+
+    @classmethod
+    def build(cls, endpoints, radius=NEARBY_RADIUS_KM, limit=MAX_NEARBY):
+        """``endpoints`` holds each trail's (lat, lon) start/end points; trails without any get no edges."""
+        import numpy as np
+        size = len(endpoints)
+        point_trails = np.array([id for id, points in enumerate(endpoints) for _ in points], dtype=np.int32)
+        coordinates = np.array([point for points in endpoints for point in points], dtype=np.float64).reshape(-1, 2)
+        x, y = _planar_km(coordinates[:, 0], coordinates[:, 1])
+        x, y = x.astype(np.float32), y.astype(np.float32)
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        if not len(point_trails):
+            return cls(indptr, np.empty(0, np.int32), np.empty(0, np.float32), radius)
+
+        cells_x = np.floor(x / radius).astype(np.int64)
+        cells_y = np.floor(y / radius).astype(np.int64)
+        cells_x -= cells_x.min() - 1
+        cells_y -= cells_y.min() - 1
+        width = int(cells_y.max()) + 2
+        keys = cells_x * width + cells_y
+        order = np.argsort(keys, kind='stable')
+        cells = (point_trails[order], x[order], y[order], keys[order])
+
+        parts = []
+        # Points are grouped by trail, so a chunk never splits a trail's endpoints
+        boundaries = np.searchsorted(point_trails, np.arange(0, size + CHUNK_TRAILS, CHUNK_TRAILS))
+        for low, high in zip(boundaries[:-1], boundaries[1:]):
+            if low == high:
+                continue
+            chunk = slice(low, high)
+            trails, others, distances = _chunk_edges(
+                (point_trails[chunk], x[chunk], y[chunk], keys[chunk]), cells, width, radius)
+            # Closest first per trail, at most ``limit`` of them; non-negative
+            # float32 bits sort like the floats
+            ranked = np.argsort(trails << 32 | distances.astype(np.float32).view(np.int32))
+            trails, others, distances = trails[ranked], others[ranked], distances[ranked]
+            starts = np.searchsorted(trails, trails, 'left')
+            keep = np.arange(len(trails)) - starts < limit
+            parts.append((trails[keep], others[keep], distances[keep]))
+        trails, indices, distances = (np.concatenate(column) for column in zip(*parts))
+        indptr[1:] = np.cumsum(np.bincount(trails, minlength=size))
+        return cls(indptr, indices.astype(np.int32), distances.astype(np.float32), radius)
+
+    def _row(self, id, radius):
+        low, high = self.indptr[id], self.indptr[id + 1]
+        if radius is not None and radius < self.radius:
+            high = low + int(self.distances[low:high].searchsorted(radius, 'right'))
+        return low, high
+
+    def nearby(self, id, radius=None):
+        """(trail id, km) of the trails near ``id``, closest first."""
+        low, high = self._row(id, radius)
+        return list(zip(self.indices[low:high].tolist(), self.distances[low:high].tolist()))
+
+    def degree(self, id, radius=None):
+        low, high = self._row(id, radius)
+        return int(high - low)
+
+
+def endpoints(snapshot):
+    return [snapshot.endpoints(trail_name) for trail_name in snapshot.catalog.names]
+
+
+def proximity_graph(snapshot):
+    return snapshot.cached('nearby_trails', None, lambda: ProximityGraph.build(endpoints(snapshot)), gpx=True)
@@ -0,0 +1,257 @@
+import hashlib
+import logging
+import math
+import os
+import re
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Neighbour table written by build_similarity.py; used when it matches the current data
+INDEX_PATH = os.environ.get('TRAIL_SIMILARITY_INDEX', 'data/similar_trails.npz')
+
+# Neighbours kept per trail, and the approximate search that finds them
+TOP_K = 10
+TREES = 8
+LEAF_SIZE = 64
+REFINE_CHUNK = 5000
+
+# Relative weight of each part of a trail's feature vector
+ATTRIBUTE_WEIGHT = 1.0
+GEO_WEIGHT = 1.0
+TEXT_WEIGHT = 1.5
+# Start points this far apart differ by one unit, like one standard deviation of an attribute
+GEO_SCALE_KM = 50.0
+TEXT_DIMS = 32
+TEXT_CHUNK = 10000
+
+STOPWORDS = frozenset('the and for with this that from are its into along through offers'
+                      ' trail walk hike track'.split())
+
+
+def _tokens(text):
+    return [word for word in re.findall(r'[a-z]{3,}', text.lower()) if word not in STOPWORDS]
+
+
+def _attribute_vectors(catalog):
+    import numpy as np
+    columns = [np.log1p(np.asarray(catalog.column(column), dtype=np.float64))
+               for column in ('distance', 'elevation_gain', 'duration')]
+    columns = [(values - np.nanmean(values)) / (np.nanstd(values) or 1.0) for values in columns]
+    columns.append(catalog.map('loop', lambda value: value == 'closed loop', np.float64))
+    # Missing values sit at the mean, so they neither attract nor repel
+    return np.nan_to_num(np.column_stack(columns))
+
+
+def _geo_vectors(starts):
+    """Start points as planar km / GEO_SCALE_KM; unknown starts at the centroid of the known ones."""
+    import numpy as np
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    known = ~np.isnan(starts).any(axis=1)
+    if not known.any():
+        return np.zeros((len(starts), 2))
+    lat0 = math.radians(np.mean(starts[known, 0]))
+    vectors = np.column_stack([starts[:, 0] * 111.32, starts[:, 1] * 111.32 * math.cos(lat0)]) / GEO_SCALE_KM
+    vectors[~known] = vectors[known].mean(axis=0)
+    return vectors
+
+
+def _text_vectors(texts):
+    """TF-IDF vectors projected to TEXT_DIMS random dimensions and normalised, so distances track cosine similarity."""
+    import numpy as np
+    vocabulary = {}
+    rows, columns, counts = [], [], []
+    for row, text in enumerate(texts):
+        for token, count in Counter(_tokens(text or '')).items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(token, len(vocabulary)))
+            counts.append(count)
+    vectors = np.zeros((len(texts), TEXT_DIMS), dtype=np.float32)
+    if not vocabulary:
+        return vectors
+    rows = np.array(rows)
+    columns = np.array(columns)
+    document_frequency = np.bincount(columns, minlength=len(vocabulary))
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+    weights = ((1 + np.log(counts)) * idf[columns]).astype(np.float32)
+    projection = np.random.default_rng(0).standard_normal((len(vocabulary), TEXT_DIMS), dtype=np.float32)
+    # Rows are in order, so each chunk of trails is one contiguous run of entries
+    for begin in range(0, len(texts), TEXT_CHUNK):
+        low, high = np.searchsorted(rows, [begin, begin + TEXT_CHUNK])
+        if low == high:
+            continue
+        chunk_rows = rows[low:high]
+        firsts = np.flatnonzero(np.r_[True, chunk_rows[1:] != chunk_rows[:-1]])
+        weighted = projection[columns[low:high]] * weights[low:high, None]
+        vectors[chunk_rows[firsts]] = np.add.reduceat(weighted, firsts, axis=0)
+    norms = np.linalg.norm(vectors, axis=1)
+    known = norms > 0
+    vectors[known] /= norms[known, None]
+    if known.any():
+        vectors[~known] = vectors[known].mean(axis=0)
+    return vectors
+
+
+def _texts(catalog):
+    return [' '.join(filter(None, (catalog.value('description', id), catalog.value('key_attraction', id))))
+            for id in range(len(catalog))]
+
+
+def feature_vectors(catalog, starts):
+    import numpy as np
+    return np.hstack([
+        ATTRIBUTE_WEIGHT * _attribute_vectors(catalog),
+        GEO_WEIGHT * _geo_vectors(starts),
+        TEXT_WEIGHT * _text_vectors(_texts(catalog)),
+    ]).astype(np.float32)
+
+
+def start_points(snapshot):
+    """(lat, lon) of each trail's first GPX point, NaN for trails without a GPX."""
+    nan = float('nan')
+    return [(snapshot.endpoints(trail_name) or [(nan, nan)])[0] for trail_name in snapshot.catalog.names]
+
+
+def input_digest(catalog, starts, k=TOP_K, trees=TREES, leaf_size=LEAF_SIZE):
+    """Hash of everything the index is built from, so a stored table is only used for the same inputs."""
+    import numpy as np
+    settings = (k, trees, leaf_size, ATTRIBUTE_WEIGHT, GEO_WEIGHT, TEXT_WEIGHT, GEO_SCALE_KM, TEXT_DIMS)
+    digest = hashlib.sha1(repr(settings).encode('utf-8'))
+    digest.update('\n'.join(catalog.names).encode('utf-8'))
+    digest.update(_attribute_vectors(catalog).tobytes())
+    digest.update('\n'.join(_texts(catalog)).encode('utf-8'))
+    digest.update(np.asarray(starts, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def _leaves(vectors, rng, leaf_size):
+    """Split the rows by random hyperplanes, Annoy style, until every leaf holds at most leaf_size."""
+    import numpy as np
+    leaves = []
+    stack = [np.arange(len(vectors))]
+    while stack:
+        ids = stack.pop()
+        if len(ids) <= leaf_size:
+            leaves.append(ids)
+            continue
+        a, b = vectors[rng.choice(ids, 2, replace=False)]
+        projection = vectors[ids] @ (a - b)
+        half = len(ids) // 2
+        order = np.argpartition(projection, half)
+        stack.append(ids[order[:half]])
+        stack.append(ids[order[half:]])
+    return leaves
+
+
+def _closest(candidate_ids, candidate_distances, k):
+    """Per row, the k closest distinct candidates; -1 where there are fewer."""
+    import numpy as np
+    order = np.lexsort((candidate_distances, candidate_ids), axis=1)
+    candidate_ids = np.take_along_axis(candidate_ids, order, 1)
+    candidate_distances = np.take_along_axis(candidate_distances, order, 1)
+    repeated = np.zeros_like(candidate_ids, dtype=bool)
+    repeated[:, 1:] = candidate_ids[:, 1:] == candidate_ids[:, :-1]
+    candidate_distances[repeated | (candidate_ids < 0)] = np.inf
+    order = np.argsort(candidate_distances, axis=1, kind='stable')[:, :k]
+    ids = np.take_along_axis(candidate_ids, order, 1)
+    distances = np.take_along_axis(candidate_distances, order, 1)
+    ids[np.isinf(distances)] = -1
+    return ids, np.maximum(distances, 0)
+
+
+def nearest_neighbours(vectors, k=TOP_K, trees=TREES, leaf_size=LEAF_SIZE, seed=0):
+    """Approximate k nearest neighbours of every row: (ids, squared distances), -1/inf padded.
+
+    Each random projection tree only compares rows that share a leaf, and
+    one neighbour-of-neighbour pass then checks each row's k*k second-hand
+    candidates. The build costs O(n * (trees * (log n + leaf_size) + k^2))
+    instead of O(n^2).
+    """
+    import numpy as np
+    n = len(vectors)
+    k = min(k, n - 1)
+    rng = np.random.default_rng(seed)
+    leaf_size = max(leaf_size, 2 * (k + 1))
+    candidate_ids = np.full((n, trees * k), -1, dtype=np.int32)
+    candidate_distances = np.full((n, trees * k), np.inf, dtype=np.float32)
+    squares = np.einsum('ij,ij->i', vectors, vectors)
+    for tree in range(trees if n > leaf_size else 1):
+        for ids in _leaves(vectors, rng, leaf_size):
+            width = min(k, len(ids) - 1)
+            if width <= 0:
+                continue
+            block = vectors[ids]
+            distances = squares[ids, None] + squares[None, ids] - 2 * block @ block.T
+            np.fill_diagonal(distances, np.inf)
+            nearest = np.argpartition(distances, width - 1, axis=1)[:, :width]
+            columns = slice(tree * k, tree * k + width)
+            candidate_ids[ids, columns] = ids[nearest]
+            candidate_distances[ids, columns] = np.take_along_axis(distances, nearest, 1)
+    ids, distances = _closest(candidate_ids, candidate_distances, k)
+    if n <= leaf_size:
+        return ids, distances
+
+    # A neighbour's neighbour is often a neighbour the trees missed
+    for begin in range(0, n, REFINE_CHUNK):
+        rows = np.arange(begin, min(n, begin + REFINE_CHUNK))
+        second = ids[np.maximum(ids[rows], 0)].reshape(len(rows), -1)
+        second[np.repeat(ids[rows] < 0, k, axis=1) | (second == rows[:, None])] = -1
+        found = np.einsum('ijk,ik->ij', vectors[np.maximum(second, 0)], vectors[rows])
+        second_distances = (squares[rows, None] + squares[np.maximum(second, 0)] - 2 * found).astype(np.float32)
+        ids[rows], distances[rows] = _closest(np.hstack([ids[rows], second]),
+                                              np.hstack([distances[rows], second_distances]), k)
+    return ids, distances
+
+
+class SimilarityIndex:
+    """Top-k most similar trails per trail, precomputed once per catalog version.
+
+    Similarity mixes attributes (distance, elevation gain, duration, loop),
+    how far apart the start points are and description text. Lookups are
+    one row of a (trails x k) table.
+    """
+
+    def __init__(self, neighbours, distances):
+        self.neighbours = neighbours
+        self.distances = distances
+
+    @classmethod
+    def build(cls, catalog, starts, k=TOP_K, trees=TREES, leaf_size=LEAF_SIZE):
+        """``starts`` holds a (lat, lon) start point per trail, NaN where unknown."""
+        if len(catalog) < 2:
+            import numpy as np
+            return cls(np.full((len(catalog), 0), -1, dtype=np.int32), np.zeros((len(catalog), 0), dtype=np.float32))
+        return cls(*nearest_neighbours(feature_vectors(catalog, starts), k, trees, leaf_size))
+
+    def save(self, path, digest):
+        import numpy as np
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, neighbours=self.neighbours, distances=self.distances, digest=np.array(digest))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, digest):
+        """The table stored at ``path``, or None when there is none or it was built from other data."""
+        import numpy as np
+        try:
+            with np.load(path) as stored:
+                if str(stored['digest']) != digest:
+                    return None
+                return cls(stored['neighbours'], stored['distances'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    @classmethod
+    def for_snapshot(cls, snapshot, path=INDEX_PATH):
+        """The offline-built table when it matches the snapshot's catalog and GPX, else a fresh build."""
+        starts = start_points(snapshot)
+        index = cls.load(path, input_digest(snapshot.catalog, starts)) if path else None
+        if index is None:
+            logger.info('no matching similarity index at %s; building it', path)
+            index = cls.build(snapshot.catalog, starts)
+        return index
+
+    def similar(self, id, limit=TOP_K):
+        """Ids of the trails most like ``id``, closest first."""
+        return [int(other) for other in self.neighbours[id, :limit] if other >= 0]
@@ -0,0 +1,314 @@
+import http.client
+import logging
+import math
+import os
+import re
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import dash_leaflet as dl
+from flask import Response, abort
+
+from framing import TILE_SIZE, fit_zoom, merge_bounds
+from instrumentation import registry
+from trail_store import store
+
+logger = logging.getLogger(__name__)
+
+# Serve base-map tiles through /tiles, cached on disk; 0 sends browsers straight upstream
+TILE_PROXY = os.environ.get('TRAIL_TILE_PROXY', '1') != '0'
+TILE_UPSTREAM = os.environ.get('TRAIL_TILE_UPSTREAM', 'https://tile.openstreetmap.org/{z}/{x}/{y}.png')
+TILE_CACHE_DIR = os.environ.get('TRAIL_TILE_CACHE_DIR', 'tile_cache')
+TILE_CACHE_MAX_BYTES = int(os.environ.get('TRAIL_TILE_CACHE_MAX_BYTES', str(512 * 2**20)))
+# Used when upstream sends no max-age
+TILE_DEFAULT_MAX_AGE = int(os.environ.get('TRAIL_TILE_DEFAULT_MAX_AGE', str(7 * 24 * 3600)))
+# Fetch the tiles each trail's maps open on in the background after start-up
+TILE_PREFETCH = os.environ.get('TRAIL_TILE_PREFETCH', '0') == '1'
+# Concurrent upstream fetches while prefetching; tile servers ask for few
+TILE_PREFETCH_WORKERS = int(os.environ.get('TRAIL_TILE_PREFETCH_WORKERS', '2'))
+TILE_URL = '/tiles/<int:z>/<int:x>/<int:y>.png'
+TILE_TIMEOUT = 10
+MAX_ZOOM = 19
+ATTRIBUTION = '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+USER_AGENT = 'life-on-land-trails tile cache'
+
+
+def tile_layer():
+    """The base-map layer for a dl.Map: through the local cache, or straight upstream with TRAIL_TILE_PROXY=0."""
+    if not TILE_PROXY:
+        return dl.TileLayer()
+    return dl.TileLayer(url='/tiles/{z}/{x}/{y}.png', attribution=ATTRIBUTION, maxZoom=MAX_ZOOM)
+
+
+def _max_age(cache_control):
+    """Seconds a response may be reused for, None for no-store, or the default when unstated."""
+    directives = (cache_control or '').lower()
+    if 'no-store' in directives:
+        return None
+    match = re.search(r'(?:s-maxage|max-age)=(\d+)', directives)
+    return int(match.group(1)) if match else TILE_DEFAULT_MAX_AGE
+
+
+class _Fetch:
+    """One upstream request that concurrent misses for the same tile wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+        self.max_age = 0
+
+
+class TileCache:
+    """Size-bounded LRU of map tiles on disk, filled from an upstream tile server.
+
+    Each tile is one file whose mtime is the time it goes stale, so the
+    index can be rebuilt from a directory scan after a restart. Concurrent
+    misses for a tile share one upstream request, and a stale tile is
+    still served when upstream fails.
+    """
+
+    def __init__(self, directory=TILE_CACHE_DIR, upstream=TILE_UPSTREAM, max_bytes=TILE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.upstream = upstream
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # (z, x, y) -> (bytes, expires), least recently used first
+        self._entries = OrderedDict()
+        self._fetches = {}
+        self.size = 0
+        self.stats = {'hit': 0, 'miss': 0, 'coalesced': 0, 'stale': 0, 'error': 0}
+        self._load()
+
+    def _path(self, z, x, y):
+        return os.path.join(self.directory, str(z), str(x), f'{y}.png')
+
+    def _load(self):
+        if not os.path.isdir(self.directory):
+            return
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                parts = os.path.relpath(os.path.join(root, name), self.directory).split(os.sep)
+                if len(parts) != 3 or not name.endswith('.png'):
+                    continue
+                try:
+                    key = (int(parts[0]), int(parts[1]), int(parts[2][:-4]))
+                    stat = os.stat(os.path.join(root, name))
+                except (ValueError, OSError):
+                    # Not a tile this cache wrote; leave it alone
+                    continue
+                found.append((stat.st_mtime, key, stat.st_size))
+        # Tiles that expire first were probably fetched first
+        for expires, key, size in sorted(found):
+            self._entries[key] = (size, expires)
+            self.size += size
+        self._evict()
+
+    def _count(self, result):
+        with self._lock:
+            self.stats[result] += 1
+        registry.inc('trail_tile_requests_total', (('result', result),))
+
+    def get(self, z, x, y):
+        """(png bytes, seconds it stays fresh), or (None, 0) when upstream fails and nothing is cached."""
+        key = (z, x, y)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+            else:
+                entry = None
+                fetch, owner = self._join(key)
+        if entry is not None:
+            data = self._read(key)
+            if data is not None:
+                self._count('hit')
+                return data, entry[1] - now
+            with self._lock:
+                fetch, owner = self._join(key)
+        self._count('miss' if owner else 'coalesced')
+        if owner:
+            try:
+                self._fetch(key, fetch)
+            finally:
+                with self._lock:
+                    del self._fetches[key]
+                fetch.done.set()
+        else:
+            # The owner always sets it, however long a slow but working upstream takes
+            fetch.done.wait()
+        if fetch.data is not None:
+            return fetch.data, fetch.max_age
+        with self._lock:
+            cached = key in self._entries
+        data = self._read(key) if cached else None
+        self._count('stale' if data is not None else 'error')
+        return data, 0
+
+    def _join(self, key):
+        """The upstream fetch in flight for ``key``, and whether the caller just started it."""
+        fetch = self._fetches.get(key)
+        if fetch is not None:
+            return fetch, False
+        fetch = self._fetches[key] = _Fetch()
+        return fetch, True
+
+    def _read(self, key):
+        try:
+            with open(self._path(*key), 'rb') as f:
+                return f.read()
+        except OSError:
+            # Evicted meanwhile, or removed behind our back
+            with self._lock:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self.size -= entry[0]
+            return None
+
+    def _fetch(self, key, fetch):
+        z, x, y = key
+        request = urllib.request.Request(self.upstream.format(z=z, x=x, y=y), headers={'User-Agent': USER_AGENT})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=TILE_TIMEOUT) as response:
+                data = response.read()
+                max_age = _max_age(response.headers.get('Cache-Control'))
+        except (OSError, http.client.HTTPException) as error:
+            logger.warning('tile %s/%s/%s fetch failed: %s', z, x, y, error)
+            return
+        finally:
+            registry.observe('trail_tile_upstream_seconds', (), time.perf_counter() - start)
+        fetch.data, fetch.max_age = data, max_age or 0
+        if max_age is not None:
+            self._store(key, data, time.time() + max_age)
+
+    def _store(self, key, data, expires):
+        path = self._path(*key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.utime(tmp_path, (expires, expires))
+        os.replace(tmp_path, path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[0]
+            self._entries[key] = (len(data), expires)
+            self.size += len(data)
+            self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            key, (size, _) = self._entries.popitem(last=False)
+            self.size -= size
+            try:
+                os.remove(self._path(*key))
+            except OSError:
+                pass
+
+    def fresh(self, z, x, y):
+        with self._lock:
+            entry = self._entries.get((z, x, y))
+        return entry is not None and entry[1] > time.time()
+
+    def hit_rate(self):
+        # Stale and error results are misses counted a second time
+        served = self.stats['hit'] + self.stats['miss'] + self.stats['coalesced']
+        return self.stats['hit'] / served if served else 0.0
+
+
+def _world_pixels(lat, lon, z):
+    scale = TILE_SIZE * 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    y = (1 - math.log(math.tan(math.radians(lat)) + 1 / math.cos(math.radians(lat))) / math.pi) / 2
+    return (lon + 180) / 360 * scale, y * scale
+
+
+def view_tiles(center, z, width, height):
+    """The (z, x, y) tiles Leaflet loads to show a width x height px map at ``center``."""
+    cx, cy = _world_pixels(center[0], center[1], z)
+    last = 2 ** z - 1
+    xs = range(max(0, int((cx - width / 2) // TILE_SIZE)), min(last, int((cx + width / 2) // TILE_SIZE)) + 1)
+    ys = range(max(0, int((cy - height / 2) // TILE_SIZE)), min(last, int((cy + height / 2) // TILE_SIZE)) + 1)
+    return [(z, x, y) for x in xs for y in ys]
+
+
+def trail_tiles(bbox, map_sizes):
+    """Tiles a trail's maps open on, framed as framing.viewport does, plus the trail itself one zoom closer."""
+    bounds = merge_bounds([bbox])
+    (south, west), (north, east) = bounds
+    center = ((south + north) / 2, (west + east) / 2)
+    tiles = set()
+    for width, height in map_sizes:
+        z = fit_zoom(bounds, width, height)
+        tiles.update(view_tiles(center, z, width, height))
+        # The first zoom in, over the trail's own extent
+        x0, y0 = _world_pixels(north, west, z + 1)
+        x1, y1 = _world_pixels(south, east, z + 1)
+        tiles.update((z + 1, x, y) for x in range(int(x0 // TILE_SIZE), int(x1 // TILE_SIZE) + 1)
+                     for y in range(int(y0 // TILE_SIZE), int(y1 // TILE_SIZE) + 1))
+    return tiles
+
+
+def prefetch(cache, snapshot, trail_names, map_sizes, workers=TILE_PREFETCH_WORKERS):
+    """Fetch the tiles of each trail's maps that aren't cached yet; returns how many were fetched."""
+    tiles = {}
+    for name in trail_names:
+        if snapshot.has_gpx(name):
+            # dicts keep the busiest trails' tiles first
+            tiles.update(dict.fromkeys(trail_tiles(snapshot.bbox(name), map_sizes)))
+    missing = [tile for tile in tiles if not cache.fresh(*tile)]
+    with ThreadPoolExecutor(workers, thread_name_prefix='trail-tile-prefetch') as executor:
+        list(executor.map(lambda tile: cache.get(*tile), missing))
+    return len(missing)
+
+
+cache = None
+
+
+def tile_view(z, x, y):
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        abort(404)
+    data, max_age = cache.get(z, x, y)
+    if data is None:
+        abort(502)
+    response = Response(data, mimetype='image/png')
+    # Browsers keep the tile as long as this cache would
+    response.cache_control.public = True
+    response.cache_control.max_age = int(max_age)
+    return response
+
+
+def install(app, map_sizes=()):
+    """Serve /tiles from the disk cache and, with TRAIL_TILE_PREFETCH=1, prefetch trail tiles busiest first.
+
+    The prefetch starts on the first request, in the process that serves.
+    """
+    global cache
+    server = app.server
+    if not TILE_PROXY or 'map_tile' in server.view_functions:
+        return
+    cache = TileCache()
+    server.add_url_rule(TILE_URL, 'map_tile', tile_view)
+    if TILE_PREFETCH and map_sizes:
+        from warmup import traffic
+        started = threading.Lock()
+
+        def run():
+            try:
+                snapshot = store.current()
+                fetched = prefetch(cache, snapshot, traffic.ranking(snapshot.trail_names), map_sizes)
+                logger.info('prefetched %d map tiles', fetched)
+            except Exception:
+                logger.exception('map tile prefetch failed')
+
+        def start():
+            # Only the first request starts it; the lock is never released
+            if started.acquire(blocking=False):
+                threading.Thread(target=run, name='trail-tile-prefetch', daemon=True).start()
+        server.before_request(start)
@@ -0,0 +1,160 @@
+import bisect
+
+# Columns of data/50_trails.csv, in file order
+COLUMNS = ('name', 'distance', 'elevation_gain', 'max_elevation', 'duration', 'loop', 'description',
+           'distance_from_mel', 'drive_from_mel', 'season', 'key_attraction')
+# String columns with at most this share of distinct values are dictionary encoded
+CATEGORY_RATIO = 0.5
+
+
+class Trail:
+    """One catalog row, built on demand from the column arrays."""
+
+    __slots__ = ('id',) + COLUMNS
+
+    def __init__(self, id, values):
+        self.id = id
+        for column, value in zip(COLUMNS, values):
+            setattr(self, column, value)
+
+    def __repr__(self):
+        return f'Trail({self.id}, {self.name!r})'
+
+
+class Categories:
+    """A dictionary-encoded string column: one small integer code per row into a table of distinct values."""
+
+    __slots__ = ('codes', 'values')
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        return self.values[self.codes[row]]
+
+
+def _string_column(values):
+    table = {}
+    codes = [table.setdefault(value, len(table)) for value in values]
+    if len(table) > CATEGORY_RATIO * len(values) or len(table) > 65535:
+        return tuple(values)
+    import numpy as np
+    dtype = np.uint8 if len(table) <= 256 else np.uint16
+    return Categories(np.array(codes, dtype=dtype), tuple(table))
+
+
+class TrailCatalog:
+    """The trail catalog as immutable column arrays, built once per CSV version.
+
+    Numeric columns are numpy arrays, repetitive strings such as loop and
+    season are codes into a table of distinct values, and the rest are
+    tuples. Rows are addressed by integer id, their position in the CSV,
+    and ``trail()`` builds a slotted record for one row. pandas is only
+    used to parse the CSV.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.names = columns['name']
+        self.size = len(self.names)
+        self._ids = {}
+        for id, name in enumerate(self.names):
+            self._ids.setdefault(name, id)
+        self._lower_names = None
+        self._prefix_index = None
+
+    @classmethod
+    def from_frame(cls, df):
+        columns = {}
+        for column in COLUMNS:
+            if column not in df:
+                columns[column] = (None,) * len(df)
+            elif df[column].dtype.kind in 'iuf':
+                columns[column] = df[column].to_numpy(copy=True)
+            else:
+                values = [value if isinstance(value, str) else None for value in df[column].tolist()]
+                columns[column] = tuple(values) if column == 'name' else _string_column(values)
+        return cls(columns)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def id(self, name):
+        return self._ids[name]
+
+    def column(self, column):
+        return self.columns[column]
+
+    def value(self, column, id):
+        value = self.columns[column][id]
+        # numpy scalars become plain Python numbers
+        return value.item() if hasattr(value, 'item') else value
+
+    def trail(self, name):
+        id = self._ids[name]
+        return Trail(id, [self.value(column, id) for column in COLUMNS])
+
+    def take(self, column, ids):
+        """The values of one column at ``ids``, as a list of plain Python values."""
+        values = self.columns[column]
+        if isinstance(values, Categories):
+            table = values.values
+            return [table[code] for code in values.codes[ids].tolist()]
+        if hasattr(values, 'tolist'):
+            return values[ids].tolist()
+        return [values[id] for id in ids]
+
+    def trails(self, ids=None):
+        """Records for ``ids`` (default: every row), reading each column once."""
+        ids = list(range(self.size) if ids is None else ids)
+        columns = [self.take(column, ids) for column in COLUMNS]
+        return [Trail(id, values) for id, values in zip(ids, zip(*columns))]
+
+    def names_of(self, ids):
+        names = self.names
+        return [names[id] for id in ids]
+
+    def map(self, column, function, dtype):
+        """``function`` applied to every row of a string column, called once per distinct value."""
+        import numpy as np
+        values = self.columns[column]
+        if isinstance(values, Categories):
+            table = np.fromiter(map(function, values.values), dtype=dtype, count=len(values.values))
+            return table[values.codes]
+        return np.fromiter(map(function, values), dtype=dtype, count=self.size)
+
+    def distinct(self, column):
+        values = self.columns[column]
+        return values.values if isinstance(values, Categories) else tuple(dict.fromkeys(values))
+
+    def lower_names(self):
+        if self._lower_names is None:
+            self._lower_names = tuple(name.lower() for name in self.names)
+        return self._lower_names
+
+    def search(self, text):
+        """Ids of the trails whose name contains ``text``, ignoring case."""
+        text = text.lower()
+        return [id for id, name in enumerate(self.lower_names()) if text in name]
+
+    def prefix(self, text):
+        """Ids of the trails whose name starts with ``text``, ignoring case, in catalog order."""
+        import numpy as np
+        lower_names = self.lower_names()
+        if self._prefix_index is None:
+            self._prefix_index = np.array(sorted(range(self.size), key=lower_names.__getitem__), dtype=np.int32)
+        text = text.lower()
+        index = self._prefix_index
+        position = bisect.bisect_left(index, text, key=lower_names.__getitem__)
+        ids = []
+        while position < len(index) and lower_names[index[position]].startswith(text):
+            ids.append(int(index[position]))
+            position += 1
+        return sorted(ids)
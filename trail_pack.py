@@ -0,0 +1,195 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import zipfile
+from functools import partial
+from urllib.parse import quote, urlencode
+
+from flask import Response, abort, request
+from werkzeug.http import dump_options_header
+
+import uploads
+from instrumentation import span
+from trail_catalog import COLUMNS
+from trail_store import store
+
+PACK_URL = '/export/trails.zip'
+# Bumped when the pack layout changes, so old ETags stop matching
+PACK_VERSION = 1
+# Bytes read from a GPX file or photo per write; bounds the memory one download holds
+CHUNK_BYTES = 64 * 1024
+# The simplified line stays within this many degrees (about 5 m) of the GPX track
+SIMPLIFY_TOLERANCE = 0.00005
+MARKERS = ['assets/start.png', 'assets/finish.png']
+# Already compressed, so stored as they are
+STORED_SUFFIXES = ('.png', '.jpg', '.jpeg', '.heic')
+# Fixed member dates, so the same content always zips to the same bytes
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+def pack_url(trail_names):
+    return f'{PACK_URL}?{urlencode([("trail", name) for name in trail_names])}'
+
+
+def _folder(trail_name):
+    return trail_name.replace('/', '-').replace(' ', '-')
+
+
+def _value(value):
+    # Missing numbers are NaN in the catalog; JSON and the CSV want them empty
+    return None if value is None or value != value else value
+
+
+def _metadata_csv(catalog, trail_names):
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    for name in trail_names:
+        id = catalog.id(name)
+        writer.writerow(['' if value is None else value for value in (_value(catalog.value(column, id)) for column in COLUMNS)])
+    return out.getvalue().encode('utf-8')
+
+
+def _content_disposition(filename):
+    """An attachment header that survives any trail name: an ASCII fallback plus the exact RFC 5987 name."""
+    fallback = re.sub(r'[^\x20-\x7e]|["\\]', '_', filename)
+    return dump_options_header('attachment', {'filename': fallback, 'filename*': f"UTF-8''{quote(filename)}"})
+
+
+def simplified_geojson(snapshot, trail_name):
+    """The trail as a GeoJSON Feature with a simplified line and its catalog row as properties."""
+    def build():
+        with span('pack_geojson'):
+            line = snapshot.line_string(trail_name).simplify(SIMPLIFY_TOLERANCE, preserve_topology=False)
+            trail = snapshot.catalog.trail(trail_name)
+            feature = {
+                'type': 'Feature',
+                'bbox': snapshot.bbox(trail_name),
+                'geometry': {'type': 'LineString', 'coordinates': [[lon, lat] for lat, lon in line.coords]},
+                'properties': {column: _value(getattr(trail, column)) for column in COLUMNS},
+            }
+            return json.dumps(feature, separators=(',', ':')).encode('utf-8')
+    # Keyed by the GPX signature too: a new GPX file keeps the catalog's cache
+    return snapshot.cached('pack_geojson', (trail_name, snapshot.gpx_signatures.get(trail_name)), build)
+
+
+def _photo_path(url, photos_dir):
+    """The stored file behind an /uploads URL; None for anything else, such as the sample images."""
+    prefix = f'{uploads.UPLOADS_URL}/'
+    if not url.startswith(prefix):
+        return None
+    path = os.path.join(photos_dir, os.path.basename(url[len(prefix):]))
+    return path if os.path.exists(path) else None
+
+
+def pack_contents(snapshot, trail_names, index=None, photos_dir=None):
+    """(archive name, source) pairs, lazily: source is a path to stream from disk or bytes.
+
+    Each trail gets a folder with its original GPX, a simplified GeoJSON
+    Feature and thumbnails of the photos uploaded along it; trails.csv
+    holds the selected rows of the catalog and markers/ the map icons.
+    """
+    index = index or uploads.index
+    photos_dir = photos_dir or uploads.queue.directory
+    yield 'trails.csv', _metadata_csv(snapshot.catalog, trail_names)
+    for path in MARKERS:
+        yield f'markers/{os.path.basename(path)}', path
+    for name in trail_names:
+        if not snapshot.has_gpx(name):
+            continue
+        folder = _folder(name)
+        yield f'{folder}/{os.path.basename(snapshot.gpx_path(name))}', snapshot.gpx_path(name)
+        yield f'{folder}/{folder}.geojson', simplified_geojson(snapshot, name)
+        for record in index.near(snapshot, name):
+            path = _photo_path(record['thumbnail'], photos_dir)
+            if path is not None:
+                yield f'{folder}/photos/{os.path.basename(path)}', path
+
+
+def pack_etag(snapshot, trail_names, index=None):
+    """Hash of everything a pack is made from; equal inputs zip to byte-identical packs.
+
+    Any new upload changes it, even one far from the selected trails.
+    """
+    index = index or uploads.index
+    # Uploads are only appended, so their count and the newest one's content
+    # hash stand for all of them without finding each trail's photos first
+    photos = (len(index.records), index.records[-1]['id'] if index.records else None)
+    digest = hashlib.sha1(repr((PACK_VERSION, snapshot.catalog_signature, photos)).encode('utf-8'))
+    for path in MARKERS:
+        stat = os.stat(path)
+        digest.update(repr((stat.st_mtime_ns, stat.st_size)).encode('utf-8'))
+    for name in trail_names:
+        digest.update(repr((name, snapshot.gpx_signatures.get(name))).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class _Chunks:
+    """A write-only file that hands back what was written since the last take()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def pack_chunks(contents):
+    """Zip ``contents`` as a stream of byte chunks, never holding more than one read in memory.
+
+    The output isn't seekable, so every member gets a data descriptor
+    instead of sizes patched into its header; nothing touches the disk.
+    """
+    out = _Chunks()
+    with zipfile.ZipFile(out, 'w') as archive:
+        for name, source in contents:
+            info = zipfile.ZipInfo(name, ZIP_DATE)
+            info.external_attr = 0o644 << 16
+            info.compress_type = zipfile.ZIP_STORED if name.lower().endswith(STORED_SUFFIXES) else zipfile.ZIP_DEFLATED
+            if isinstance(source, bytes):
+                with archive.open(info, 'w') as member:
+                    member.write(source)
+            else:
+                # The known size lets zipfile pick zip64 headers up front
+                info.file_size = os.path.getsize(source)
+                with open(source, 'rb') as f, archive.open(info, 'w') as member:
+                    for block in iter(partial(f.read, CHUNK_BYTES), b''):
+                        member.write(block)
+                        data = out.take()
+                        if data:
+                            yield data
+            data = out.take()
+            if data:
+                yield data
+    yield out.take()
+
+
+def export_view():
+    snapshot = store.current()
+    # Repeated ?trail= parameters pick trails; none exports the whole catalog
+    trail_names = list(dict.fromkeys(request.args.getlist('trail'))) or snapshot.trail_names
+    if any(name not in snapshot.catalog for name in trail_names):
+        abort(404)
+    etag = pack_etag(snapshot, trail_names)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    response = Response(pack_chunks(pack_contents(snapshot, trail_names)), mimetype='application/zip')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    filename = f'{_folder(trail_names[0])}.zip' if len(trail_names) == 1 else 'trails.zip'
+    response.headers['Content-Disposition'] = _content_disposition(filename)
+    return response
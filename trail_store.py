@@ -0,0 +1,228 @@
+import copy
+import logging
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+
+import framing
+from instrumentation import record_cache, span
+from trail_catalog import TrailCatalog
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = 'data/50_trails.csv'
+TRAILS_DIR = 'data/trails'
+
+# Seconds between checks for changed trail data, 0 disables the watcher
+WATCH_INTERVAL = float(os.environ.get('TRAIL_DATA_WATCH_INTERVAL', '2'))
+
+
+def gpx_to_points(gpx_path):
+    # Imported here so the app can start before shapely/numpy are loaded
+    from shapely.geometry import LineString
+    with span('gpx_parse'):
+        tree = ET.parse(gpx_path)
+        root = tree.getroot()
+        namespaces = {'default': 'http://www.topografix.com/GPX/1/1'}
+        route_points = [(float(pt.attrib['lat']), float(pt.attrib['lon'])) for pt in root.findall('.//default:trkpt', namespaces)]
+        return LineString(route_points)
+
+
+def read_catalog(path):
+    import pandas as pd
+    return TrailCatalog.from_frame(pd.read_csv(path, encoding='utf-8'))
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _scan_trails_dir(trails_dir):
+    signatures = {}
+    for entry in os.scandir(trails_dir):
+        if entry.is_file() and entry.name.endswith('.gpx'):
+            stat = entry.stat()
+            signatures[entry.name[:-len('.gpx')]] = (stat.st_mtime_ns, stat.st_size)
+    return signatures
+
+
+class TrailSnapshot:
+    """One consistent version of the trail catalog and its GPX geometry.
+
+    Callbacks should call ``store.current()`` once and use that snapshot for
+    the whole request, so a reload in the middle of a request can't mix old
+    and new data.
+    """
+
+    def __init__(self, catalog, catalog_signature, gpx_signatures, geometry, trails_dir, features=None):
+        self.catalog = catalog
+        self.catalog_signature = catalog_signature
+        self.gpx_signatures = gpx_signatures
+        self.trails_dir = trails_dir
+        self.trail_names = list(catalog.names)
+        self.options = [{'label': name, 'value': name} for name in dict.fromkeys(catalog.names)]
+        self._geometry = geometry
+        self._features = features if features is not None else {}
+        self._payloads = {}
+        self._gpx_payloads = {}
+
+    def gpx_path(self, trail_name):
+        return os.path.join(self.trails_dir, f'{trail_name}.gpx')
+
+    def has_gpx(self, trail_name):
+        return trail_name in self.gpx_signatures
+
+    def line_string(self, trail_name):
+        line_string = self._geometry.get(trail_name)
+        record_cache('gpx_geometry', line_string is not None)
+        if line_string is None:
+            line_string = gpx_to_points(self.gpx_path(trail_name))
+            self._geometry[trail_name] = line_string
+        return line_string
+
+    def feature(self, trail_name):
+        """The trail as a GeoJSON geometry, precompiled once per GPX file.
+
+        Coordinates are [lon, lat] as GeoJSON requires, with the trail's
+        extent as the standard ``bbox`` member. Callers wrap the shared dict
+        in their own Feature with per-request properties.
+        """
+        feature = self._features.get(trail_name)
+        record_cache('trail_feature', feature is not None)
+        if feature is None:
+            coords = self.line_string(trail_name).coords
+            feature = self._features[trail_name] = {
+                'type': 'LineString',
+                'bbox': framing.bbox(coords),
+                'coordinates': [[lon, lat] for lat, lon in coords],
+            }
+        return feature
+
+    def bbox(self, trail_name):
+        return self.feature(trail_name)['bbox']
+
+    def endpoints(self, trail_name):
+        """(lat, lon) of the trail's first and last GPX points, or [] without a GPX."""
+        if not self.has_gpx(trail_name):
+            return []
+        coordinates = self.feature(trail_name)['coordinates']
+        return [(lat, lon) for lon, lat in (coordinates[0], coordinates[-1])]
+
+    def cached(self, kind, key, build, gpx=False):
+        """Memoise a value derived from the catalog, e.g. a rendered detail page.
+
+        The cache lives and dies with the catalog, so a reload that changes
+        the CSV starts from empty. Values that also read GPX geometry pass
+        ``gpx=True`` and are dropped by any GPX change as well. Concurrent
+        misses may both build; the result is the same either way.
+        """
+        payloads = self._gpx_payloads if gpx else self._payloads
+        payload = payloads.get((kind, key))
+        record_cache(kind, payload is not None)
+        if payload is None:
+            payload = payloads[(kind, key)] = build()
+        return payload
+
+    def is_cached(self, kind, key, gpx=False):
+        return (kind, key) in (self._gpx_payloads if gpx else self._payloads)
+
+    def with_gpx(self, gpx_signatures, geometry, features):
+        # Same catalog, new geometry: keep the catalog-only indexes and payloads as they are
+        snapshot = copy.copy(self)
+        snapshot.gpx_signatures = gpx_signatures
+        snapshot._geometry = geometry
+        snapshot._features = features
+        snapshot._gpx_payloads = {}
+        return snapshot
+
+
+class TrailStore:
+    """Holds the current TrailSnapshot and swaps in a new one when data changes."""
+
+    def __init__(self, catalog_path=CATALOG_PATH, trails_dir=TRAILS_DIR):
+        self.catalog_path = catalog_path
+        self.trails_dir = trails_dir
+        self.swap_durations = deque(maxlen=100)
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._watcher_lock = threading.Lock()
+
+    def current(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build(None)
+                snapshot = self._snapshot
+        return snapshot
+
+    def reload(self):
+        """Rebuild whatever changed on disk and swap it in.
+
+        Returns True when a new snapshot was installed.
+        """
+        with self._lock:
+            old = self._snapshot
+            start = time.perf_counter()
+            new = self._build(old)
+            if new is old:
+                return False
+            self._snapshot = new
+            duration = time.perf_counter() - start
+            self.swap_durations.append(duration)
+        logger.info('trail data reloaded in %.1f ms', duration * 1000)
+        return True
+
+    def watch(self, interval=WATCH_INTERVAL):
+        """Reload every ``interval`` seconds in a background thread; safe to call on every request."""
+        with self._watcher_lock:
+            if interval <= 0 or self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch_loop, args=(interval,),
+                                             name='trail-data-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.reload()
+            except Exception:
+                # Usually a file caught half-written; keep serving the old snapshot
+                logger.exception('trail data reload failed')
+
+    def _build(self, old):
+        catalog_signature = _file_signature(self.catalog_path)
+        gpx_signatures = _scan_trails_dir(self.trails_dir)
+        if old is None:
+            catalog = read_catalog(self.catalog_path)
+            return TrailSnapshot(catalog, catalog_signature, gpx_signatures, {}, self.trails_dir)
+
+        catalog_changed = catalog_signature != old.catalog_signature
+        if not catalog_changed and gpx_signatures == old.gpx_signatures:
+            return old
+
+        # Carry cached geometry over, re-parsing only the files that changed
+        geometry = {}
+        for trail_name, line_string in list(old._geometry.items()):
+            signature = gpx_signatures.get(trail_name)
+            if signature is None:
+                continue
+            if signature != old.gpx_signatures.get(trail_name):
+                line_string = gpx_to_points(os.path.join(self.trails_dir, f'{trail_name}.gpx'))
+            geometry[trail_name] = line_string
+        # Derived GeoJSON is rebuilt lazily for changed files
+        features = {trail_name: feature for trail_name, feature in list(old._features.items())
+                    if gpx_signatures.get(trail_name) == old.gpx_signatures.get(trail_name)}
+
+        if not catalog_changed:
+            return old.with_gpx(gpx_signatures, geometry, features)
+        catalog = read_catalog(self.catalog_path)
+        return TrailSnapshot(catalog, catalog_signature, gpx_signatures, geometry, self.trails_dir, features)
+
+
+store = TrailStore()
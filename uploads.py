@@ -0,0 +1,477 @@
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from flask import send_from_directory
+
+from exif import read_exif
+from instrumentation import registry
+from trail_store import store
+
+logger = logging.getLogger(__name__)
+
+# Processes that decode, check and thumbnail uploads off the request thread
+UPLOAD_WORKERS = int(os.environ.get('TRAIL_UPLOAD_WORKERS', '2'))
+# Processed images and thumbnails, named by content hash
+UPLOADS_DIR = os.environ.get('TRAIL_UPLOADS_DIR', 'uploads')
+MAX_UPLOAD_BYTES = int(os.environ.get('TRAIL_MAX_UPLOAD_BYTES', str(20 * 2**20)))
+UPLOADS_URL = '/uploads'
+THUMBNAIL_SIZE = 256
+# Finished jobs stay visible to polling pages for this long
+JOB_TTL = 600
+# Uploads are shown on trails that pass within this many metres
+NEAR_TRAIL_METRES = 500
+# Trail points this close to a photo's position count as where it was taken
+SAME_SPOT_KM = 0.05
+
+# What a file goes through in a worker
+STAGES = ['queued', 'decoding', 'validating', 'geotagging', 'thumbnailing', 'processed']
+
+EARTH_RADIUS_M = 6371008.8
+EPOCH = datetime(1970, 1, 1)
+
+
+class UploadError(ValueError):
+    """An upload that can't be accepted; the message is shown to the user."""
+
+
+def image_type(data):
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if data[:3] == b'\xff\xd8\xff':
+        return 'jpg'
+    if data[4:8] == b'ftyp' and data[8:12] in (b'heic', b'heix', b'mif1', b'msf1'):
+        return 'heic'
+    return None
+
+
+def _thumbnail(data):
+    """A small JPEG of the image, or None when Pillow isn't installed or can't read it."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            out = io.BytesIO()
+            image.convert('RGB').save(out, 'JPEG', quality=80)
+            return out.getvalue()
+    except (OSError, ValueError):
+        return None
+
+
+def _write(directory, name, data):
+    path = os.path.join(directory, name)
+    # Content-addressed, so an existing file already holds these bytes
+    if not os.path.exists(path):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return f'{UPLOADS_URL}/{name}'
+
+
+_progress = None
+
+
+def _init_worker(progress, parent):
+    global _progress
+    _progress = progress
+    threading.Thread(target=_exit_with, args=(parent,), name='trail-upload-parent', daemon=True).start()
+
+
+def _exit_with(parent):
+    # A server stopped by a signal never shuts the pool down, and the workers hold its listening socket
+    while os.getppid() == parent:
+        time.sleep(1)
+    os._exit(0)
+
+
+def _report(task, stage):
+    if _progress is not None:
+        _progress.put((task, stage))
+
+
+def process_upload(task, contents, directory=UPLOADS_DIR):
+    """Decode, check, read EXIF from, thumbnail and store one uploaded data URL; runs in a worker process.
+
+    Returns the record to index, with the photo's EXIF GPS position and
+    capture time when it has them and None otherwise; the batch places
+    photos without a position once all of its files are processed.
+    """
+    _report(task, 'decoding')
+    header, _, encoded = (contents or '').partition(',')
+    try:
+        data = base64.b64decode(encoded, validate=True)
+    except binascii.Error:
+        raise UploadError('The file could not be read.')
+
+    _report(task, 'validating')
+    if not data:
+        raise UploadError('The file is empty.')
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise UploadError(f'Images must be under {MAX_UPLOAD_BYTES // 2**20} MB.')
+    kind = image_type(data)
+    if kind is None:
+        raise UploadError('Only PNG, JPEG and HEIC images can be uploaded.')
+
+    _report(task, 'geotagging')
+    tags = read_exif(data)
+
+    _report(task, 'thumbnailing')
+    digest = hashlib.sha1(data).hexdigest()[:20]
+    os.makedirs(directory, exist_ok=True)
+    image = _write(directory, f'{digest}.{kind}', data)
+    thumbnail = _thumbnail(data)
+    return {
+        'id': digest,
+        'timestamp': tags.get('timestamp'),
+        'latitude': tags.get('latitude'),
+        'longitude': tags.get('longitude'),
+        'located': 'gps' if 'latitude' in tags else None,
+        'image': image,
+        # Without Pillow the browser scales the full image down instead
+        'thumbnail': _write(directory, f'{digest}.thumb.jpg', thumbnail) if thumbnail else image,
+        'bytes': len(data),
+    }
+
+
+def _seconds(timestamp):
+    try:
+        return (datetime.fromisoformat(timestamp[:19]) - EPOCH).total_seconds()
+    except (TypeError, ValueError):
+        return None
+
+
+def place_along_trail(records, coords):
+    """Give records without a position one from their capture time; returns how many it placed.
+
+    Geotagged photos with a capture time say where the hiker was and when:
+    with two or more of them, an untagged photo goes to the point along
+    the trail interpolated between them by time. With fewer, the batch is
+    taken to cover the whole trail, its earliest photo at the start and its
+    latest at the finish.
+    """
+    import numpy as np
+    missing = [record for record in records
+               if record['latitude'] is None and _seconds(record['timestamp']) is not None]
+    if not missing or len(coords) < 2:
+        return 0
+    points = np.asarray(coords, dtype=np.float64)
+    scale = 111.32 * math.cos(math.radians(points[:, 0].mean()))
+    along = np.r_[0.0, np.cumsum(np.hypot(np.diff(points[:, 0]) * 111.32, np.diff(points[:, 1]) * scale))]
+    anchors = [record for record in records
+               if record['located'] == 'gps' and _seconds(record['timestamp']) is not None]
+    if len(anchors) >= 2:
+        anchors.sort(key=lambda record: _seconds(record['timestamp']))
+        times = [_seconds(record['timestamp']) for record in anchors]
+        positions = np.array([(record['latitude'], record['longitude']) for record in anchors])
+        distances = np.hypot((positions[:, None, 0] - points[None, :, 0]) * 111.32,
+                             (positions[:, None, 1] - points[None, :, 1]) * scale)
+        # Each geotagged photo sits at its closest trail point; where the
+        # trail passes the spot twice, the first pass after the last photo
+        distances_along = []
+        for row in distances:
+            close = (row <= row.min() + SAME_SPOT_KM) & (along >= (distances_along[-1] if distances_along else 0.0))
+            if not close.any():
+                distances_along.append(along[row.argmin()])
+                continue
+            first = int(close.argmax())
+            run = close[first:]
+            end = first + (int((~run).argmax()) if not run.all() else len(run))
+            distances_along.append(along[first + int(row[first:end].argmin())])
+    else:
+        seconds = [_seconds(record['timestamp']) for record in records if _seconds(record['timestamp']) is not None]
+        if min(seconds) == max(seconds):
+            return 0
+        times, distances_along = [min(seconds), max(seconds)], [0.0, along[-1]]
+    targets = np.interp([_seconds(record['timestamp']) for record in missing], times, distances_along)
+    latitudes = np.interp(targets, along, points[:, 0])
+    longitudes = np.interp(targets, along, points[:, 1])
+    for record, latitude, longitude in zip(missing, latitudes.tolist(), longitudes.tolist()):
+        record.update(latitude=latitude, longitude=longitude, located='capture time')
+    return len(missing)
+
+
+def _near(latitudes, longitudes, points, metres):
+    """Mask of the (latitude, longitude) pairs within ``metres`` of any of the (lat, lon) ``points``."""
+    import numpy as np
+    points = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    near = np.zeros(len(latitudes), dtype=bool)
+    if not len(points) or not len(latitudes):
+        return near
+    latitudes, longitudes = np.radians(latitudes), np.radians(longitudes)
+    # Half-angle haversine terms, so the cutoff is compared without any arcsin
+    limit = np.sin(metres / EARTH_RADIUS_M / 2) ** 2
+    cos_points = np.cos(points[:, 0])
+    # Bounded blocks of uploads x trail points
+    step = max(1, 2**20 // len(points))
+    for begin in range(0, len(latitudes), step):
+        rows = slice(begin, begin + step)
+        lat, lon = latitudes[rows, None], longitudes[rows, None]
+        a = (np.sin((points[:, 0] - lat) / 2) ** 2 +
+             np.cos(lat) * cos_points * np.sin((points[:, 1] - lon) / 2) ** 2)
+        near[rows] = (a <= limit).any(axis=1)
+    return near
+
+
+class UploadIndex:
+    """Processed uploads, and which of them lie near each trail.
+
+    Uploads are only ever appended, so each trail keeps the matches it has
+    found and how many uploads it has checked; a new upload costs one
+    distance check per trail that is looked at again, not a rescan.
+    """
+
+    def __init__(self, records=()):
+        self._lock = threading.Lock()
+        self.records = []
+        self._ids = set()
+        self._latitudes = []
+        self._longitudes = []
+        self._near = {}
+        self.version = 0
+        self.add_many(records)
+
+    def add(self, record):
+        self.add_many([record])
+
+    def add_many(self, records):
+        """Add a batch of records at once: one lock and one version bump."""
+        with self._lock:
+            # The same photo uploaded twice is one find
+            added = [record for record in records if record['id'] not in self._ids]
+            if not added:
+                return
+            self._ids.update(record['id'] for record in added)
+            self.records.extend(added)
+            self._latitudes.extend(record['latitude'] for record in added)
+            self._longitudes.extend(record['longitude'] for record in added)
+            self.version += 1
+
+    def near(self, snapshot, trail_name, metres=NEAR_TRAIL_METRES):
+        """Records of the uploads within ``metres`` of the trail, oldest first."""
+        import numpy as np
+        # A new GPX file for the trail starts its matches over
+        key = (trail_name, snapshot.gpx_signatures.get(trail_name), metres)
+        checked, matches = self._near.get(key, (0, ()))
+        with self._lock:
+            count = len(self.records)
+            latitudes = np.array(self._latitudes[checked:count])
+            longitudes = np.array(self._longitudes[checked:count])
+        if checked < count:
+            west, south, east, north = snapshot.bbox(trail_name)
+            # Only uploads inside the trail's padded extent need the exact check
+            lat_margin = metres / 111000
+            lon_margin = lat_margin / max(math.cos(math.radians(max(abs(south), abs(north)))), 0.01)
+            candidates = ((latitudes >= south - lat_margin) & (latitudes <= north + lat_margin) &
+                          (longitudes >= west - lon_margin) & (longitudes <= east + lon_margin)).nonzero()[0]
+            found = candidates[_near(latitudes[candidates], longitudes[candidates],
+                                     snapshot.line_string(trail_name).coords, metres)]
+            matches = tuple(matches) + tuple((found + checked).tolist())
+            self._near[key] = (count, matches)
+        return [self.records[index] for index in matches]
+
+
+class UploadQueue:
+    """Batches of uploads processed by a pool of worker processes, with per-batch progress.
+
+    Workers report each file's stage through a queue that a listener thread
+    reads into ``status()``. When a batch's last file is done, photos
+    without a GPS position are placed and the whole batch is added to the
+    index at once. ``start()`` forks the workers, so call it before this
+    process starts threads of its own.
+    """
+
+    def __init__(self, index, workers=UPLOAD_WORKERS, directory=UPLOADS_DIR):
+        self.index = index
+        self.workers = workers
+        self.directory = directory
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._progress = None
+        self._starting = threading.Lock()
+
+    def start(self):
+        with self._starting:
+            if self._executor is not None:
+                return
+            context = multiprocessing.get_context('fork')
+            progress = context.SimpleQueue()
+            executor = ProcessPoolExecutor(self.workers, mp_context=context,
+                                           initializer=_init_worker, initargs=(progress, os.getpid()))
+            # With fork every worker starts on the first submit: do it now, before our own threads start
+            executor.submit(os.getpid).result()
+            self._progress = progress
+            threading.Thread(target=self._listen, name='trail-upload-progress', daemon=True).start()
+            self._executor = executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _listen(self):
+        while True:
+            (job_id, file), stage = self._progress.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                # Progress can arrive after the result; never move a file backwards
+                if job is not None:
+                    job['stages'][file] = max(job['stages'][file], STAGES.index(stage))
+
+    def submit(self, files, trail_name=None, position=None, timestamp=None):
+        """Queue a batch of data URLs; returns its job id.
+
+        Photos without EXIF GPS are placed along ``trail_name`` by capture
+        time, then at the device ``position``; ``timestamp`` stands in for
+        a missing capture time.
+        """
+        self.start()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            self._jobs[job_id] = {'stages': [0] * len(files), 'results': [None] * len(files), 'errors': [],
+                                  'pending': len(files), 'added': 0, 'submitted': now, 'finished': None}
+        for file, contents in enumerate(files):
+            future = self._executor.submit(process_upload, (job_id, file), contents, self.directory)
+            future.add_done_callback(partial(self._file_done, job_id, file, (trail_name, position, timestamp)))
+        if not files:
+            self._finish(job_id, trail_name, position, timestamp)
+        return job_id
+
+    def _file_done(self, job_id, file, placement, future):
+        # A done-callback: concurrent.futures only logs what it raises, so failures must finish the job
+        error = UploadError('The upload was cancelled.') if future.cancelled() else future.exception()
+        if error is not None and not isinstance(error, UploadError):
+            logger.error('upload %s file %d failed', job_id, file, exc_info=error)
+        registry.inc('trail_uploads_total', (('result', 'ok' if error is None else
+                                                        'rejected' if isinstance(error, UploadError) else 'error'),))
+        with self._lock:
+            job = self._jobs[job_id]
+            job['stages'][file] = len(STAGES) - 1
+            if error is None:
+                job['results'][file] = future.result()
+            else:
+                job['errors'].append(str(error) if isinstance(error, UploadError)
+                                     else 'The file could not be processed.')
+            job['pending'] -= 1
+            last = not job['pending']
+        if last:
+            self._finish(job_id, *placement)
+
+    def _finish(self, job_id, trail_name, position, timestamp):
+        with self._lock:
+            job = self._jobs[job_id]
+            records = [record for record in job['results'] if record is not None]
+        located = []
+        errors = ['The photos could not be added to the map.'] * len(records)
+        try:
+            if trail_name and any(record['latitude'] is None for record in records):
+                snapshot = store.current()
+                if snapshot.has_gpx(trail_name):
+                    place_along_trail(records, snapshot.line_string(trail_name).coords)
+            for record in records:
+                if record['latitude'] is None and position:
+                    record.update(latitude=position['lat'], longitude=position['lon'], located='device')
+                record['timestamp'] = record['timestamp'] or timestamp
+                if record['latitude'] is not None:
+                    located.append(record)
+            # One insert for the whole batch
+            self.index.add_many(located)
+            errors = ['The photo has no location; share your location or pick its trail.'] * (len(records) - len(located))
+        except Exception:
+            # E.g. the trail's GPX went away in a reload; the page must still see the job finish
+            logger.exception('upload %s could not be placed', job_id)
+            located = []
+        finally:
+            with self._lock:
+                job['errors'].extend(errors)
+                job['added'] = len(located)
+                job['results'] = None
+                job['finished'] = time.time()
+                seconds = job['finished'] - job['submitted']
+        registry.observe('trail_upload_seconds', (), seconds)
+
+    def _prune(self, now):
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job['finished'] is not None and now - job['finished'] > JOB_TTL]:
+            del self._jobs[job_id]
+
+    def status(self, job_ids):
+        """Progress (0-1), file counts, error and whether it's finished, per job; unknown jobs count as finished."""
+        statuses = []
+        with self._lock:
+            for job_id in job_ids:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    statuses.append({'id': job_id, 'progress': 1.0, 'count': 0, 'processed': 0, 'added': 0,
+                                     'error': 'This upload has expired.', 'finished': True})
+                    continue
+                count = len(job['stages'])
+                errors = job['errors']
+                if not errors:
+                    error = None
+                elif count == 1:
+                    error = errors[0]
+                else:
+                    error = f'{len(errors)} of {count} photos were skipped: {errors[0]}'
+                finished = job['finished'] is not None
+                statuses.append({
+                    'id': job_id,
+                    'progress': 1.0 if finished else sum(job['stages']) / (max(count, 1) * (len(STAGES) - 1)),
+                    'count': count,
+                    'processed': count - job['pending'],
+                    'added': job['added'],
+                    'error': error,
+                    'finished': finished,
+                })
+        return statuses
+
+
+# Sample finds so the map has something to show before anyone uploads
+index = UploadIndex([
+    {'id': 'sample-1', 'timestamp': '2023-01-01T12:00:00', 'latitude': -39.03112, 'longitude': 146.32135,
+     'image': 'https://via.placeholder.com/150/0000FF/808080',
+     'thumbnail': 'https://via.placeholder.com/150/0000FF/808080', 'bytes': 0},
+    {'id': 'sample-2', 'timestamp': '2023-01-02T13:00:00', 'latitude': -39.12374, 'longitude': 146.42132,
+     'image': 'https://via.placeholder.com/150/FF0000/FFFFFF',
+     'thumbnail': 'https://via.placeholder.com/150/FF0000/FFFFFF', 'bytes': 0},
+    {'id': 'sample-3', 'timestamp': '2023-01-03T14:00:00', 'latitude': -38.94000, 'longitude': 146.35000,
+     'image': 'https://via.placeholder.com/150/008000/FFFFFF',
+     'thumbnail': 'https://via.placeholder.com/150/008000/FFFFFF', 'bytes': 0},
+])
+queue = UploadQueue(index)
+
+
+def image_view(name):
+    # Names are content hashes, so a stored file never changes
+    return send_from_directory(os.path.abspath(queue.directory), name, max_age=365 * 24 * 3600)
+
+
+def install(app):
+    """Serve stored uploads and fork the worker processes on the first request.
+
+    Install it before the other first-request hooks, so the workers fork
+    before the watcher, prefetch and warm-up threads start, and not in a
+    pre-fork server's master process.
+    """
+    server = app.server
+    if 'uploaded_image' in server.view_functions:
+        return
+    server.before_request(queue.start)
+    server.add_url_rule(f'{UPLOADS_URL}/<path:name>', 'uploaded_image', image_view)
@@ -0,0 +1,214 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify, request
+
+from instrumentation import registry
+from trail_store import store
+
+logger = logging.getLogger(__name__)
+
+# Threads used to warm caches; kept small so warm-up never starves requests
+WARM_UP_WORKERS = int(os.environ.get('TRAIL_WARM_UP_WORKERS', '2'))
+# Where trail page visits are kept between deploys, empty disables it
+TRAFFIC_PATH = os.environ.get('TRAIL_TRAFFIC_PATH', 'traffic.json')
+# Visits lose half their weight after this many seconds
+TRAFFIC_HALF_LIFE = float(os.environ.get('TRAIL_TRAFFIC_HALF_LIFE', str(3 * 24 * 3600)))
+TRAFFIC_SAVE_INTERVAL = float(os.environ.get('TRAIL_TRAFFIC_SAVE_INTERVAL', '60'))
+
+
+class TrafficLog:
+    """Exponentially decayed visit counts per trail, saved to disk between deploys."""
+
+    def __init__(self, path=TRAFFIC_PATH, half_life=TRAFFIC_HALF_LIFE):
+        self.path = path
+        self.half_life = half_life
+        self._scores = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._writer = None
+        self._load()
+
+    def _decayed(self, name, now):
+        score, updated = self._scores.get(name, (0.0, now))
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def record(self, trail_name):
+        now = time.time()
+        with self._lock:
+            self._scores[trail_name] = (self._decayed(trail_name, now) + 1, now)
+            self._dirty = True
+
+    def ranking(self, trail_names):
+        """Trail names busiest first; unvisited trails keep their catalog order."""
+        now = time.time()
+        with self._lock:
+            scores = {name: self._decayed(name, now) for name in self._scores}
+        return sorted(trail_names, key=lambda name: -scores.get(name, 0.0))
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self._scores = {name: tuple(value) for name, value in json.load(f).items()}
+        except (OSError, ValueError):
+            logger.exception('could not read trail traffic from %s', self.path)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = dict(self._scores)
+            self._dirty = False
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def autosave(self, interval=TRAFFIC_SAVE_INTERVAL):
+        with self._lock:
+            if not self.path or interval <= 0 or self._writer is not None:
+                return
+            self._writer = threading.Thread(target=self._save_loop, args=(interval,),
+                                            name='trail-traffic-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.save)
+
+    def _save_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.save()
+            except OSError:
+                logger.exception('could not save trail traffic to %s', self.path)
+
+
+traffic = TrafficLog()
+
+_dependencies_loaded = threading.Event()
+_dependencies_lock = threading.Lock()
+
+
+def load_dependencies():
+    # plotly's JSON encoder uses pandas/numpy straight from sys.modules, so
+    # no request may run while they are half imported: requests wait here
+    if _dependencies_loaded.is_set():
+        return
+    with _dependencies_lock:
+        if not _dependencies_loaded.is_set():
+            import pandas  # noqa: F401
+            import shapely.geometry  # noqa: F401
+            import geopy.distance  # noqa: F401
+            _dependencies_loaded.set()
+
+
+class WarmUp:
+    """Precompute caches in the background, busiest trails first.
+
+    ``shared`` tasks take the snapshot and run before any per-trail work;
+    ``per_trail`` tasks take the snapshot and a trail name. ``status()`` says
+    how far along it is and backs the /ready endpoint.
+    """
+
+    def __init__(self, shared=(), per_trail=(), workers=WARM_UP_WORKERS):
+        self.shared = list(shared)
+        self.per_trail = list(per_trail)
+        self.workers = workers
+        self.ready = threading.Event()
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.started = time.perf_counter()
+            self._thread = threading.Thread(target=self.run, name='trail-warm-up', daemon=True)
+        self._thread.start()
+
+    def run(self):
+        try:
+            load_dependencies()
+            snapshot = store.current()
+            trail_names = traffic.ranking(snapshot.trail_names)
+            self.total = len(self.shared) + len(trail_names) * len(self.per_trail)
+            with ThreadPoolExecutor(self.workers, thread_name_prefix='trail-warm-up') as pool:
+                # Shared work first: every page load needs it
+                for future in [pool.submit(self._task, task, snapshot) for task in self.shared]:
+                    future.result()
+                for trail_name in trail_names:
+                    for task in self.per_trail:
+                        pool.submit(self._task, task, snapshot, trail_name)
+        except Exception:
+            logger.exception('warm-up failed')
+        self.finished = time.perf_counter()
+        registry.observe('trail_warm_up_seconds', (), self.finished - self.started)
+        logger.info('warm-up finished in %.2f s (%d tasks, %d failed)',
+                    self.finished - self.started, self.done, self.failed)
+        self.ready.set()
+
+    def _task(self, task, *args):
+        try:
+            task(*args)
+            result = 'ok'
+        except Exception:
+            logger.exception('warm-up task %s%r failed', task.__name__, args[1:])
+            result = 'error'
+        with self._lock:
+            self.done += 1
+            self.failed += result == 'error'
+        registry.inc('trail_warm_up_tasks_total', (('result', result),))
+
+    def status(self):
+        now = self.finished or time.perf_counter()
+        return {
+            'ready': self.ready.is_set(),
+            'done': self.done,
+            'total': self.total,
+            'failed': self.failed,
+            'seconds': round(now - self.started, 3) if self.started else None,
+        }
+
+
+def _gate_requests():
+    # /ready must answer while the dependencies are still loading
+    if request.endpoint != 'trail_ready':
+        load_dependencies()
+
+
+def install(app, warm_up=None):
+    """Gate requests on the heavy imports, expose /ready and start ``warm_up`` and traffic saving on the first request.
+
+    The first request is usually a /ready probe, so the warm-up runs once
+    the server is listening, in the process that serves. Without a
+    warm-up /ready reports ready straight away.
+    """
+    server = app.server
+    if 'trail_ready' in server.view_functions:
+        return
+
+    def ready_view():
+        if warm_up is None:
+            return jsonify(ready=True)
+        status = warm_up.status()
+        return jsonify(status), 200 if status['ready'] else 503
+
+    server.before_request(traffic.autosave)
+    if warm_up is not None:
+        # Ahead of the gate, so warm-up loads the dependencies alongside the first request
+        server.before_request(warm_up.start)
+    server.before_request(_gate_requests)
+    server.add_url_rule('/ready', 'trail_ready', ready_view)